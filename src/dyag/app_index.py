@@ -0,0 +1,171 @@
+"""
+Index des applications pour la recherche hiérarchique.
+
+Chaque application (source_id) découpée en plusieurs chunks (vue d'ensemble,
+description, informations techniques, sites) est résumée par un vecteur :
+la moyenne normalisée des embeddings de ses chunks. Ces vecteurs sont rangés
+dans une collection à part, '<collection>_apps', mise à jour par index-rag.
+
+query-rag y cherche d'abord les applications les plus proches de la
+question, puis limite la recherche des chunks à ces applications
+(where={'source_id': {'$in': [...]}}) : sur des dizaines de milliers
+d'applications, la recherche est plus courte et plus précise pour les
+questions portant sur une application.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+try:
+    from .vector_store import open_vector_store
+except ImportError:
+    from vector_store import open_vector_store
+
+
+APP_INDEX_SUFFIX = '_apps'
+
+# Nombre d'applications dont les chunks sont lus à la fois pour la mise à jour
+UPDATE_BATCH_SIZE = 100
+
+
+def app_index_name(collection_name: str) -> str:
+    """Nom de la collection des vecteurs d'applications d'une collection."""
+    return f"{collection_name}{APP_INDEX_SUFFIX}"
+
+
+def summary_vector(embeddings_sum: np.ndarray, count: int) -> np.ndarray:
+    """
+    Vecteur résumé d'une application.
+
+    Args:
+        embeddings_sum: Somme des embeddings de ses chunks
+        count: Nombre de chunks
+
+    Returns:
+        Moyenne des embeddings, normalisée
+    """
+    mean = np.asarray(embeddings_sum, dtype=np.float32) / max(count, 1)
+    return mean / max(float(np.linalg.norm(mean)), 1e-12)
+
+
+class AppIndexBuilder:
+    """
+    Tient à jour l'index des applications pendant une indexation.
+
+    Les embeddings des chunks écrits sont additionnés par application ; à la
+    fin de l'indexation, update() recalcule le vecteur des seules applications
+    touchées. Les embeddings des chunks d'une application qui n'ont pas été
+    écrits pendant l'indexation (mode incrémental) sont recalculés par la
+    fonction d'encodage de l'indexeur, qui passe par le cache d'embeddings.
+    """
+
+    def __init__(self, store: str, chroma_path: str, collection_name: str, reset: bool = False):
+        """
+        Ouvre (ou crée) l'index des applications.
+
+        Args:
+            store: Backend vectoriel ('chroma' ou 'numpy')
+            chroma_path: Répertoire de la base vectorielle
+            collection_name: Nom de la collection des chunks
+            reset: Vider l'index existant
+        """
+        self.index = open_vector_store(
+            store, chroma_path, app_index_name(collection_name), create=True, reset=reset
+        )
+        # source_id -> (somme des embeddings, IDs des chunks additionnés)
+        self.sums: Dict[str, List] = {}
+        # Applications dont des chunks ont été supprimés ou réécrits
+        self.stale: Set[str] = set()
+
+    def add(self, ids: List[str], metadatas: List[Dict], embeddings) -> None:
+        """Additionne les embeddings de chunks écrits dans la collection."""
+        for chunk_id, metadata, embedding in zip(ids, metadatas, np.asarray(embeddings, dtype=np.float32)):
+            source_id = metadata.get('source_id')
+            if source_id is None:
+                continue
+            entry = self.sums.setdefault(source_id, [np.zeros_like(embedding), set()])
+            if chunk_id in entry[1]:
+                # Chunk réécrit : sa première version ne peut pas être retirée de la somme
+                self.stale.add(source_id)
+            entry[0] += embedding
+            entry[1].add(chunk_id)
+
+    def remove(self, metadatas: Iterable[Optional[Dict]]) -> None:
+        """Marque les applications de chunks supprimés de la collection."""
+        for metadata in metadatas:
+            if metadata and metadata.get('source_id') is not None:
+                self.stale.add(metadata['source_id'])
+
+    def update(
+        self,
+        collection,
+        encode: Callable[[List[str]], np.ndarray],
+        rebuild: bool = False,
+        page_size: int = 1000
+    ) -> int:
+        """
+        Recalcule les vecteurs des applications touchées depuis l'ouverture.
+
+        Args:
+            collection: VectorStore des chunks
+            encode: Fonction d'encodage des documents (ChunkIndexer.encode)
+            rebuild: Recalculer toutes les applications de la collection
+                    (après une reprise, ou si l'index est vide)
+            page_size: Nombre de chunks lus par page pour lister les applications
+
+        Returns:
+            Nombre d'applications mises à jour ou supprimées
+        """
+        source_ids = set(self.sums) | self.stale
+        if rebuild:
+            offset = 0
+            while True:
+                page = collection.get(limit=page_size, offset=offset, include=['metadatas'])
+                if not page['ids']:
+                    break
+                source_ids.update(
+                    meta['source_id'] for meta in page['metadatas']
+                    if meta and meta.get('source_id') is not None
+                )
+                offset += len(page['ids'])
+
+        pending = sorted(source_ids, key=str)
+        for start in range(0, len(pending), UPDATE_BATCH_SIZE):
+            self._update_batch(collection, encode, pending[start:start + UPDATE_BATCH_SIZE])
+
+        self.index.optimize()
+        self.sums.clear()
+        self.stale.clear()
+        return len(pending)
+
+    def _update_batch(self, collection, encode, source_ids: List) -> None:
+        chunks = collection.get(where={'source_id': {'$in': source_ids}})
+        by_app: Dict = {}
+        for chunk_id, document, metadata in zip(chunks['ids'], chunks['documents'], chunks['metadatas']):
+            by_app.setdefault(metadata['source_id'], []).append((chunk_id, document, metadata))
+
+        # Applications sans chunk dans la collection : retirées de l'index
+        self.index.delete([str(source_id) for source_id in source_ids if source_id not in by_app])
+
+        ids, documents, metadatas, vectors = [], [], [], []
+        for source_id, app_chunks in by_app.items():
+            known_sum, known_ids = self.sums.get(source_id, (None, set()))
+            current_ids = {chunk_id for chunk_id, _, _ in app_chunks}
+            if source_id in self.stale or not known_ids <= current_ids:
+                known_sum, known_ids = None, set()
+
+            missing = [document for chunk_id, document, _ in app_chunks if chunk_id not in known_ids]
+            total = known_sum.copy() if known_sum is not None else 0
+            if missing:
+                total = total + np.asarray(encode(missing), dtype=np.float32).sum(axis=0)
+
+            # Titre de la vue d'ensemble de l'application, à défaut du premier chunk
+            titles = sorted(app_chunks, key=lambda chunk: chunk[2].get('chunk_type') != 'overview')
+            ids.append(str(source_id))
+            documents.append(titles[0][2].get('title') or str(source_id))
+            metadatas.append({'source_id': source_id, 'chunks': len(app_chunks)})
+            vectors.append(summary_vector(total, len(app_chunks)))
+
+        if ids:
+            self.index.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=np.vstack(vectors))
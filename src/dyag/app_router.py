@@ -0,0 +1,209 @@
+"""
+Routage des questions vers les applications qu'elles nomment.
+
+La plupart des questions citent l'application concernée ("Quel est le statut
+de 6Tzen ?"). Le routeur associe les noms, noms longs et identifiants des
+applications (métadonnées 'nom', 'nom long' et 'id' des chunks) à leur
+source_id. Les noms sont rangés dans un trie de termes (voir
+hybrid_search.tokenize) : une question est parcourue en une passe, en
+retenant à chaque position le nom le plus long qui y commence, sans
+recherche vectorielle.
+
+Pour limiter les faux positifs, un identifiant numérique n'est reconnu que
+précédé d'un mot qui l'annonce ("id 1238", "l'identifiant 1238") et les noms
+formés uniquement de mots courants ("Portail", "Mail") sont ignorés.
+
+La table des noms est enregistrée par index-rag à côté de la collection
+('<collection>.names.json') ; RAGQuerySystem filtre alors la recherche sur
+les applications citées (where={'source_id': ...}).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    from .hybrid_search import tokenize
+except ImportError:
+    from hybrid_search import tokenize
+
+
+# Métadonnées des chunks contenant un nom de l'application
+NAME_FIELDS = ('nom', 'nom long', 'id')
+
+# Les noms plus courts (après normalisation) sont ignorés : trop de faux positifs
+MIN_NAME_LENGTH = 3
+
+# Mots qui annoncent un identifiant numérique ("id 1238", "n° 1238")
+ID_PREFIXES = frozenset({'id', 'identifiant', 'n', 'no', 'num', 'numero'})
+
+# Mots courants : un nom formé uniquement de ces mots n'est pas routé
+# ("un portail web", "envoyer un mail")
+COMMON_WORDS = frozenset({
+    'a', 'au', 'aux', 'd', 'de', 'des', 'du', 'en', 'et', 'l', 'la', 'le', 'les', 'pour', 'sur', 'un', 'une',
+    'acces', 'accueil', 'agent', 'agents', 'aide', 'annuaire', 'api', 'app', 'application', 'applications',
+    'archive', 'base', 'carte', 'catalogue', 'compte', 'contact', 'courrier', 'declaration', 'demande',
+    'demarche', 'demarches', 'document', 'documents', 'donnees', 'dossier', 'dossiers', 'espace', 'extranet',
+    'fichier', 'formulaire', 'gestion', 'guichet', 'intranet', 'logiciel', 'mail', 'messagerie', 'mobile',
+    'outil', 'outils', 'plateforme', 'portail', 'projet', 'recherche', 'referentiel', 'registre', 'service',
+    'services', 'site', 'statistiques', 'suivi', 'systeme', 'tableau', 'web'
+})
+
+# Marqueur de fin de nom dans le trie
+_END = ''
+
+
+def app_names_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Chemin de la table des noms d'applications d'une collection.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        Chemin '<chroma_path>/<collection>.names.json'
+    """
+    return Path(chroma_path) / f"{collection_name}.names.json"
+
+
+class AppNameRouter:
+    """
+    Table des noms d'applications et trie de recherche associé.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Charge la table des noms.
+
+        Args:
+            path: Fichier JSON de la table (créé au premier save)
+                 Si None, la table reste en mémoire
+        """
+        self.path = Path(path) if path is not None else None
+        # source_id -> noms de l'application
+        self.names: Dict[str, List[str]] = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.names = json.load(f).get('names', {})
+        self._trie = None
+        # Applications dont les noms ont été relus depuis l'ouverture
+        self._refreshed: Set[str] = set()
+
+    def add(self, metadatas: Iterable[Dict]) -> None:
+        """
+        Enregistre les noms trouvés dans les métadonnées de chunks.
+
+        Les noms d'une application sont remplacés au premier de ses chunks
+        reçu (tous ses chunks portent les mêmes métadonnées communes) : un
+        renommage ne laisse pas l'ancien nom dans la table.
+
+        Args:
+            metadatas: Métadonnées de chunks (avec source_id)
+        """
+        for metadata in metadatas:
+            source_id = metadata.get('source_id')
+            if source_id is None:
+                continue
+            names = [
+                str(metadata[field]).strip() for field in NAME_FIELDS
+                if metadata.get(field) not in (None, '')
+            ]
+            source_id = str(source_id)
+            if source_id not in self._refreshed:
+                self._refreshed.add(source_id)
+                self.names[source_id] = []
+                self._trie = None
+            known = self.names[source_id]
+            for name in names:
+                if name not in known:
+                    known.append(name)
+                    self._trie = None
+
+    def remove(self, source_ids: Iterable[str]) -> None:
+        """Retire des applications de la table."""
+        for source_id in source_ids:
+            if self.names.pop(str(source_id), None) is not None:
+                self._trie = None
+
+    def clear(self) -> None:
+        """Vide la table."""
+        self.names = {}
+        self._trie = None
+
+    def save(self) -> None:
+        """Écrit la table (remplacement atomique du fichier)."""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'names': self.names}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _build_trie(self) -> Dict:
+        trie: Dict = {}
+        for source_id, names in self.names.items():
+            for name in names:
+                terms = tokenize(name)
+                if len(''.join(terms)) < MIN_NAME_LENGTH or all(term in COMMON_WORDS for term in terms):
+                    continue
+                node = trie
+                for term in terms:
+                    node = node.setdefault(term, {})
+                node.setdefault(_END, set()).add(source_id)
+        return trie
+
+    @staticmethod
+    def _is_id(terms: List[str], start: int, end: int) -> bool:
+        """Nom numérique (identifiant) trouvé entre start et end."""
+        return all(term.isdigit() for term in terms[start:end])
+
+    def match(self, question: str) -> List[str]:
+        """
+        Applications citées dans une question.
+
+        À chaque position, le nom le plus long qui y commence l'emporte
+        ("GIDAF Paris" plutôt que "GIDAF"), et la recherche reprend après lui.
+        Un identifiant numérique doit suivre un mot de ID_PREFIXES : "créées
+        en 2019" ne désigne pas l'application 2019.
+
+        Args:
+            question: Question en langage naturel
+
+        Returns:
+            source_id des applications citées, dans l'ordre de la question
+        """
+        if self._trie is None:
+            self._trie = self._build_trie()
+
+        terms = tokenize(question)
+        found: List[str] = []
+        seen: Set[str] = set()
+        start = 0
+        while start < len(terms):
+            node = self._trie
+            best_end, best_ids = None, None
+            for end in range(start, len(terms)):
+                node = node.get(terms[end])
+                if node is None:
+                    break
+                if _END in node and (
+                    not self._is_id(terms, start, end + 1)
+                    or (start > 0 and terms[start - 1] in ID_PREFIXES)
+                ):
+                    best_end, best_ids = end + 1, node[_END]
+            if best_end is None:
+                start += 1
+                continue
+            for source_id in sorted(best_ids):
+                if source_id not in seen:
+                    seen.add(source_id)
+                    found.append(source_id)
+            start = best_end
+        return found
+
+    def get_stats(self) -> Dict:
+        """Nombre d'applications et de noms de la table."""
+        return {
+            'applications': len(self.names),
+            'names': sum(len(names) for names in self.names.values())
+        }
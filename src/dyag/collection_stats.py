@@ -0,0 +1,204 @@
+"""
+Statistiques complètes d'une collection RAG.
+
+La collection est parcourue page par page en ne récupérant que les
+métadonnées : ChunkIndexer y enregistre la longueur et l'empreinte du contenu
+de chaque chunk (content_length, content_hash), ce qui évite de charger les
+documents. Pour les chunks indexés avant l'ajout de ces champs, le contenu
+de la page est lu en complément.
+
+Le résultat est mis en cache à côté de la collection avec son tampon de
+modification (VectorStore.modification_stamp) : tant que la collection n'est
+pas réindexée, les appels suivants sont immédiats.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .rag_cache import content_hash
+except ImportError:
+    from rag_cache import content_hash
+
+
+# Champs de métadonnées ajoutés par ChunkIndexer à chaque chunk
+CONTENT_FIELDS = ('content_hash', 'content_length')
+
+# Bornes des classes de l'histogramme des longueurs de contenu (caractères)
+CONTENT_LENGTH_BUCKETS = (100, 250, 500, 1000, 2000, 5000)
+
+# Nombre de groupes de doublons détaillés dans les statistiques
+DUPLICATE_EXAMPLES = 10
+
+
+def with_content_fields(document: str, metadata: Dict) -> Dict:
+    """
+    Ajoute la longueur et l'empreinte du contenu aux métadonnées d'un chunk.
+
+    Args:
+        document: Contenu du chunk
+        metadata: Métadonnées d'origine (non modifiées)
+
+    Returns:
+        Copie des métadonnées avec content_hash et content_length
+    """
+    return dict(metadata, content_hash=content_hash(document), content_length=len(document))
+
+
+def strip_content_fields(metadata: Dict) -> Dict:
+    """Retire les champs ajoutés par with_content_fields."""
+    return {key: value for key, value in metadata.items() if key not in CONTENT_FIELDS}
+
+
+def stats_cache_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Chemin du cache des statistiques d'une collection.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        Chemin '<chroma_path>/<collection>.stats.json'
+    """
+    return Path(chroma_path) / f"{collection_name}.stats.json"
+
+
+def _length_bucket(length: int) -> str:
+    lower = 0
+    for upper in CONTENT_LENGTH_BUCKETS:
+        if length < upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f">={lower}"
+
+
+def compute_collection_stats(collection, page_size: int = 1000) -> Dict:
+    """
+    Parcourt toute la collection et calcule ses distributions.
+
+    Args:
+        collection: VectorStore à analyser
+        page_size: Nombre de chunks lus par page
+
+    Returns:
+        total_chunks, chunk_types, source_ids, sources, content_length
+        (min, max, moyenne, médiane, p95 et histogramme) et duplicates
+        (chunks au contenu identique)
+    """
+    start_time = time.time()
+    chunk_types = Counter()
+    source_ids = Counter()
+    lengths: List[int] = []
+    first_id: Dict[str, str] = {}
+    duplicates: Dict[str, List[str]] = {}
+
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=['metadatas'])
+        ids, metadatas = page['ids'], page['metadatas']
+        if not ids:
+            break
+
+        # Chunks indexés sans content_hash : lecture du contenu de la page
+        missing = [chunk_id for chunk_id, meta in zip(ids, metadatas)
+                   if not all(field in (meta or {}) for field in CONTENT_FIELDS)]
+        documents = {}
+        if missing:
+            fetched = collection.get(ids=missing, include=['documents'])
+            documents = dict(zip(fetched['ids'], fetched['documents']))
+
+        for chunk_id, meta in zip(ids, metadatas):
+            meta = meta or {}
+            chunk_types[meta.get('chunk_type', 'unknown')] += 1
+            if meta.get('source_id') is not None:
+                source_ids[str(meta['source_id'])] += 1
+
+            if chunk_id in documents:
+                document = documents[chunk_id] or ''
+                length, digest = len(document), content_hash(document)
+            else:
+                length, digest = meta['content_length'], meta['content_hash']
+            lengths.append(length)
+
+            if digest in first_id:
+                duplicates.setdefault(digest, [first_id[digest]]).append(chunk_id)
+            else:
+                first_id[digest] = chunk_id
+
+        offset += len(ids)
+
+    histogram = Counter(_length_bucket(length) for length in lengths)
+    bucket_names = [_length_bucket(bound - 1) for bound in CONTENT_LENGTH_BUCKETS]
+    bucket_names.append(_length_bucket(CONTENT_LENGTH_BUCKETS[-1]))
+    length_array = np.array(lengths or [0])
+    groups = sorted(duplicates.items(), key=lambda item: len(item[1]), reverse=True)
+
+    return {
+        'total_chunks': len(lengths),
+        'collection_name': collection.name,
+        'chunk_types': dict(chunk_types.most_common()),
+        'source_ids': dict(source_ids.most_common()),
+        'sources': len(source_ids),
+        'content_length': {
+            'min': int(length_array.min()),
+            'max': int(length_array.max()),
+            'mean': float(length_array.mean()),
+            'p50': float(np.percentile(length_array, 50)),
+            'p95': float(np.percentile(length_array, 95)),
+            'histogram': {name: histogram.get(name, 0) for name in bucket_names}
+        },
+        'duplicates': {
+            'groups': len(duplicates),
+            'chunks': sum(len(chunk_ids) for chunk_ids in duplicates.values()),
+            'examples': [
+                {'content_hash': digest, 'ids': chunk_ids}
+                for digest, chunk_ids in groups[:DUPLICATE_EXAMPLES]
+            ]
+        },
+        'scan_time': time.time() - start_time
+    }
+
+
+def collection_stats(
+    collection,
+    cache_path: Optional[Path] = None,
+    page_size: int = 1000,
+    refresh: bool = False
+) -> Dict:
+    """
+    Statistiques d'une collection, servies depuis le cache si elle n'a pas changé.
+
+    Args:
+        collection: VectorStore à analyser
+        cache_path: Fichier JSON du cache (voir stats_cache_path ; None = sans cache)
+        page_size: Nombre de chunks lus par page
+        refresh: Recalculer même si le cache est à jour
+
+    Returns:
+        Statistiques (voir compute_collection_stats), avec 'cached' à True
+        si elles proviennent du cache
+    """
+    stamp = collection.modification_stamp()
+    if cache_path is not None and not refresh and Path(cache_path).exists():
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('stamp') == stamp:
+                return dict(cached['stats'], cached=True)
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+
+    stats = compute_collection_stats(collection, page_size=page_size)
+    if cache_path is not None:
+        tmp_path = Path(cache_path).with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stamp': stamp, 'stats': stats}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return dict(stats, cached=False)
@@ -37,10 +37,12 @@ from dyag.rag.commands import (
     register_query_rag_command,
     register_markdown_to_rag_command,
     register_test_rag_command,
-    register_rag_stats_command,
     register_show_evaluation_command,
     register_compare_evaluations_command,
 )
+from dyag.commands.rag_serve import register_rag_serve_command
+from dyag.commands.embed_cache import register_embed_cache_command
+from dyag.commands.rag_stats import register_rag_stats_command
 from dyag.conversion.commands.json2md import register_json2md_command
 from dyag.park.commands.json2md_park import register_parkjson2md_command
 from dyag.park.commands.json2json_park import register_parkjson2json_command
@@ -137,6 +139,8 @@ __all__ = [
     "register_compare_rag_command",
     "register_index_rag_command",
     "register_query_rag_command",
+    "register_rag_serve_command",
+    "register_embed_cache_command",
     "register_markdown_to_rag_command",
     "register_test_rag_command",
     "register_rag_stats_command",
@@ -0,0 +1,88 @@
+"""
+Commande de gestion du cache d'embeddings partagé (voir dyag.embedding_cache).
+
+    dyag embed-cache stats    Taille et contenu du cache
+    dyag embed-cache prune    Évince les entrées les moins récemment utilisées
+"""
+
+import sys
+import io
+from pathlib import Path
+
+# Fixer l'encodage UTF-8 pour Windows (seulement si exécuté comme script principal)
+if sys.platform == 'win32' and __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+from dyag.embedding_cache import EmbeddingCache, default_cache_dir, parse_size
+
+
+def format_size(size: float) -> str:
+    """Taille lisible (octets, Ko, Mo ou Go)."""
+    if size < 1024:
+        return f"{size:.0f} o"
+    for unit in ('Ko', 'Mo', 'Go'):
+        size /= 1024
+        if size < 1024 or unit == 'Go':
+            return f"{size:.1f} {unit}"
+
+
+def execute(args):
+    """Exécute la commande embed-cache."""
+    path = Path(args.path) if args.path else default_cache_dir()
+    if not (path / 'index.sqlite').exists():
+        print(f"[WARNING] Aucun cache d'embeddings dans {path}")
+        return 0
+
+    try:
+        max_bytes = parse_size(args.max_size)
+    except ValueError:
+        print(f"[ERROR] Taille invalide: {args.max_size}")
+        return 1
+
+    cache = EmbeddingCache(str(path), max_bytes=max_bytes)
+    try:
+        if args.action == 'prune':
+            before = cache.get_stats()['bytes']
+            evicted = cache.prune()
+            after = cache.get_stats()['bytes']
+            print(f"[OK] {evicted} embeddings évincés, {format_size(before)} -> {format_size(after)}")
+            return 0
+
+        stats = cache.get_stats()
+        print(f"Cache d'embeddings: {stats['path']}")
+        print(f"  - Embeddings: {stats['entries']}")
+        print(f"  - Taille: {format_size(stats['bytes'])} (max {format_size(stats['max_bytes'])})")
+        for model, info in stats['models'].items():
+            print(f"  - {model}: {info['entries']} embeddings de dimension {info['dim']} "
+                  f"({format_size(info['bytes'])})")
+        return 0
+    finally:
+        cache.close()
+
+
+def register_embed_cache_command(subparsers):
+    """Enregistre la commande embed-cache."""
+    parser = subparsers.add_parser(
+        'embed-cache',
+        help='Statistiques et nettoyage du cache d\'embeddings partagé entre collections'
+    )
+
+    parser.add_argument(
+        'action',
+        choices=['stats', 'prune'],
+        help='stats: afficher le contenu du cache ; prune: évincer les embeddings les moins récemment utilisés'
+    )
+    parser.add_argument(
+        '--path',
+        type=str,
+        help='Répertoire du cache (défaut: $DYAG_EMBED_CACHE ou ~/.cache/dyag/embeddings)'
+    )
+    parser.add_argument(
+        '--max-size',
+        type=str,
+        default='2G',
+        help='Taille maximale conservée par prune, ex: 500M, 2G (défaut: 2G)'
+    )
+
+    parser.set_defaults(func=execute)
@@ -19,6 +19,7 @@ if sys.platform == 'win32' and __name__ == '__main__':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 from dyag.rag_query import RAGQuerySystem
+from dyag.rag_metrics import STAGES, summarize_stages
 
 
 def load_dataset(dataset_path: str) -> List[Dict]:
@@ -65,7 +66,8 @@ def evaluate_rag(
     questions: List[Dict],
     n_chunks: int = 5,
     max_questions: int = None,
-    output_file: str = None
+    output_file: str = None,
+    concurrency: int = 1
 ) -> Dict:
     """
     Évalue le système RAG sur un ensemble de questions.
@@ -76,6 +78,8 @@ def evaluate_rag(
         n_chunks: Nombre de chunks de contexte
         max_questions: Nombre max de questions à tester (None = toutes)
         output_file: Fichier JSON pour sauvegarder les résultats détaillés
+        concurrency: Nombre d'appels LLM simultanés (1 = séquentiel).
+                     Au-delà de 1, la recherche est faite en lot via rag.ask_many
 
     Returns:
         Statistiques d'évaluation
@@ -89,12 +93,29 @@ def evaluate_rag(
     print(f"Modèle LLM: {rag.llm_provider.get_model_name()}")
     print(f"Chunks par question: {n_chunks}")
     print(f"Collection: {rag.collection.name}")
+    if concurrency > 1:
+        print(f"Appels LLM simultanés: {concurrency}")
     print("=" * 80)
     print()
 
     results = []
     total_time = 0
     total_tokens = 0
+    wall_start = time.time()
+
+    # En mode parallèle, toutes les réponses sont calculées d'avance
+    batch_answers = None
+    if concurrency > 1:
+        try:
+            batch_answers = rag.ask_many(
+                [q['question'] for q in questions],
+                n_chunks=n_chunks,
+                concurrency=concurrency
+            )
+        except Exception as e:
+            # Recherche en lot en échec : questions posées une à une, chaque
+            # erreur est alors rapportée pour sa question
+            print(f"[WARNING] Recherche en lot impossible ({e}), questions posées une à une")
 
     for i, q in enumerate(questions, 1):
         question = q['question']
@@ -104,9 +125,15 @@ def evaluate_rag(
         print("-" * 80)
 
         try:
-            start_time = time.time()
-            result = rag.ask(question, n_chunks=n_chunks)
-            elapsed = time.time() - start_time
+            if batch_answers is not None:
+                result = batch_answers[i - 1]
+                if result.get('error'):
+                    raise RuntimeError(result['error'])
+                elapsed = result.get('total_time', 0)
+            else:
+                start_time = time.time()
+                result = rag.ask(question, n_chunks=n_chunks)
+                elapsed = time.time() - start_time
 
             answer = result['answer']
             tokens = result.get('tokens_used', 0)
@@ -129,6 +156,8 @@ def evaluate_rag(
                 'sources': sources,
                 'tokens': tokens,
                 'time': elapsed,
+                'cache_hit': result.get('cache_hit', False),
+                'timings': {stage: result[stage] for stage in STAGES if stage in result},
                 'success': True,
                 'error': None
             })
@@ -149,6 +178,8 @@ def evaluate_rag(
                 'error': str(e)
             })
 
+    wall_time = time.time() - wall_start
+
     # Statistiques
     print("\n" + "=" * 80)
     print("RÉSULTATS")
@@ -169,8 +200,16 @@ def evaluate_rag(
         print(f"  Tokens: {avg_tokens:.0f}")
 
     print(f"\nTemps total: {total_time:.1f}s ({total_time/60:.1f} min)")
+    if concurrency > 1:
+        print(f"Temps réel (parallèle): {wall_time:.1f}s")
     print(f"Tokens total: {total_tokens}")
 
+    latency = summarize_stages(r['timings'] for r in results if r['success'])
+    if latency:
+        print(f"\nLatence par étape (p50 / p95 / p99):")
+        for stage, summary in latency.items():
+            print(f"  {stage}: {summary['p50']:.3f}s / {summary['p95']:.3f}s / {summary['p99']:.3f}s")
+
     # Sauvegarder résultats détaillés
     if output_file:
         output_path = Path(output_file)
@@ -183,7 +222,10 @@ def evaluate_rag(
                 'successful': successful,
                 'failed': failed,
                 'total_time': total_time,
-                'total_tokens': total_tokens
+                'wall_time': wall_time,
+                'concurrency': concurrency,
+                'total_tokens': total_tokens,
+                'latency': latency
             },
             'results': results
         }
@@ -200,7 +242,9 @@ def evaluate_rag(
         'successful': successful,
         'failed': failed,
         'total_time': total_time,
+        'wall_time': wall_time,
         'total_tokens': total_tokens,
+        'latency': latency,
         'results': results
     }
 
@@ -225,7 +269,9 @@ def execute(args):
         rag = RAGQuerySystem(
             chroma_path=args.chroma_path,
             collection_name=args.collection,
-            timeout=args.timeout
+            timeout=args.timeout,
+            answer_cache_path=args.answer_cache,
+            answer_cache_ttl=args.answer_cache_ttl
         )
     except Exception as e:
         print(f"[ERROR] Erreur d'initialisation du RAG: {e}")
@@ -237,7 +283,8 @@ def execute(args):
         questions=questions,
         n_chunks=args.n_chunks,
         max_questions=args.max_questions,
-        output_file=args.output
+        output_file=args.output,
+        concurrency=args.concurrency
     )
 
     # Code de sortie selon résultats
@@ -289,5 +336,21 @@ def register_evaluate_rag_command(subparsers):
         type=int,
         help='Timeout en secondes pour Ollama'
     )
+    parser.add_argument(
+        '--answer-cache',
+        type=str,
+        help='Fichier SQLite du cache de réponses LLM (réutilisé entre deux évaluations)'
+    )
+    parser.add_argument(
+        '--answer-cache-ttl',
+        type=float,
+        help='Durée de vie des réponses en cache, en secondes (défaut: illimitée)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=1,
+        help='Nombre d\'appels LLM simultanés (défaut: 1 = séquentiel)'
+    )
 
     parser.set_defaults(func=execute)
@@ -11,21 +11,379 @@ import os
 if 'TRANSFORMERS_CACHE' in os.environ and 'HF_HOME' not in os.environ:
     os.environ['HF_HOME'] = os.environ['TRANSFORMERS_CACHE']
 
-import chromadb
 from sentence_transformers import SentenceTransformer
+import gzip
+import hashlib
+import itertools
 import json
+import queue
 import sys
 import io
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional, TextIO, Tuple
 from tqdm import tqdm
 
+from dyag.app_index import AppIndexBuilder, app_index_name
+from dyag.app_router import AppNameRouter, app_names_path
+from dyag.collection_stats import collection_stats, stats_cache_path, strip_content_fields, with_content_fields
+from dyag.context_packer import estimate_tokens
+from dyag.embedding_cache import EmbeddingCache, cache_path_option, model_revision
+from dyag.embedding_pool import EmbeddingPool
+from dyag.rag_cache import AnswerCache, content_hash
+from dyag.hybrid_search import BM25Index, bm25_index_path
+from dyag.vector_store import (
+    PROJECTION_SAMPLE_SIZE, PROJECTIONS, STORE_DTYPES, STORE_TYPES,
+    compression_report, open_vector_store
+)
+
 # Fixer l'encodage UTF-8 pour Windows (seulement si exécuté comme script principal)
 if sys.platform == 'win32' and __name__ == '__main__':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 
+# Nombre de chunks triés par longueur avant découpage en lots (--sort-window)
+SORT_WINDOW = 2000
+
+# Suffixe de la collection reconstruite par --reset avant remplacement
+BUILD_SUFFIX = '_build'
+
+# Intervalle minimal entre deux points de reprise (secondes)
+CHECKPOINT_INTERVAL = 10.0
+
+# Octets lus au début et à la fin de la source pour son empreinte
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+
+# Suffixes de compression acceptés pour les fichiers de chunks
+COMPRESSION_SUFFIXES = ('.gz', '.zst')
+
+
+def chunk_file_format(path: Path) -> Optional[str]:
+    """
+    Détermine le format d'un fichier de chunks.
+
+    Args:
+        path: Fichier .jsonl ou .json, éventuellement compressé (.gz, .zst)
+
+    Returns:
+        'jsonl', 'json', ou None si le format n'est pas supporté
+    """
+    suffixes = Path(path).suffixes
+    if suffixes and suffixes[-1] in COMPRESSION_SUFFIXES:
+        suffixes = suffixes[:-1]
+    if suffixes and suffixes[-1] in ('.jsonl', '.json'):
+        return suffixes[-1][1:]
+    return None
+
+
+def open_chunk_file(path: Path) -> TextIO:
+    """
+    Ouvre un fichier de chunks en texte, en le décompressant au fil de la lecture.
+
+    Args:
+        path: Fichier éventuellement compressé en gzip (.gz) ou zstd (.zst)
+
+    Returns:
+        Fichier texte UTF-8
+    """
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.suffix == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "La lecture des fichiers .zst nécessite zstandard. "
+                "Installez-le avec: pip install zstandard"
+            )
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_chunks_jsonl(path: Path) -> Iterator[Dict]:
+    """
+    Lit un fichier JSONL de chunks ligne par ligne.
+
+    Args:
+        path: Fichier JSONL, éventuellement compressé (.gz, .zst)
+
+    Yields:
+        Un chunk par ligne valide (les lignes invalides sont signalées et ignorées)
+    """
+    with open_chunk_file(path) as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Erreur ligne {line_num}: {e}")
+
+
+def iter_chunks(path: Path) -> Iterator[Dict]:
+    """
+    Lit les chunks d'un fichier JSONL ou JSON.
+
+    Le JSONL est lu au fil de l'eau ; un fichier JSON ({"chunks": [...]})
+    est forcément chargé en entier.
+
+    Args:
+        path: Fichier .jsonl ou .json, éventuellement compressé (.gz, .zst)
+
+    Yields:
+        Chunks du fichier
+    """
+    file_format = chunk_file_format(path)
+    if file_format == 'jsonl':
+        yield from iter_chunks_jsonl(path)
+    elif file_format == 'json':
+        with open_chunk_file(path) as f:
+            yield from json.load(f).get('chunks', [])
+    else:
+        raise ValueError(f"Format non supporté: {Path(path).name} (formats acceptés: .jsonl, .json)")
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Découpe un itérable en lots de `size` éléments (le dernier peut être plus court)."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def length_batches(
+    records: Iterable[Tuple[str, str, Dict]],
+    batch_size: int,
+    max_batch_tokens: Optional[int] = None,
+    sort_window: int = 0,
+    token_limit: Optional[int] = None
+) -> Iterator[List[Tuple[str, str, Dict]]]:
+    """
+    Découpe les chunks (id, contenu, métadonnées) en lots à encoder.
+
+    Le transformer complète chaque document d'un lot jusqu'à la longueur du
+    plus long : regrouper des documents de longueur proche réduit ce
+    remplissage. Les chunks sont lus par fenêtres de sort_window, triés par
+    nombre de tokens puis découpés en lots ; chaque lot garde ses IDs, seul
+    l'ordre d'écriture change.
+
+    Args:
+        records: Chunks (id, contenu, métadonnées)
+        batch_size: Nombre de documents par lot
+        max_batch_tokens: Nombre maximal de tokens par lot, remplissage compris
+                         (documents x longueur du plus long), à la place de batch_size
+        sort_window: Nombre de chunks triés ensemble (0 = ordre de lecture)
+        token_limit: Longueur maximale d'un document pour le modèle
+                    (au-delà, le texte est tronqué à l'encodage)
+
+    Yields:
+        Lots de chunks
+    """
+    def tokens(record):
+        count = estimate_tokens(record[1])
+        return min(count, token_limit) if token_limit else count
+
+    stream = records
+    if sort_window > 0:
+        # Un ID présent plusieurs fois dans la fenêtre : la dernière version l'emporte
+        stream = itertools.chain.from_iterable(
+            sorted({record[0]: record for record in window}.values(), key=tokens)
+            for window in batched(records, sort_window)
+        )
+
+    batch, longest = [], 0
+    for record in stream:
+        length = tokens(record)
+        if max_batch_tokens is None:
+            full = len(batch) >= batch_size
+        else:
+            full = (len(batch) + 1) * max(longest, length) > max_batch_tokens
+        if batch and full:
+            yield batch
+            batch, longest = [], 0
+        batch.append(record)
+        longest = max(longest, length)
+    if batch:
+        yield batch
+
+
+def manifest_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Chemin du manifeste d'indexation d'une collection.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        Chemin '<chroma_path>/<collection>.manifest.json'
+    """
+    return Path(chroma_path) / f"{collection_name}.manifest.json"
+
+
+class IndexManifest:
+    """
+    Empreintes (contenu et métadonnées) des chunks indexés dans une collection.
+
+    Permet à l'indexation incrémentale de ne recalculer les embeddings que des
+    chunks nouveaux ou modifiés, et de supprimer ceux qui ont disparu de la source.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Charge le manifeste.
+
+        Args:
+            path: Fichier JSON du manifeste (créé au premier save)
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('chunks', {})
+
+    @staticmethod
+    def fingerprint(document: str, metadata: Dict) -> Dict[str, str]:
+        """Empreintes du contenu et des métadonnées d'un chunk."""
+        return {
+            'content': content_hash(document),
+            'metadata': content_hash(json.dumps(metadata, sort_keys=True, ensure_ascii=False))
+        }
+
+    def status(self, chunk_id: str, document: str, metadata: Dict) -> str:
+        """
+        Compare un chunk à sa version indexée.
+
+        Returns:
+            'added', 'updated' ou 'unchanged'
+        """
+        entry = self.entries.get(chunk_id)
+        if entry is None:
+            return 'added'
+        return 'unchanged' if entry == self.fingerprint(document, metadata) else 'updated'
+
+    def update(self, ids: List[str], documents: List[str], metadatas: List[Dict]) -> None:
+        """Enregistre les empreintes de chunks indexés."""
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            self.entries[chunk_id] = self.fingerprint(document, metadata)
+
+    def remove(self, ids: List[str]) -> None:
+        """Oublie des chunks supprimés de la collection."""
+        for chunk_id in ids:
+            self.entries.pop(chunk_id, None)
+
+    def clear(self) -> None:
+        """Vide le manifeste."""
+        self.entries = {}
+
+    def save(self) -> None:
+        """Écrit le manifeste (remplacement atomique du fichier)."""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'chunks': self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+
+def checkpoint_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Chemin du point de reprise d'une indexation.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        Chemin '<chroma_path>/<collection>.checkpoint.json'
+    """
+    return Path(chroma_path) / f"{collection_name}.checkpoint.json"
+
+
+def source_fingerprint(path: Path, *params) -> str:
+    """
+    Empreinte d'un fichier source et des paramètres qui déterminent ses chunks.
+
+    Args:
+        path: Fichier de chunks (ou Markdown découpé par markdown-to-rag)
+        *params: Paramètres de découpage
+
+    Returns:
+        Empreinte SHA-256 hexadécimale du chemin, de la taille, de la date de
+        modification et du premier et du dernier Mio du fichier (hacher les
+        sources de plusieurs Go doublerait leur lecture à chaque indexation)
+    """
+    path = Path(path).resolve()
+    info = path.stat()
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(path), info.st_size, info.st_mtime_ns]).encode('utf-8'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        if info.st_size > FINGERPRINT_BLOCK_SIZE:
+            f.seek(max(FINGERPRINT_BLOCK_SIZE, info.st_size - FINGERPRINT_BLOCK_SIZE))
+            digest.update(f.read())
+    digest.update(json.dumps(params).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class IndexCheckpoint:
+    """
+    Point de reprise d'une indexation interrompue.
+
+    Enregistre le nombre de chunks de la source dont l'écriture est terminée,
+    avec l'empreinte de la source, le modèle d'embedding et la collection en
+    construction (--reset) : --resume repart du premier lot non écrit.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Charge le point de reprise.
+
+        Args:
+            path: Fichier JSON du point de reprise
+        """
+        self.path = Path(path)
+        self.state: Dict = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[WARNING] Point de reprise illisible ({self.path}): {e}")
+
+    def matches(self, source: str, embedding_model: str, build: bool) -> bool:
+        """Vérifie que le point de reprise concerne la même source et la même indexation."""
+        return (
+            self.state.get('source') == source
+            and self.state.get('embedding_model') == embedding_model
+            and self.state.get('build') == build
+        )
+
+    def save(self, source: str, embedding_model: str, build: bool, offset: int) -> None:
+        """Écrit le point de reprise (remplacement atomique du fichier)."""
+        self.state = {
+            'version': 1, 'source': source, 'embedding_model': embedding_model,
+            'build': build, 'offset': offset, 'updated_at': time.time()
+        }
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        """Supprime le point de reprise d'une indexation terminée."""
+        self.state = {}
+        if self.path.exists():
+            self.path.unlink()
+
+
 class ChunkIndexer:
     """
     Indexe les chunks RAG dans ChromaDB avec embeddings.
@@ -36,7 +394,20 @@ class ChunkIndexer:
         chroma_path: str = "./chroma_db",
         collection_name: str = "applications",
         embedding_model: str = "all-MiniLM-L6-v2",
-        reset_collection: bool = False
+        reset_collection: bool = False,
+        answer_cache_path: Optional[str] = None,
+        bm25_index: bool = True,
+        store: str = 'chroma',
+        store_dtype: str = 'float32',
+        store_dims: Optional[int] = None,
+        store_projection: str = 'truncate',
+        workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        embedding_cache_path: Optional[str] = None,
+        checkpoint_source: Optional[str] = None,
+        resume: bool = False,
+        app_index: bool = False,
+        app_router: bool = True
     ):
         """
         Initialise l'indexeur.
@@ -45,35 +416,127 @@ class ChunkIndexer:
             chroma_path: Chemin vers la base ChromaDB
             collection_name: Nom de la collection
             embedding_model: Modèle Sentence Transformers
-            reset_collection: Si True, supprime la collection existante
+            reset_collection: Si True, reconstruit la collection : elle est
+                             indexée sous un nom temporaire puis remplace
+                             l'ancienne à la fin de index_chunks
+            answer_cache_path: Fichier SQLite du cache de réponses de query-rag
+                              Les réponses construites sur des chunks dont le
+                              contenu a changé y sont purgées après indexation
+            bm25_index: Maintenir l'index lexical BM25 de la collection
+                       (utilisé par la recherche hybride de query-rag)
+            store: Backend vectoriel ('chroma' ou 'numpy', voir vector_store)
+            store_dtype: Type de stockage des embeddings du backend numpy
+                        ('float32', 'float16' ou 'int8')
+            store_dims: Nombre de dimensions stockées par le backend numpy
+                       (None = toutes)
+            store_projection: Réduction de dimension ('truncate' ou 'pca')
+            workers: Nombre de processus de calcul des embeddings
+                    (1 = calcul dans le processus courant)
+            threads_per_worker: Threads de calcul par processus
+                               (None = cœurs disponibles / workers)
+            embedding_cache_path: Répertoire du cache d'embeddings partagé entre
+                                 collections (voir embedding_cache)
+                                 Si None, tous les documents sont encodés
+            checkpoint_source: Empreinte de la source (voir source_fingerprint)
+                              Si fournie, index_chunks enregistre régulièrement
+                              un point de reprise
+            resume: Reprendre au point de reprise d'une indexation interrompue
+                   de la même source
+            app_index: Maintenir l'index des applications (un vecteur par
+                      source_id, voir app_index) utilisé par la recherche
+                      hiérarchique de query-rag
+            app_router: Maintenir la table des noms d'applications (voir
+                       app_router) utilisée par query-rag pour filtrer la
+                       recherche sur les applications citées
         """
         self.chroma_path = Path(chroma_path)
         self.chroma_path.mkdir(parents=True, exist_ok=True)
-
-        print(f"Connexion à ChromaDB: {self.chroma_path}")
-        self.client = chromadb.PersistentClient(path=str(self.chroma_path))
-
-        # Gérer la collection
-        if reset_collection:
-            try:
-                self.client.delete_collection(collection_name)
-                print(f"Collection '{collection_name}' supprimée")
-            except Exception:
-                pass
-
-        # Créer ou récupérer la collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "Chunks d'applications pour RAG"}
+        self.answer_cache_path = answer_cache_path
+
+        self.collection_name = collection_name
+        self.embedding_model_name = embedding_model
+        self.checkpoint_source = checkpoint_source
+        self.checkpoint = IndexCheckpoint(checkpoint_path(self.chroma_path, collection_name))
+        self.resume_offset = 0
+        resuming = False
+        if resume:
+            resuming = bool(checkpoint_source) and self.checkpoint.matches(
+                checkpoint_source, embedding_model, reset_collection
+            )
+            if not resuming:
+                print("[WARNING] Aucun point de reprise pour cette source et ce modèle, indexation complète")
+
+        # Avec reset, la collection est construite sous un nom temporaire et ne
+        # remplace l'ancienne qu'une fois complète (voir _swap_build)
+        self.build_name = f"{collection_name}{BUILD_SUFFIX}" if reset_collection else None
+        index_name = self.build_name or collection_name
+        clear = reset_collection and not resuming
+
+        print(f"Connexion à la base vectorielle ({store}): {self.chroma_path}")
+        options = {}
+        if store == 'numpy':
+            options = {'dtype': store_dtype, 'dims': store_dims, 'projection': store_projection}
+        self.collection = open_vector_store(
+            store, self.chroma_path, index_name,
+            create=True, reset=clear, **options
         )
+        if reset_collection:
+            print(f"Reconstruction de la collection '{collection_name}' "
+                  f"(remplacée à la fin de l'indexation)")
+
+        if resuming:
+            if self.collection.count():
+                self.resume_offset = self.checkpoint.state.get('offset', 0)
+            else:
+                print("[WARNING] Collection vide, le point de reprise est ignoré")
+
+        self.manifest = IndexManifest(manifest_path(self.chroma_path, index_name))
+        if clear:
+            self.manifest.clear()
+
+        self.bm25_index = None
+        if bm25_index:
+            self.bm25_index = BM25Index(bm25_index_path(self.chroma_path, index_name))
+            if clear:
+                self.bm25_index.clear()
+
+        self.app_router = None
+        if app_router:
+            self.app_router = AppNameRouter(app_names_path(self.chroma_path, index_name))
+            if clear:
+                self.app_router.clear()
+
+        self.app_index = None
+        if app_index:
+            self.app_index = AppIndexBuilder(store, self.chroma_path, index_name, reset=clear)
 
         print(f"Chargement du modèle d'embedding: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
+        if workers > 1:
+            self.embedding_model = EmbeddingPool(embedding_model, workers, threads_per_worker)
+            print(f"Pool de {workers} processus ({self.embedding_model.threads_per_worker} threads chacun)")
+        else:
+            self.embedding_model = SentenceTransformer(embedding_model)
+
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(embedding_cache_path)
+            self.embedding_key = EmbeddingCache.model_key(embedding_model, model_revision(self.embedding_model))
+            print(f"Cache d'embeddings: {self.embedding_cache.path}")
         print(f"Modèle chargé avec dimension: {self.embedding_model.get_sentence_embedding_dimension()}")
 
+    def close(self) -> None:
+        """Arrête les processus de calcul des embeddings et ferme le cache d'embeddings."""
+        if isinstance(self.embedding_model, EmbeddingPool):
+            self.embedding_model.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+
     def load_chunks_from_jsonl(self, jsonl_path: Path) -> List[Dict]:
         """
-        Charge les chunks depuis un fichier JSONL.
+        Charge les chunks depuis un fichier JSONL (éventuellement .gz ou .zst).
+
+        Pour les gros fichiers, préférer iter_chunks(), qui ne garde pas
+        tout le corpus en mémoire.
 
         Args:
             jsonl_path: Chemin vers le fichier JSONL
@@ -81,18 +544,8 @@ class ChunkIndexer:
         Returns:
             Liste de dictionnaires de chunks
         """
-        chunks = []
         print(f"\nChargement des chunks depuis: {jsonl_path}")
-
-        with open(jsonl_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    chunk = json.loads(line.strip())
-                    chunks.append(chunk)
-                except json.JSONDecodeError as e:
-                    print(f"Erreur ligne {line_num}: {e}")
-                    continue
-
+        chunks = list(iter_chunks_jsonl(jsonl_path))
         print(f"Chunks chargés: {len(chunks)}")
         return chunks
 
@@ -107,156 +560,548 @@ class ChunkIndexer:
             Liste de dictionnaires de chunks
         """
         print(f"\nChargement des chunks depuis: {json_path}")
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        chunks = data.get('chunks', [])
+        chunks = list(iter_chunks(json_path))
         print(f"Chunks chargés: {len(chunks)}")
         return chunks
 
     def index_chunks(
         self,
-        chunks: List[Dict],
+        chunks: Iterable[Dict],
         batch_size: int = 100,
-        show_progress: bool = True
+        show_progress: bool = True,
+        recall_report: bool = False,
+        incremental: bool = False,
+        pipeline_depth: int = 2,
+        sort_window: int = 0,
+        max_batch_tokens: Optional[int] = None
     ) -> Dict:
         """
-        Indexe les chunks dans ChromaDB avec embeddings.
+        Indexe les chunks dans la base vectorielle avec embeddings.
+
+        Les chunks sont lus au fil de l'eau et traités par lots : la mémoire
+        utilisée dépend de batch_size, pas de la taille du corpus (seuls les
+        IDs sont conservés en mode incrémental).
 
         Args:
-            chunks: Liste de chunks à indexer
+            chunks: Chunks à indexer (liste ou itérateur, voir iter_chunks)
             batch_size: Taille des lots pour l'indexation
             show_progress: Afficher la barre de progression
+            recall_report: Mesurer, sur un échantillon des chunks, le rappel des
+                          stockages compressés (float16, int8, dimensions
+                          réduites) par rapport au float32 complet
+            incremental: Ne calculer les embeddings que des chunks nouveaux ou
+                        modifiés (d'après le manifeste de la collection) et
+                        supprimer les chunks absents de la source
+            pipeline_depth: Nombre de lots dont les embeddings peuvent être
+                           calculés d'avance pendant l'écriture des précédents
+                           (0 = calcul et écriture en séquence)
+            sort_window: Nombre de chunks lus d'avance et triés par longueur
+                        avant le découpage en lots, pour limiter le remplissage
+                        des séquences courtes (0 = ordre du fichier)
+            max_batch_tokens: Taille des lots en tokens (remplissage compris)
+                             plutôt qu'en nombre de chunks (voir length_batches)
+
+        Avec checkpoint_source, un point de reprise est enregistré au plus
+        toutes les CHECKPOINT_INTERVAL secondes : nombre de chunks de la source
+        dont les lots sont écrits. Un lot en erreur n'est pas réessayé à la
+        reprise (il est compté dans errors).
+
+        Returns:
+            Statistiques d'indexation (avec added, updated, unchanged et
+            deleted en mode incrémental, resumed après une reprise)
+        """
+        batch_unit = f"{max_batch_tokens} tokens" if max_batch_tokens else str(batch_size)
+        print(f"\nIndexation des chunks (lots de {batch_unit})...")
+
+        counts = {'indexed': 0, 'errors': 0, 'total': 0}
+        changes = {'added': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        seen_ids = set()
+
+        if incremental and not self.manifest.entries and self.collection.count():
+            # Première indexation incrémentale : empreintes tirées de la collection
+            self._seed_manifest()
+
+        answer_cache = None
+        answers_invalidated = 0
+        if self.answer_cache_path and Path(self.answer_cache_path).exists():
+            answer_cache = AnswerCache(self.answer_cache_path)
+
+        cache_hits = self.embedding_cache.hits if self.embedding_cache is not None else 0
+        records = self._prepare_chunks(tqdm(chunks) if show_progress else chunks, counts)
+
+        # Reprise : les chunks déjà écrits par l'indexation interrompue sont sautés
+        resumed = self.resume_offset
+        if resumed:
+            print(f"Reprise après {resumed} chunks déjà indexés")
+            for record in itertools.islice(records, resumed):
+                if incremental:
+                    seen_ids.add(record[0])
+
+        # Échantillon d'embeddings pour ajuster l'ACP et mesurer le rappel
+        sample = None
+        needs_fit = getattr(self.collection, 'needs_fit', False)
+        if recall_report or needs_fit:
+            head = list(itertools.islice(records, PROJECTION_SAMPLE_SIZE))
+            sample = self.encode([document for _, document, _ in head])
+            if needs_fit:
+                print(f"Ajustement de l'ACP sur {len(sample)} embeddings")
+                self.collection.fit_projection(sample)
+            records = itertools.chain(head, records)
+
+        # Indexer par lots. L'écriture se fait dans un thread dédié : le lot N
+        # est écrit pendant le calcul des embeddings du lot N+1. La file bornée
+        # bloque le calcul quand l'écriture prend du retard.
+        print(f"\nGénération des embeddings et indexation...")
+        written = {'indexed': 0, 'errors': 0, 'answers_invalidated': 0, 'write_time': 0.0}
+        write_queue = None
+        writer = None
+        if pipeline_depth > 0:
+            write_queue = queue.Queue(maxsize=pipeline_depth)
+            writer = threading.Thread(
+                target=self._write_loop,
+                args=(write_queue, written, answer_cache, show_progress),
+                daemon=True
+            )
+            writer.start()
+
+        def segments():
+            # (lot, position) : nombre de chunks de la source entièrement écrits
+            # une fois le lot écrit (None au milieu d'une fenêtre triée)
+            token_limit = getattr(self.embedding_model, 'max_seq_length', None)
+            position = resumed
+            if sort_window > 0:
+                for window in batched(records, sort_window):
+                    position += len(window)
+                    batches = list(length_batches(window, batch_size, max_batch_tokens, len(window), token_limit))
+                    for i, batch in enumerate(batches, 1):
+                        yield batch, position if i == len(batches) else None
+            else:
+                for batch in length_batches(records, batch_size, max_batch_tokens, 0, token_limit):
+                    position += len(batch)
+                    yield batch, position
+
+        def pending_batches():
+            for batch_num, (batch, position) in enumerate(segments(), 1):
+                # Un ID présent plusieurs fois dans le lot : la dernière version l'emporte
+                batch = list({record[0]: record for record in batch}.values())
+
+                if incremental:
+                    seen_ids.update(record[0] for record in batch)
+                    statuses = [self.manifest.status(*record) for record in batch]
+                    for status in statuses:
+                        changes[status] += 1
+                    batch = [record for record, status in zip(batch, statuses) if status != 'unchanged']
+                    if not batch:
+                        # Lot entièrement inchangé : transmis vide pour que sa
+                        # position fasse tout de même avancer le point de reprise
+                        if position is not None:
+                            yield batch_num, [], [], [], position
+                        continue
+
+                yield (batch_num, *(list(column) for column in zip(*batch)), position)
+
+        timings = {'embedding_time': 0.0}
+        start_time = time.time()
+        self._checkpoint_time = start_time
+        try:
+            for (batch_num, batch_ids, batch_docs, batch_metas, position), embeddings in \
+                    self._embed_batches(pending_batches(), timings):
+                if isinstance(embeddings, Exception):
+                    print(f"\nErreur indexation lot {batch_num}: {embeddings}")
+                    counts['errors'] += len(batch_ids)
+                    continue
+
+                item = (batch_num, batch_ids, batch_docs, batch_metas, embeddings, position)
+                if write_queue is not None:
+                    if 'failure' in written:
+                        # Thread d'écriture arrêté : inutile de calculer la suite
+                        break
+                    write_queue.put(item)
+                else:
+                    self._write_batch(item, written, answer_cache, show_progress)
+        finally:
+            if writer is not None:
+                write_queue.put(None)
+                writer.join()
+        if 'failure' in written:
+            raise written['failure']
+
+        counts['indexed'] = written['indexed']
+        counts['errors'] += written['errors']
+        answers_invalidated += written['answers_invalidated']
+        elapsed = time.time() - start_time
+        if show_progress:
+            print(f"Embeddings: {timings['embedding_time']:.1f}s, écriture: {written['write_time']:.1f}s, "
+                  f"durée totale: {elapsed:.1f}s")
+
+        deleted = []
+        if incremental and counts['total'] == 0:
+            print("[WARNING] Source vide : aucun chunk supprimé de la collection")
+        elif incremental:
+            deleted = [chunk_id for chunk_id in self.manifest.entries if chunk_id not in seen_ids]
+            changes['deleted'] = len(deleted)
+            if deleted:
+                deleted_metas = []
+                if self.app_index is not None or self.app_router is not None:
+                    deleted_metas = self.collection.get(ids=deleted, include=['metadatas'])['metadatas']
+                if self.app_index is not None:
+                    self.app_index.remove(deleted_metas)
+                self.collection.delete(deleted)
+                if self.app_router is not None:
+                    self._prune_app_names(deleted_metas)
+                if self.bm25_index is not None:
+                    self.bm25_index.delete(deleted)
+                self.manifest.remove(deleted)
+                if answer_cache is not None:
+                    # Un chunk supprimé n'a plus d'empreinte : ses réponses sont toutes périmées
+                    answers_invalidated += answer_cache.invalidate_chunks(
+                        {chunk_id: None for chunk_id in deleted}
+                    )
+            print(f"Ajoutés: {changes['added']}, modifiés: {changes['updated']}, "
+                  f"inchangés: {changes['unchanged']}, supprimés: {changes['deleted']}")
+
+        # Reconstruire les structures de recherche (index IVF du backend numpy)
+        if counts['indexed'] or deleted:
+            self.collection.optimize()
+        self.manifest.save()
+        if self.app_router is not None:
+            self.app_router.save()
+
+        apps_updated = None
+        if self.app_index is not None:
+            # Après une reprise, les sommes des lots écrits avant l'interruption sont perdues
+            rebuild = bool(resumed) or self.app_index.index.count() == 0
+            apps_updated = self.app_index.update(self.collection, self.encode, rebuild=rebuild)
+            print(f"Index des applications: {apps_updated} applications mises à jour")
+
+        if self.build_name:
+            self._swap_build()
+        if self.checkpoint_source:
+            self.checkpoint.remove()
+
+        total = counts['total']
+        stats = {
+            'indexed': counts['indexed'],
+            'errors': counts['errors'],
+            'total': total,
+            'success_rate': ((counts['indexed'] + changes['unchanged'] + resumed) / total * 100) if total else 0
+        }
+        if incremental:
+            stats.update(changes)
+        if resumed:
+            stats['resumed'] = resumed
+        if apps_updated is not None:
+            stats['applications_updated'] = apps_updated
+
+        if self.embedding_cache is not None:
+            stats['embeddings_cached'] = self.embedding_cache.hits - cache_hits
+            print(f"Embeddings lus dans le cache: {stats['embeddings_cached']}")
+
+        if recall_report and sample is not None and len(sample) >= 20:
+            stats['recall_report'] = self._recall_report(sample)
+
+        if answer_cache is not None:
+            answer_cache.close()
+            stats['answers_invalidated'] = answers_invalidated
+            print(f"Réponses en cache invalidées: {answers_invalidated}")
+
+        print(f"\nIndexation terminée:")
+        print(f"  - Indexés: {stats['indexed']}")
+        if incremental:
+            print(f"  - Inchangés (non réindexés): {stats['unchanged']}")
+            print(f"  - Supprimés: {stats['deleted']}")
+        print(f"  - Erreurs: {stats['errors']}")
+        print(f"  - Taux de réussite: {stats['success_rate']:.1f}%")
+
+        return stats
+
+    def encode(self, texts: List[str]):
+        """
+        Calcule les embeddings de documents (cache d'embeddings consulté d'abord).
+
+        Args:
+            texts: Documents à encoder
 
         Returns:
-            Statistiques d'indexation
+            Matrice (len(texts), dim) des embeddings
+        """
+        def encode(missing):
+            return self.embedding_model.encode(missing, show_progress_bar=False, convert_to_numpy=True)
+
+        if self.embedding_cache is None:
+            return encode(texts)
+        return self.embedding_cache.encode(self.embedding_key, texts, encode)
+
+    def _embed_batches(self, batches: Iterator[Tuple], timings: Dict) -> Iterator[Tuple]:
         """
-        if not chunks:
-            print("Aucun chunk à indexer")
-            return {'indexed': 0, 'errors': 0}
+        Calcule les embeddings des lots, dans leur ordre d'arrivée.
 
-        print(f"\nIndexation de {len(chunks)} chunks...")
-        print(f"Taille des lots: {batch_size}")
+        Seuls les documents absents du cache d'embeddings sont encodés. Avec un
+        EmbeddingPool (--workers), plusieurs lots sont encodés en parallèle par
+        les processus du pool.
 
-        indexed = 0
-        errors = 0
+        Args:
+            batches: Lots (numéro, ids, documents, métadonnées)
+            timings: Compteur embedding_time mis à jour
 
-        # Préparer les chunks pour ChromaDB
-        ids = []
-        documents = []
-        metadatas = []
+        Yields:
+            (lot, embeddings) ; embeddings est l'exception levée si le calcul
+            du lot a échoué
+        """
+        cache = self.embedding_cache
+
+        def jobs():
+            for batch in batches:
+                if cache is None or not batch[2]:
+                    yield (batch, None, batch[2]), batch[2]
+                else:
+                    cached, missing = cache.lookup(self.embedding_key, batch[2])
+                    yield (batch, cached, missing), missing
+
+        for (batch, cached, missing), embeddings in self._encode_jobs(jobs(), timings):
+            if cached is not None and not isinstance(embeddings, Exception):
+                try:
+                    embeddings = cache.merge(self.embedding_key, cached, missing, embeddings)
+                except Exception as e:
+                    embeddings = e
+            yield batch, embeddings
+
+    def _encode_jobs(self, jobs: Iterator[Tuple], timings: Dict) -> Iterator[Tuple]:
+        """Encode les documents de chaque (clé, documents), localement ou dans le pool."""
+        if isinstance(self.embedding_model, EmbeddingPool):
+            results = self.embedding_model.imap(jobs)
+            while True:
+                # Temps d'attente des processus (lecture des chunks comprise)
+                wait_start = time.time()
+                result = next(results, None)
+                timings['embedding_time'] += time.time() - wait_start
+                if result is None:
+                    return
+                yield result
+
+        for key, texts in jobs:
+            if not texts:
+                yield key, None
+                continue
+            encode_start = time.time()
+            try:
+                embeddings = self.embedding_model.encode(
+                    texts,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                )
+            except Exception as e:
+                embeddings = e
+            timings['embedding_time'] += time.time() - encode_start
+            yield key, embeddings
 
-        iterator = tqdm(chunks) if show_progress else chunks
+    def _write_loop(self, write_queue: queue.Queue, written: Dict, answer_cache, show_progress: bool) -> None:
+        """
+        Écrit les lots reçus de la file jusqu'à recevoir None.
 
-        for chunk in iterator:
+        Une exception (disque plein pendant la sauvegarde du point de reprise...)
+        est rangée dans written['failure'] et relevée par index_chunks ; les
+        lots suivants sont retirés de la file sans être écrits, pour ne pas
+        bloquer le calcul des embeddings sur une file pleine.
+        """
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            if 'failure' in written:
+                continue
+            try:
+                self._write_batch(item, written, answer_cache, show_progress)
+            except Exception as e:
+                written['failure'] = e
+
+    def _write_batch(self, item: Tuple, written: Dict, answer_cache, show_progress: bool) -> None:
+        """
+        Écrit un lot d'embeddings dans la base vectorielle, l'index BM25 et le manifeste.
+
+        Args:
+            item: (numéro du lot, ids, documents, métadonnées, embeddings,
+                  position de reprise ou None) ; un lot sans ids ne fait
+                  qu'avancer le point de reprise
+            written: Compteurs indexed, errors, answers_invalidated et write_time mis à jour
+            answer_cache: AnswerCache à purger des anciennes versions des chunks (ou None)
+            show_progress: Afficher une ligne par lot
+        """
+        batch_num, batch_ids, batch_docs, batch_metas, embeddings, position = item
+        if not batch_ids:
+            # Lot entièrement inchangé (mode incrémental) : rien à écrire
+            if position is not None:
+                self._save_checkpoint(position)
+            return
+        start_time = time.time()
+        try:
+            # Ajouter à la base vectorielle (avec longueur et empreinte du
+            # contenu, lues par les statistiques sans charger les documents)
+            self.collection.add(
+                ids=batch_ids,
+                documents=batch_docs,
+                metadatas=[with_content_fields(doc, meta) for doc, meta in zip(batch_docs, batch_metas)],
+                embeddings=embeddings
+            )
+            if self.bm25_index is not None:
+                self.bm25_index.add(batch_ids, batch_docs, batch_metas)
+            if self.app_index is not None:
+                self.app_index.add(batch_ids, batch_metas, embeddings)
+            if self.app_router is not None:
+                self.app_router.add(batch_metas)
+
+            self.manifest.update(batch_ids, batch_docs, batch_metas)
+            written['indexed'] += len(batch_ids)
+
+            # Purger les réponses en cache construites sur d'anciennes versions des chunks
+            if answer_cache is not None:
+                written['answers_invalidated'] += answer_cache.invalidate_chunks({
+                    chunk_id: content_hash(document)
+                    for chunk_id, document in zip(batch_ids, batch_docs)
+                })
+
+            if show_progress:
+                print(f"Lot {batch_num}: {len(batch_ids)} chunks indexés")
+
+        except Exception as e:
+            print(f"\nErreur indexation lot {batch_num}: {e}")
+            written['errors'] += len(batch_ids)
+        finally:
+            written['write_time'] += time.time() - start_time
+
+        if position is not None:
+            self._save_checkpoint(position)
+
+    def _save_checkpoint(self, position: int) -> None:
+        """Enregistre le point de reprise, au plus toutes les CHECKPOINT_INTERVAL secondes."""
+        if not self.checkpoint_source or time.time() - self._checkpoint_time < CHECKPOINT_INTERVAL:
+            return
+        # Le manifeste est sauvegardé d'abord : il décrit au moins les chunks déjà écrits
+        self.manifest.save()
+        if self.app_router is not None:
+            self.app_router.save()
+        self.checkpoint.save(
+            self.checkpoint_source, self.embedding_model_name, self.build_name is not None, position
+        )
+        self._checkpoint_time = time.time()
+
+    def _swap_build(self) -> None:
+        """Remplace la collection par celle reconstruite avec reset (index BM25 et manifeste compris)."""
+        self.collection.replace(self.collection_name)
+        if self.bm25_index is not None:
+            target = bm25_index_path(self.chroma_path, self.collection_name)
+            self.bm25_index.close()
+            os.replace(self.bm25_index.path, target)
+            self.bm25_index = BM25Index(target)
+        if self.app_index is not None:
+            self.app_index.index.replace(app_index_name(self.collection_name))
+        if self.app_router is not None:
+            target = app_names_path(self.chroma_path, self.collection_name)
+            os.replace(self.app_router.path, target)
+            self.app_router.path = target
+        target = manifest_path(self.chroma_path, self.collection_name)
+        os.replace(self.manifest.path, target)
+        self.manifest.path = target
+        self.build_name = None
+        print(f"[OK] Collection '{self.collection_name}' remplacée par la version reconstruite")
+
+    @staticmethod
+    def _prepare_chunks(chunks: Iterable[Dict], counts: Dict) -> Iterator[Tuple[str, str, Dict]]:
+        """
+        Extrait (id, contenu, métadonnées) de chaque chunk valide.
+
+        Args:
+            chunks: Chunks bruts
+            counts: Compteurs 'total' et 'errors' mis à jour au fil de la lecture
+
+        Yields:
+            (chunk_id, contenu, métadonnées)
+        """
+        for chunk in chunks:
+            counts['total'] += 1
             try:
                 # ID du chunk
                 chunk_id = chunk.get('id', '')
                 if not chunk_id:
-                    errors += 1
+                    counts['errors'] += 1
                     continue
 
                 # Contenu textuel
                 content = chunk.get('content', '')
                 if not content:
-                    errors += 1
+                    counts['errors'] += 1
                     continue
 
                 # Métadonnées
                 metadata = chunk.get('metadata', {})
-                # Ajouter chunk_type et title au niveau racine
+                # Ajouter chunk_type, title et source_id au niveau racine
                 metadata['chunk_type'] = chunk.get('chunk_type', 'unknown')
                 metadata['title'] = chunk.get('title', '')
-
-                ids.append(chunk_id)
-                documents.append(content)
-                metadatas.append(metadata)
+                if chunk.get('source_id') is not None:
+                    metadata['source_id'] = str(chunk['source_id'])
 
             except Exception as e:
                 print(f"\nErreur préparation chunk {chunk.get('id', '?')}: {e}")
-                errors += 1
+                counts['errors'] += 1
                 continue
 
-        # Indexer par lots
-        print(f"\nGénération des embeddings et indexation...")
-        total_batches = (len(documents) + batch_size - 1) // batch_size
-
-        for i in range(0, len(documents), batch_size):
-            batch_ids = ids[i:i + batch_size]
-            batch_docs = documents[i:i + batch_size]
-            batch_metas = metadatas[i:i + batch_size]
+            yield chunk_id, content, metadata
 
-            try:
-                # Générer embeddings
-                embeddings = self.embedding_model.encode(
-                    batch_docs,
-                    show_progress_bar=False,
-                    convert_to_numpy=True
-                ).tolist()
-
-                # Ajouter à ChromaDB
-                self.collection.add(
-                    ids=batch_ids,
-                    documents=batch_docs,
-                    metadatas=batch_metas,
-                    embeddings=embeddings
-                )
-
-                indexed += len(batch_ids)
-
-                if show_progress:
-                    batch_num = (i // batch_size) + 1
-                    print(f"Lot {batch_num}/{total_batches}: {len(batch_ids)} chunks indexés")
-
-            except Exception as e:
-                print(f"\nErreur indexation lot {i//batch_size + 1}: {e}")
-                errors += len(batch_ids)
-                continue
+    def _prune_app_names(self, deleted_metas: List[Optional[Dict]]) -> None:
+        """Retire de la table des noms les applications qui n'ont plus aucun chunk."""
+        source_ids = {meta['source_id'] for meta in deleted_metas if meta and meta.get('source_id') is not None}
+        self.app_router.remove(
+            source_id for source_id in source_ids
+            if not self.collection.get(where={'source_id': source_id}, limit=1, include=['metadatas'])['ids']
+        )
 
-        stats = {
-            'indexed': indexed,
-            'errors': errors,
-            'total': len(chunks),
-            'success_rate': (indexed / len(chunks) * 100) if chunks else 0
-        }
+    def _seed_manifest(self, page_size: int = 1000) -> None:
+        """Remplit le manifeste à partir des chunks déjà présents dans la collection."""
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset)
+            if not page['ids']:
+                break
+            self.manifest.update(
+                page['ids'], page['documents'], [strip_content_fields(meta) for meta in page['metadatas']]
+            )
+            offset += len(page['ids'])
+
+    def _recall_report(self, sample) -> List[Dict]:
+        """
+        Compare le rappel@10 des stockages compressés à celui du float32 complet.
 
-        print(f"\nIndexation terminée:")
-        print(f"  - Indexés: {stats['indexed']}")
-        print(f"  - Erreurs: {stats['errors']}")
-        print(f"  - Taux de réussite: {stats['success_rate']:.1f}%")
+        Les derniers embeddings de l'échantillon servent de requêtes sur les autres.
+        """
+        n_queries = min(100, len(sample) // 10)
+        config = getattr(self.collection, 'config', {})
+        report = compression_report(
+            sample[:-n_queries], sample[-n_queries:],
+            dims=config.get('dims'),
+            projection=config.get('projection') or 'truncate'
+        )
 
-        return stats
+        print(f"\nRappel@10 par rapport au float32 complet ({len(sample) - n_queries} chunks, {n_queries} requêtes):")
+        print(f"  {'Stockage':<10} {'Dim':>5} {'Octets/vecteur':>15} {'Rappel':>8}")
+        for row in report:
+            print(f"  {row['dtype']:<10} {row['dims']:>5} {row['bytes_per_vector']:>15} {row['recall']:>8.3f}")
+        return report
 
-    def get_stats(self) -> Dict:
+    def get_stats(self, refresh: bool = False) -> Dict:
         """
-        Récupère les statistiques de la collection.
+        Récupère les statistiques de la collection, calculées sur tous ses chunks.
+
+        Args:
+            refresh: Ignorer le cache des statistiques
 
         Returns:
-            Statistiques (nombre de chunks, etc.)
+            Statistiques (voir collection_stats.compute_collection_stats)
         """
-        count = self.collection.count()
-
-        # Récupérer quelques échantillons pour analyse
-        if count > 0:
-            sample = self.collection.get(limit=min(100, count))
-            chunk_types = {}
-
-            for meta in sample['metadatas']:
-                chunk_type = meta.get('chunk_type', 'unknown')
-                chunk_types[chunk_type] = chunk_types.get(chunk_type, 0) + 1
-
-            return {
-                'total_chunks': count,
-                'collection_name': self.collection.name,
-                'chunk_types_sample': chunk_types
-            }
-        else:
-            return {
-                'total_chunks': 0,
-                'collection_name': self.collection.name,
-                'chunk_types_sample': {}
-            }
+        return collection_stats(
+            self.collection,
+            cache_path=stats_cache_path(self.chroma_path, self.collection.name),
+            refresh=refresh
+        )
 
 
 def execute(args):
@@ -266,6 +1111,10 @@ def execute(args):
     if not input_path.exists():
         print(f"❌ Fichier non trouvé: {input_path}")
         return 1
+    if chunk_file_format(input_path) is None:
+        print(f"❌ Format non supporté: {input_path.name}")
+        print("Formats acceptés: .jsonl, .json (éventuellement compressés en .gz ou .zst)")
+        return 1
 
     # Créer l'indexeur
     print("=" * 70)
@@ -277,37 +1126,48 @@ def execute(args):
             chroma_path=args.chroma_path,
             collection_name=args.collection,
             embedding_model=args.embedding_model,
-            reset_collection=args.reset
+            reset_collection=args.reset,
+            answer_cache_path=args.answer_cache,
+            bm25_index=not args.no_bm25,
+            store=args.store,
+            store_dtype=args.store_dtype,
+            store_dims=args.store_dims,
+            store_projection=args.store_projection,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            embedding_cache_path=cache_path_option(args.embed_cache, args.no_embed_cache),
+            checkpoint_source=source_fingerprint(input_path),
+            resume=args.resume,
+            app_index=args.app_index,
+            app_router=not args.no_app_router
         )
     except Exception as e:
         print(f"❌ Erreur d'initialisation: {e}")
         return 1
 
-    # Charger les chunks
+    # Lire les chunks au fil de l'indexation
+    print(f"\nLecture des chunks depuis: {input_path}")
     try:
-        if input_path.suffix == '.jsonl':
-            chunks = indexer.load_chunks_from_jsonl(input_path)
-        elif input_path.suffix == '.json':
-            chunks = indexer.load_chunks_from_json(input_path)
-        else:
-            print(f"❌ Format non supporté: {input_path.suffix}")
-            print("Formats acceptés: .jsonl, .json")
-            return 1
-    except Exception as e:
+        stats = indexer.index_chunks(
+            iter_chunks(input_path),
+            batch_size=args.batch_size,
+            show_progress=not args.no_progress,
+            recall_report=args.recall_report,
+            incremental=args.incremental,
+            pipeline_depth=args.pipeline_depth,
+            sort_window=args.sort_window,
+            max_batch_tokens=args.max_batch_tokens
+        )
+    except (OSError, ImportError, ValueError) as e:
         print(f"❌ Erreur de chargement: {e}")
         return 1
+    finally:
+        indexer.close()
 
-    if not chunks:
+    if stats['total'] == 0:
         print("❌ Aucun chunk trouvé dans le fichier")
         return 1
 
-    # Indexer
-    stats = indexer.index_chunks(
-        chunks,
-        batch_size=args.batch_size,
-        show_progress=not args.no_progress
-    )
-
     # Afficher les statistiques finales
     print("\n" + "=" * 70)
     print("STATISTIQUES DE LA COLLECTION")
@@ -317,10 +1177,15 @@ def execute(args):
     print(f"\nTotal chunks indexés: {collection_stats['total_chunks']}")
     print(f"Collection: {collection_stats['collection_name']}")
 
-    if collection_stats['chunk_types_sample']:
-        print(f"\nTypes de chunks (échantillon):")
-        for chunk_type, count in collection_stats['chunk_types_sample'].items():
+    print(f"Applications (source_id): {collection_stats['sources']}")
+
+    if collection_stats['chunk_types']:
+        print(f"\nTypes de chunks:")
+        for chunk_type, count in collection_stats['chunk_types'].items():
             print(f"  - {chunk_type}: {count}")
+    if collection_stats['duplicates']['groups']:
+        print(f"\n[WARNING] {collection_stats['duplicates']['chunks']} chunks au contenu dupliqué "
+              f"({collection_stats['duplicates']['groups']} groupes, voir dyag rag-stats)")
 
     print("\n" + "=" * 70)
     print("[OK] INDEXATION TERMINÉE")
@@ -341,7 +1206,7 @@ def register_index_rag_command(subparsers):
     parser.add_argument(
         'input',
         type=str,
-        help='Fichier JSONL ou JSON contenant les chunks'
+        help='Fichier JSONL ou JSON contenant les chunks (éventuellement compressé en .gz ou .zst)'
     )
     parser.add_argument(
         '--chroma-path',
@@ -367,11 +1232,115 @@ def register_index_rag_command(subparsers):
         default=100,
         help='Taille des lots pour indexation (défaut: 100)'
     )
+    parser.add_argument(
+        '--max-batch-tokens',
+        type=int,
+        help='Taille des lots en tokens, remplissage compris, à la place de --batch-size (ex: 16384)'
+    )
+    parser.add_argument(
+        '--sort-window',
+        type=int,
+        default=SORT_WINDOW,
+        help=f'Chunks triés par longueur avant découpage en lots, pour réduire le remplissage '
+             f'(0 = ordre du fichier, défaut: {SORT_WINDOW})'
+    )
+    parser.add_argument(
+        '--pipeline-depth',
+        type=int,
+        default=2,
+        help='Lots d\'embeddings calculés pendant l\'écriture des précédents (0 = séquentiel, défaut: 2)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Processus de calcul des embeddings, chacun avec sa copie du modèle (défaut: 1)'
+    )
+    parser.add_argument(
+        '--threads-per-worker',
+        type=int,
+        help='Threads de calcul par processus avec --workers (défaut: cœurs / workers)'
+    )
+    parser.add_argument(
+        '--embed-cache',
+        nargs='?',
+        const='',
+        metavar='DIR',
+        help='Activer le cache d\'embeddings partagé entre collections, dans DIR '
+             '(défaut: $DYAG_EMBED_CACHE ou ~/.cache/dyag/embeddings). '
+             'Désactivé par défaut, sauf si DYAG_EMBED_CACHE est défini'
+    )
+    parser.add_argument(
+        '--no-embed-cache',
+        action='store_true',
+        help='Ne pas utiliser le cache d\'embeddings, même si DYAG_EMBED_CACHE est défini'
+    )
     parser.add_argument(
         '--reset',
         action='store_true',
         help='Supprimer et recréer la collection'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Reprendre une indexation interrompue de ce fichier au premier lot non écrit'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Ne réindexer que les chunks nouveaux ou modifiés et supprimer ceux absents du fichier'
+    )
+    parser.add_argument(
+        '--answer-cache',
+        type=str,
+        help='Cache de réponses de query-rag à purger des chunks modifiés'
+    )
+    parser.add_argument(
+        '--no-bm25',
+        action='store_true',
+        help='Ne pas maintenir l\'index BM25 (recherche hybride de query-rag)'
+    )
+    parser.add_argument(
+        '--app-index',
+        action='store_true',
+        help='Maintenir l\'index des applications (un vecteur par source_id) '
+             'pour la recherche hiérarchique de query-rag'
+    )
+    parser.add_argument(
+        '--no-app-router',
+        action='store_true',
+        help='Ne pas enregistrer les noms d\'applications (filtrage de query-rag sur les applications citées)'
+    )
+    parser.add_argument(
+        '--store',
+        choices=STORE_TYPES,
+        default='chroma',
+        help='Backend vectoriel: chroma ou numpy (memmap, plus rapide à charger) (défaut: chroma)'
+    )
+    parser.add_argument(
+        '--store-dtype',
+        choices=STORE_DTYPES,
+        default='float32',
+        help='Type de stockage des embeddings du backend numpy : float16 divise la taille par 2, '
+             'int8 par 4 (défaut: float32)'
+    )
+    parser.add_argument(
+        '--store-dims',
+        type=int,
+        help='Nombre de dimensions conservées par le backend numpy (défaut: toutes)'
+    )
+    parser.add_argument(
+        '--store-projection',
+        choices=PROJECTIONS,
+        default='truncate',
+        help='Réduction de dimension avec --store-dims : truncate (modèles Matryoshka) ou pca '
+             '(défaut: truncate)'
+    )
+    parser.add_argument(
+        '--recall-report',
+        action='store_true',
+        help='Afficher le rappel des stockages compressés par rapport au float32 complet'
+    )
     parser.add_argument(
         '--no-progress',
         action='store_true',
@@ -13,7 +13,7 @@ import os
 import sys
 import io
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 import tempfile
 import time
 from datetime import datetime
@@ -30,7 +30,9 @@ from dyag.commands.prepare_rag import (
     chunk_by_size,
     validate_chunks
 )
-from dyag.commands.index_rag import ChunkIndexer
+from dyag.commands.index_rag import SORT_WINDOW, ChunkIndexer, source_fingerprint
+from dyag.embedding_cache import cache_path_option
+from dyag.vector_store import STORE_TYPES
 
 
 def markdown_to_rag_pipeline(
@@ -44,7 +46,11 @@ def markdown_to_rag_pipeline(
     reset: bool = False,
     check: bool = True,
     keep_intermediate: bool = False,
-    verbose: bool = False
+    verbose: bool = False,
+    store: str = 'chroma',
+    workers: int = 1,
+    embedding_cache_path: Optional[str] = None,
+    resume: bool = False
 ) -> Dict:
     """
     Pipeline complet : Markdown -> Chunks -> ChromaDB
@@ -61,6 +67,10 @@ def markdown_to_rag_pipeline(
         check: Valider les chunks avant indexation
         keep_intermediate: Garder les fichiers intermédiaires (JSON)
         verbose: Affichage détaillé
+        store: Backend vectoriel ('chroma' ou 'numpy')
+        workers: Processus de calcul des embeddings (1 = processus courant)
+        embedding_cache_path: Répertoire du cache d'embeddings (None = désactivé)
+        resume: Reprendre une indexation interrompue du même fichier
 
     Returns:
         Statistiques du pipeline
@@ -173,7 +183,12 @@ def markdown_to_rag_pipeline(
             chroma_path=chroma_path,
             collection_name=collection,
             embedding_model=embedding_model,
-            reset_collection=reset
+            reset_collection=reset,
+            store=store,
+            workers=workers,
+            embedding_cache_path=embedding_cache_path,
+            checkpoint_source=source_fingerprint(input_path, chunk_mode, chunk_size, chunk_overlap, check),
+            resume=resume
         )
 
         print(f"  [OK] Modele charge: {embedding_model}")
@@ -184,11 +199,15 @@ def markdown_to_rag_pipeline(
         print("-" * 80)
 
         # Indexer les chunks
-        stats = indexer.index_chunks(
-            chunks=chunks,
-            batch_size=100,
-            show_progress=True
-        )
+        try:
+            stats = indexer.index_chunks(
+                chunks=chunks,
+                batch_size=100,
+                show_progress=True,
+                sort_window=SORT_WINDOW
+            )
+        finally:
+            indexer.close()
 
         # Statistiques finales
         print()
@@ -261,7 +280,11 @@ def execute(args):
             reset=args.reset,
             check=args.check,
             keep_intermediate=args.keep_intermediate,
-            verbose=args.verbose
+            verbose=args.verbose,
+            store=args.store,
+            workers=args.workers,
+            embedding_cache_path=cache_path_option(args.embed_cache, args.no_embed_cache),
+            resume=args.resume
         )
 
         return 0 if result['success'] and result['errors'] == 0 else 1
@@ -328,6 +351,36 @@ def register_markdown_to_rag_command(subparsers):
         action='store_true',
         help='Supprimer et recreer la collection si elle existe'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Reprendre une indexation interrompue du meme fichier au premier lot non ecrit'
+    )
+    parser.add_argument(
+        '--store',
+        choices=STORE_TYPES,
+        default='chroma',
+        help='Backend vectoriel: chroma ou numpy (defaut: chroma)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Processus de calcul des embeddings (defaut: 1)'
+    )
+    parser.add_argument(
+        '--embed-cache',
+        nargs='?',
+        const='',
+        metavar='DIR',
+        help='Activer le cache d\'embeddings dans DIR (defaut: $DYAG_EMBED_CACHE ou '
+             '~/.cache/dyag/embeddings). Desactive par defaut, sauf si DYAG_EMBED_CACHE est defini'
+    )
+    parser.add_argument(
+        '--no-embed-cache',
+        action='store_true',
+        help='Ne pas utiliser le cache d\'embeddings, meme si DYAG_EMBED_CACHE est defini'
+    )
     parser.add_argument(
         '--check',
         action='store_true',
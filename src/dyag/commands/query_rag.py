@@ -14,20 +14,235 @@ if sys.platform == 'win32' and __name__ == '__main__':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-from dyag.rag_query import RAGQuerySystem
+from dyag.rag_metrics import STAGES
+from dyag.rag_server import find_server, default_server_url
+from dyag.vector_store import STORE_TYPES
 
 
-def execute(args):
-    """Exécute la commande query-rag."""
-    print("Initialisation du système RAG...")
+def parse_collections(value: str) -> list:
+    """Noms des collections d'une option --collection (séparés par des virgules)."""
+    return [name.strip() for name in value.split(',') if name.strip()]
 
-    try:
-        rag = RAGQuerySystem(
+
+def add_rag_arguments(parser) -> None:
+    """Ajoute les options de construction du RAGQuerySystem (communes à query-rag et rag-serve)."""
+    parser.add_argument(
+        '--collection',
+        type=str,
+        default='applications',
+        help='Nom de la collection ChromaDB, ou plusieurs séparées par des virgules '
+             'interrogées en parallèle (défaut: applications)'
+    )
+    parser.add_argument(
+        '--chroma-path',
+        type=str,
+        default='./chroma_db',
+        help='Chemin vers ChromaDB (défaut: ./chroma_db)'
+    )
+    parser.add_argument(
+        '--embedding-model',
+        type=str,
+        default='all-MiniLM-L6-v2',
+        help='Modèle d\'embedding (défaut: all-MiniLM-L6-v2)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=int,
+        help='Timeout en secondes pour Ollama'
+    )
+    parser.add_argument(
+        '--query-cache-size',
+        type=int,
+        default=1024,
+        help='Nombre d\'embeddings de questions gardés en cache LRU (défaut: 1024, 0 = désactivé)'
+    )
+    parser.add_argument(
+        '--query-cache',
+        type=str,
+        help='Fichier JSON de persistance du cache d\'embeddings de questions'
+    )
+    parser.add_argument(
+        '--answer-cache',
+        type=str,
+        help='Fichier SQLite du cache de réponses LLM (désactivé par défaut)'
+    )
+    parser.add_argument(
+        '--answer-cache-ttl',
+        type=float,
+        help='Durée de vie des réponses en cache, en secondes (défaut: illimitée)'
+    )
+    parser.add_argument(
+        '--semantic-cache-threshold',
+        type=float,
+        help='Réutiliser la réponse d\'une question proche si la similarité cosinus '
+             'dépasse ce seuil (ex: 0.92, désactivé par défaut)'
+    )
+    parser.add_argument(
+        '--no-hybrid',
+        action='store_true',
+        help='Recherche vectorielle seule (sans fusion avec l\'index BM25)'
+    )
+    parser.add_argument(
+        '--no-app-index',
+        action='store_true',
+        help='Chercher dans tous les chunks sans passer par l\'index des applications (index-rag --app-index)'
+    )
+    parser.add_argument(
+        '--app-candidates',
+        type=int,
+        default=20,
+        help='Applications retenues par l\'index des applications avant la recherche des chunks (défaut: 20)'
+    )
+    parser.add_argument(
+        '--no-app-router',
+        action='store_true',
+        help='Ne pas limiter la recherche aux applications nommées dans la question'
+    )
+    parser.add_argument(
+        '--rerank',
+        action='store_true',
+        help='Reclasser les chunks candidats avec un cross-encoder avant la génération'
+    )
+    parser.add_argument(
+        '--rerank-model',
+        type=str,
+        default='cross-encoder/ms-marco-MiniLM-L-6-v2',
+        help='Modèle CrossEncoder du reranking (défaut: cross-encoder/ms-marco-MiniLM-L-6-v2)'
+    )
+    parser.add_argument(
+        '--rerank-candidates',
+        type=int,
+        default=4,
+        help='Candidats récupérés avant reranking, en multiple de --n-chunks (défaut: 4)'
+    )
+    parser.add_argument(
+        '--prompt-budget',
+        type=int,
+        help='Budget du prompt en tokens : le contexte est dédoublonné puis réduit pour y tenir '
+             '(défaut: RAG_PROMPT_TOKENS, sinon illimité)'
+    )
+    parser.add_argument(
+        '--compress-context',
+        type=int,
+        metavar='TOKENS',
+        help='Ne garder du contexte que les phrases les plus proches de la question, '
+             'dans la limite de TOKENS tokens (défaut: pas de compression)'
+    )
+    parser.add_argument(
+        '--store',
+        choices=STORE_TYPES,
+        help='Backend vectoriel de la collection: chroma ou numpy (défaut: détecté automatiquement)'
+    )
+    parser.add_argument(
+        '--embed-cache',
+        type=str,
+        help='Répertoire du cache d\'embeddings partagé avec index-rag (ex: ~/.cache/dyag/embeddings)'
+    )
+
+
+def _absolute(path: Optional[str]) -> Optional[str]:
+    return str(Path(path).resolve()) if path else path
+
+
+def rag_settings(args) -> dict:
+    """
+    Options du RAGQuerySystem, hors base, collections et modèle d'embedding.
+
+    rag-serve les publie dans /health : query-rag n'utilise un serveur que
+    s'il a été lancé avec les mêmes. Les chemins sont rendus absolus pour
+    pouvoir être comparés.
+
+    Returns:
+        Arguments nommés de RAGQuerySystem (valeurs sérialisables en JSON)
+    """
+    return {
+        'timeout': args.timeout,
+        'query_cache_size': args.query_cache_size,
+        'query_cache_path': _absolute(args.query_cache),
+        'answer_cache_path': _absolute(args.answer_cache),
+        'answer_cache_ttl': args.answer_cache_ttl,
+        'semantic_cache_threshold': args.semantic_cache_threshold,
+        'hybrid_search': False if args.no_hybrid else None,
+        'rerank_model': args.rerank_model if args.rerank else None,
+        'rerank_candidates': args.rerank_candidates,
+        'prompt_budget': args.prompt_budget,
+        'store': args.store,
+        'embedding_cache_path': _absolute(args.embed_cache),
+        'app_index': False if args.no_app_index else None,
+        'app_candidates': args.app_candidates,
+        'app_router': False if args.no_app_router else None,
+        'compression_budget': args.compress_context
+    }
+
+
+def create_rag(args):
+    """Crée le RAGQuerySystem décrit par les options de add_rag_arguments."""
+    # Import différé : ChromaDB et Sentence Transformers ne sont chargés
+    # que si aucun serveur RAG n'est disponible
+    from dyag.rag_query import RAGQuerySystem
+
+    return RAGQuerySystem(
+        chroma_path=args.chroma_path,
+        collection_name=parse_collections(args.collection),
+        embedding_model=args.embedding_model,
+        **rag_settings(args)
+    )
+
+
+def answer_question(rag, question: str, args) -> dict:
+    """
+    Pose une question et affiche la réponse (en streaming si --stream).
+
+    `rag` est un RAGQuerySystem ou un RAGServerClient (même interface).
+
+    Returns:
+        Résultat complet (même format que RAGQuerySystem.ask)
+    """
+    if not args.stream:
+        result = rag.ask(question, n_chunks=args.n_chunks)
+        print(f"\n[ANSWER]")
+        print(result['answer'])
+        return result
+
+    result = None
+    for event in rag.ask_stream(question, n_chunks=args.n_chunks):
+        if event['type'] == 'sources':
+            if args.verbose:
+                print(f"[SOURCES] {', '.join(event['sources'])}")
+            print(f"\n[ANSWER]")
+        elif event['type'] == 'token':
+            print(event['content'], end='', flush=True)
+        elif event['type'] == 'done':
+            print()
+            result = event['result']
+    return result
+
+
+def connect(args):
+    """
+    Retourne un client du serveur RAG s'il sert la même base avec les mêmes
+    options, sinon un RAGQuerySystem local.
+    """
+    if not args.no_server:
+        client = find_server(
+            args.server,
             chroma_path=args.chroma_path,
-            collection_name=args.collection,
+            collection_name=','.join(parse_collections(args.collection)),
             embedding_model=args.embedding_model,
-            timeout=args.timeout
+            settings=rag_settings(args)
         )
+        if client is not None:
+            print(f"Connexion au serveur RAG: {client.url}")
+            return client
+
+    print("Initialisation du système RAG...")
+    return create_rag(args)
+
+
+def execute(args):
+    """Exécute la commande query-rag."""
+    try:
+        rag = connect(args)
     except Exception as e:
         print(f"[ERROR] Erreur d'initialisation du RAG: {e}")
         return 1
@@ -47,16 +262,34 @@ def execute(args):
         print("\n[SEARCH] Recherche en cours...")
 
         try:
-            result = rag.ask(args.query, n_chunks=args.n_chunks)
-
-            print(f"\n[ANSWER]")
-            print(result['answer'])
+            result = answer_question(rag, args.query, args)
 
             if args.verbose:
                 print(f"\n[METADATA]")
                 print(f"  - Sources: {len(result['sources'])} chunks")
                 print(f"  - Tokens: {result['tokens_used']}")
                 print(f"  - IDs: {', '.join(result['sources'][:3])}...")
+                packing = result.get('context_packing')
+                if packing:
+                    print(f"  - Contexte: {packing['tokens_after']} tokens "
+                          f"({packing['tokens_saved']} économisés, "
+                          f"{packing['chunks_dropped']} chunks écartés)")
+                    compression = packing.get('compression')
+                    if compression:
+                        print(f"  - Compression: {compression['tokens_before']} -> "
+                              f"{compression['tokens_after']} tokens (ratio {compression['ratio']:.2f}, "
+                              f"{compression['sentences_kept']}/{compression['sentences_total']} phrases)")
+                stages = [f"{stage[:-5]} {result[stage]:.3f}s" for stage in STAGES if stage in result]
+                if stages:
+                    print(f"  - Latences: {', '.join(stages)}")
+                if result.get('collection_times'):
+                    shards = [f"{name} {elapsed:.3f}s" for name, elapsed in result['collection_times'].items()]
+                    print(f"  - Recherche par collection: {', '.join(shards)}")
+                if result.get('cache_hit'):
+                    print(f"  - Réponse servie depuis le cache")
+                if result.get('semantic_cache_hit'):
+                    print(f"  - Réponse réutilisée (similarité {result['similarity']:.3f}): "
+                          f"{result['cached_question']}")
 
             return 0
 
@@ -77,10 +310,7 @@ def execute(args):
                 continue
 
             print("\n[SEARCH] Recherche en cours...")
-            result = rag.ask(question, n_chunks=args.n_chunks)
-
-            print(f"\n[ANSWER]")
-            print(result['answer'])
+            result = answer_question(rag, question, args)
 
             if args.verbose:
                 print(f"\n[METADATA]")
@@ -117,28 +347,22 @@ def register_query_rag_command(subparsers):
         help='Nombre de chunks de contexte (défaut: 5)'
     )
     parser.add_argument(
-        '--collection',
+        '--server',
         type=str,
-        default='applications',
-        help='Nom de la collection ChromaDB (défaut: applications)'
+        help=f'Adresse du serveur RAG lancé par rag-serve (défaut: $DYAG_RAG_SERVER ou '
+             f'{default_server_url()}, ou unix:///chemin/socket)'
     )
     parser.add_argument(
-        '--chroma-path',
-        type=str,
-        default='./chroma_db',
-        help='Chemin vers ChromaDB (défaut: ./chroma_db)'
-    )
-    parser.add_argument(
-        '--embedding-model',
-        type=str,
-        default='all-MiniLM-L6-v2',
-        help='Modèle d\'embedding (défaut: all-MiniLM-L6-v2)'
+        '--no-server',
+        action='store_true',
+        help='Ne pas utiliser le serveur RAG, même s\'il tourne'
     )
     parser.add_argument(
-        '--timeout',
-        type=int,
-        help='Timeout en secondes pour Ollama'
+        '--stream',
+        action='store_true',
+        help='Afficher la réponse au fil de la génération (token par token)'
     )
+    add_rag_arguments(parser)
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
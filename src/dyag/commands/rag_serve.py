@@ -0,0 +1,79 @@
+"""
+Commande de lancement du serveur RAG résident.
+
+Le serveur garde ChromaDB, le modèle d'embedding et le provider LLM chargés
+en mémoire ; query-rag l'utilise automatiquement lorsqu'il tourne.
+"""
+
+import sys
+import io
+
+# Fixer l'encodage UTF-8 pour Windows (seulement si exécuté comme script principal)
+if sys.platform == 'win32' and __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+from dyag.commands.query_rag import add_rag_arguments, create_rag, rag_settings
+from dyag.rag_server import create_server, find_server, default_server_url, DEFAULT_SERVER_URL
+
+
+def execute(args):
+    """Exécute la commande rag-serve."""
+    if args.socket:
+        url = f"unix://{args.socket}"
+    else:
+        url = args.url or default_server_url()
+
+    if find_server(url):
+        print(f"[ERROR] Un serveur RAG répond déjà sur {url}")
+        return 1
+
+    print("Initialisation du système RAG...")
+    try:
+        rag = create_rag(args)
+    except Exception as e:
+        print(f"[ERROR] Erreur d'initialisation du RAG: {e}")
+        return 1
+
+    try:
+        server = create_server(rag, url, verbose=args.verbose, settings=rag_settings(args))
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Impossible d'écouter sur {url}: {e}")
+        return 1
+
+    print(f"[OK] Serveur RAG en écoute sur {server.url} (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nArrêt du serveur RAG")
+    finally:
+        server.server_close()
+
+    return 0
+
+
+def register_rag_serve_command(subparsers):
+    """Enregistre la commande rag-serve."""
+    parser = subparsers.add_parser(
+        'rag-serve',
+        help='Lance un serveur RAG résident (modèles gardés en mémoire) utilisé par query-rag'
+    )
+
+    parser.add_argument(
+        '--url',
+        type=str,
+        help=f'Adresse d\'écoute http://hote:port (défaut: $DYAG_RAG_SERVER ou {DEFAULT_SERVER_URL})'
+    )
+    parser.add_argument(
+        '--socket',
+        type=str,
+        help='Écouter sur une socket UNIX plutôt qu\'en HTTP (ex: /tmp/dyag-rag.sock)'
+    )
+    add_rag_arguments(parser)
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Journaliser chaque requête'
+    )
+
+    parser.set_defaults(func=execute)
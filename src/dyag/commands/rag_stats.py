@@ -0,0 +1,122 @@
+"""
+Commande rag-stats : statistiques complètes d'une collection RAG.
+
+La collection est ouverte sans charger de modèle d'embedding ni de provider
+LLM, et parcourue par pages de métadonnées (voir dyag.collection_stats).
+"""
+
+import json
+import sys
+import io
+
+# Fixer l'encodage UTF-8 pour Windows (seulement si exécuté comme script principal)
+if sys.platform == 'win32' and __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+from dyag.collection_stats import collection_stats, stats_cache_path
+from dyag.vector_store import STORE_TYPES, detect_store, open_vector_store
+
+
+def print_stats(stats: dict, top: int = 10) -> None:
+    """Affiche les statistiques d'une collection."""
+    print("=" * 70)
+    print(f"COLLECTION {stats['collection_name']}")
+    print("=" * 70)
+    origin = "cache" if stats.get('cached') else f"parcours en {stats['scan_time']:.1f}s"
+    print(f"\nTotal chunks: {stats['total_chunks']} ({origin})")
+    print(f"Applications (source_id): {stats['sources']}")
+
+    print("\nTypes de chunks:")
+    for chunk_type, count in stats['chunk_types'].items():
+        print(f"  - {chunk_type}: {count}")
+
+    if stats['source_ids']:
+        print(f"\nApplications les plus découpées (top {top}):")
+        for source_id, count in list(stats['source_ids'].items())[:top]:
+            print(f"  - {source_id}: {count} chunks")
+
+    lengths = stats['content_length']
+    print(f"\nLongueur du contenu (caractères): min {lengths['min']}, médiane {lengths['p50']:.0f}, "
+          f"moyenne {lengths['mean']:.0f}, p95 {lengths['p95']:.0f}, max {lengths['max']}")
+    for bucket, count in lengths['histogram'].items():
+        print(f"  {bucket:>10}: {count}")
+
+    duplicates = stats['duplicates']
+    print(f"\nContenus dupliqués: {duplicates['chunks']} chunks en {duplicates['groups']} groupes")
+    for group in duplicates['examples'][:top]:
+        ids = ', '.join(group['ids'][:5]) + (' ...' if len(group['ids']) > 5 else '')
+        print(f"  - {len(group['ids'])} x {group['content_hash'][:12]}: {ids}")
+
+
+def execute(args):
+    """Exécute la commande rag-stats."""
+    store = args.store or detect_store(args.chroma_path, args.collection)
+    try:
+        collection = open_vector_store(store, args.chroma_path, args.collection)
+    except Exception as e:
+        print(f"❌ Collection '{args.collection}' introuvable dans {args.chroma_path}: {e}")
+        return 1
+
+    stats = collection_stats(
+        collection,
+        cache_path=stats_cache_path(args.chroma_path, collection.name),
+        page_size=args.page_size,
+        refresh=args.refresh
+    )
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        print_stats(stats, top=args.top)
+    return 0
+
+
+def register_rag_stats_command(subparsers):
+    """Enregistre la commande rag-stats."""
+    parser = subparsers.add_parser(
+        'rag-stats',
+        help='Statistiques complètes d\'une collection RAG (types, applications, longueurs, doublons)'
+    )
+
+    parser.add_argument(
+        '--chroma-path',
+        type=str,
+        default='./chroma_db',
+        help='Chemin vers la base vectorielle (défaut: ./chroma_db)'
+    )
+    parser.add_argument(
+        '--collection',
+        type=str,
+        default='applications',
+        help='Nom de la collection (défaut: applications)'
+    )
+    parser.add_argument(
+        '--store',
+        choices=STORE_TYPES,
+        help='Backend vectoriel de la collection: chroma ou numpy (défaut: détecté automatiquement)'
+    )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=1000,
+        help='Chunks lus par page lors du parcours (défaut: 1000)'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=10,
+        help='Nombre d\'applications et de groupes de doublons affichés (défaut: 10)'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Recalculer les statistiques même si la collection n\'a pas changé'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Afficher les statistiques au format JSON'
+    )
+
+    parser.set_defaults(func=execute)
@@ -0,0 +1,309 @@
+"""
+Mise en forme du contexte envoyé au LLM dans un budget de tokens.
+
+Les chunks produits par chunk_by_size (prepare_rag) se recouvrent : le
+dernier paragraphe d'un chunk est répété au début du suivant. Ce module
+supprime ces répétitions, puis fait tenir le contexte dans un budget de
+tokens en écartant les chunks les moins bien classés ou en les coupant à
+une fin de phrase.
+
+Avant cela, compress_context() peut réduire les chunks aux seules phrases
+proches de la question (compression extractive) : une section technique,
+une liste de contacts ou d'URL n'est pas envoyée au LLM pour une question
+sur l'hébergement. Le temps d'évaluation du prompt d'un LLM local (Ollama
+sur CPU) étant proportionnel à sa longueur, la réponse arrive plus vite.
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# En dessous de ce budget restant, on ne coupe pas un chunk : il est écarté
+MIN_TRIM_TOKENS = 32
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?…])\s+')
+
+# Ligne de titre Markdown, conservée en tête d'un chunk compressé
+_HEADING_RE = re.compile(r'^\s*#')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte (environ 4 caractères par token).
+
+    Args:
+        text: Texte à mesurer
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    return (len(text) + 3) // 4
+
+
+def resolve_prompt_budget(budget: Optional[int] = None) -> Optional[int]:
+    """
+    Détermine le budget de tokens du prompt.
+
+    Le contexte n'est réduit que sur demande : sans budget explicite ni
+    RAG_PROMPT_TOKENS, il est envoyé en entier. Avec Ollama, un budget
+    inférieur au contexte du modèle (num_ctx) évite la troncature
+    silencieuse du prompt.
+
+    Args:
+        budget: Budget explicite (0 = illimité). Si None, lit RAG_PROMPT_TOKENS
+               dans l'environnement
+
+    Returns:
+        Budget en tokens, ou None si illimité
+    """
+    if budget is None:
+        budget = int(os.getenv('RAG_PROMPT_TOKENS') or 0)
+    return budget or None
+
+
+def format_chunk(index: int, chunk: Dict) -> str:
+    """Met en forme un chunk pour le contexte (index à partir de 0)."""
+    return f"[Chunk {index + 1} - ID: {chunk['id']}]\n{chunk['content']}"
+
+
+def format_context(chunks: List[Dict]) -> str:
+    """
+    Construit le contexte du prompt à partir des chunks.
+
+    Args:
+        chunks: Chunks de contexte, du plus au moins pertinent
+
+    Returns:
+        Contexte prêt à être inséré dans le prompt
+    """
+    return CHUNK_SEPARATOR.join(format_chunk(i, c) for i, c in enumerate(chunks))
+
+
+def _paragraph_key(paragraph: str) -> str:
+    return ' '.join(paragraph.split()).lower()
+
+
+def trim_to_sentences(text: str, max_tokens: int) -> str:
+    """
+    Coupe un texte à la dernière fin de phrase qui tient dans le budget.
+
+    Args:
+        text: Texte à couper
+        max_tokens: Budget en tokens
+
+    Returns:
+        Début du texte (vide si même la première phrase dépasse le budget)
+    """
+    kept = ''
+    for paragraph_index, paragraph in enumerate(text.split('\n\n')):
+        prefix = '\n\n' if paragraph_index else ''
+        for sentence_index, sentence in enumerate(_SENTENCE_END_RE.split(paragraph)):
+            candidate = kept + (prefix if sentence_index == 0 else ' ') + sentence
+            if estimate_tokens(candidate.lstrip()) > max_tokens:
+                return kept.lstrip()
+            kept = candidate
+    return kept.lstrip()
+
+
+def pack_context(
+    chunks: List[Dict],
+    max_tokens: Optional[int] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Dédoublonne les chunks et les fait tenir dans un budget de tokens.
+
+    Les paragraphes déjà présents dans un chunk mieux classé sont retirés.
+    Les chunks sont ensuite ajoutés par ordre de pertinence ; le premier qui
+    dépasse le budget est coupé à une fin de phrase, les suivants sont écartés.
+
+    Args:
+        chunks: Chunks de contexte, du plus au moins pertinent
+        max_tokens: Budget du contexte en tokens (None = illimité)
+
+    Returns:
+        (chunks retenus, rapport) ; le rapport contient tokens_before,
+        tokens_after, tokens_saved, duplicates_removed, chunks_trimmed,
+        chunks_dropped et budget
+    """
+    report = {
+        'budget': max_tokens,
+        'tokens_before': estimate_tokens(format_context(chunks)),
+        'duplicates_removed': 0,
+        'chunks_trimmed': 0,
+        'chunks_dropped': 0
+    }
+
+    # 1. Retirer les paragraphes répétés (recouvrement entre chunks)
+    seen = set()
+    unique_chunks = []
+    for chunk in chunks:
+        paragraphs = []
+        for paragraph in chunk['content'].split('\n\n'):
+            key = _paragraph_key(paragraph)
+            if not key:
+                continue
+            if key in seen:
+                report['duplicates_removed'] += 1
+                continue
+            seen.add(key)
+            paragraphs.append(paragraph)
+
+        if not paragraphs:
+            report['chunks_dropped'] += 1
+            continue
+        if len(paragraphs) == len(chunk['content'].split('\n\n')):
+            unique_chunks.append(chunk)
+        else:
+            unique_chunks.append(dict(chunk, content='\n\n'.join(paragraphs)))
+
+    # 2. Faire tenir dans le budget
+    packed = []
+    used = 0
+    for position, chunk in enumerate(unique_chunks):
+        separator = estimate_tokens(CHUNK_SEPARATOR) if packed else 0
+        cost = separator + estimate_tokens(format_chunk(len(packed), chunk))
+        if max_tokens is None or used + cost <= max_tokens:
+            packed.append(chunk)
+            used += cost
+            continue
+
+        header = estimate_tokens(format_chunk(len(packed), dict(chunk, content='')))
+        remaining = max_tokens - used - separator - header
+        content = ''
+        if remaining >= MIN_TRIM_TOKENS or not packed:
+            content = trim_to_sentences(chunk['content'], remaining)
+            if not content and not packed:
+                # Jamais de contexte vide : le meilleur chunk est coupé au caractère près
+                content = chunk['content'][:max(0, remaining) * 4]
+        if content:
+            packed.append(dict(chunk, content=content))
+            report['chunks_trimmed'] += 1
+        report['chunks_dropped'] += len(unique_chunks) - position - (1 if content else 0)
+        break
+
+    report['tokens_after'] = estimate_tokens(format_context(packed))
+    report['tokens_saved'] = report['tokens_before'] - report['tokens_after']
+    return packed, report
+
+
+def split_sentences(text: str) -> List[Tuple[int, str]]:
+    """
+    Découpe un texte en unités de compression : lignes, puis phrases.
+
+    Args:
+        text: Contenu d'un chunk
+
+    Returns:
+        (numéro de ligne, phrase) des phrases non vides, dans l'ordre du texte
+    """
+    units = []
+    for line_index, line in enumerate(text.split('\n')):
+        for sentence in _SENTENCE_END_RE.split(line.strip()):
+            if sentence.strip():
+                units.append((line_index, sentence.strip()))
+    return units
+
+
+def _join_units(units: List[Tuple[int, str]]) -> str:
+    """Recolle des phrases : espace sur une même ligne, retour à la ligne sinon."""
+    text = ''
+    previous_line = None
+    for line_index, sentence in units:
+        if previous_line is not None:
+            text += ' ' if line_index == previous_line else '\n'
+        text += sentence
+        previous_line = line_index
+    return text
+
+
+def compress_context(
+    query_embedding,
+    chunks: List[Dict],
+    encode: Callable[[List[str]], np.ndarray],
+    max_tokens: int
+) -> Tuple[List[Dict], Dict]:
+    """
+    Ne garde des chunks que les phrases les plus proches de la question.
+
+    Toutes les phrases sont encodées en un seul appel, puis retenues par
+    similarité cosinus décroissante avec la question tant qu'elles tiennent
+    dans le budget (la plus proche est toujours gardée). Chaque chunk garde
+    son ID (citation des sources), ses phrases retenues dans l'ordre
+    d'origine et son titre Markdown éventuel ; un chunk sans phrase retenue
+    est écarté. Un contexte qui tient déjà dans le budget n'est pas modifié.
+
+    Args:
+        query_embedding: Embedding de la question
+        chunks: Chunks de contexte, du plus au moins pertinent
+        encode: Fonction d'encodage des phrases (même modèle que la question)
+        max_tokens: Budget des phrases retenues, en tokens
+
+    Returns:
+        (chunks compressés, rapport) ; le rapport contient tokens_before,
+        tokens_after, ratio (tokens_after / tokens_before), sentences_total,
+        sentences_kept, chunks_dropped et budget
+    """
+    tokens_before = estimate_tokens(format_context(chunks))
+    report = {
+        'budget': max_tokens,
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_before,
+        'ratio': 1.0,
+        'sentences_total': 0,
+        'sentences_kept': 0,
+        'chunks_dropped': 0
+    }
+
+    # Phrases de tous les chunks ; une phrase répétée n'est gardée qu'une fois
+    units = []
+    seen = set()
+    for chunk_index, chunk in enumerate(chunks):
+        for line_index, sentence in split_sentences(chunk['content']):
+            key = ' '.join(sentence.split()).lower()
+            if key not in seen:
+                seen.add(key)
+                units.append((chunk_index, line_index, sentence))
+    report['sentences_total'] = len(units)
+    report['sentences_kept'] = len(units)
+
+    if not units or sum(estimate_tokens(unit[2]) for unit in units) <= max_tokens:
+        return chunks, report
+
+    embeddings = np.asarray(encode([unit[2] for unit in units]), dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1) * max(float(np.linalg.norm(query)), 1e-12)
+    scores = embeddings @ query / np.maximum(norms, 1e-12)
+
+    kept = set()
+    used = 0
+    for position in np.argsort(-scores, kind='stable'):
+        cost = estimate_tokens(units[position][2])
+        # La phrase la plus proche est gardée même si elle dépasse le budget
+        if used + cost <= max_tokens or not kept:
+            kept.add(int(position))
+            used += cost
+
+    compressed = []
+    for chunk_index, chunk in enumerate(chunks):
+        selected = [
+            (line_index, sentence)
+            for position, (index, line_index, sentence) in enumerate(units)
+            if index == chunk_index and position in kept
+        ]
+        if not selected:
+            report['chunks_dropped'] += 1
+            continue
+        heading = chunk['content'].lstrip().split('\n', 1)[0].strip()
+        if _HEADING_RE.match(heading) and selected[0][1] != heading:
+            selected.insert(0, (-1, heading))
+        compressed.append(dict(chunk, content=_join_units(selected)))
+
+    report['sentences_kept'] = len(kept)
+    report['tokens_after'] = estimate_tokens(format_context(compressed))
+    report['ratio'] = report['tokens_after'] / tokens_before if tokens_before else 1.0
+    return compressed, report
@@ -0,0 +1,440 @@
+"""
+Cache persistant des embeddings de textes, partagé entre collections.
+
+Le même texte est souvent encodé plusieurs fois : à chaque --reset, dans
+chaque collection d'expérimentation, ou par markdown-to-rag avec des modes de
+découpage produisant des sections identiques. EmbeddingCache conserve les
+embeddings déjà calculés, indexés par (modèle, révision du modèle,
+sha256 du texte).
+
+Organisation du répertoire de cache :
+    index.sqlite    Index : clé -> (fichier, ligne), date du dernier accès
+    <modèle>.f32    Vecteurs float32 ajoutés à la suite (lus en memmap)
+
+Les fichiers de vecteurs ne sont jamais réécrits à l'ajout ; prune() évince
+les entrées les moins récemment utilisées puis compacte les fichiers.
+
+Le cache peut être partagé par plusieurs processus (index-rag et
+markdown-to-rag lancés en parallèle) : chaque lecture-modification-écriture
+de l'index et des fichiers de vecteurs se fait dans une transaction SQLite
+BEGIN IMMEDIATE, qui sérialise les écrivains de tous les processus.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .rag_cache import content_hash
+except ImportError:
+    from rag_cache import content_hash
+
+
+# Taille maximale par défaut du cache (2 Go)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Après dépassement de la taille maximale, le cache est réduit à cette fraction
+PRUNE_TARGET = 0.8
+
+# Attente maximale (secondes) du verrou d'écriture tenu par un autre processus
+LOCK_TIMEOUT = 120.0
+
+
+def default_cache_dir() -> Path:
+    """
+    Répertoire du cache d'embeddings.
+
+    Returns:
+        DYAG_EMBED_CACHE si défini, sinon ~/.cache/dyag/embeddings
+    """
+    if os.getenv('DYAG_EMBED_CACHE'):
+        return Path(os.environ['DYAG_EMBED_CACHE'])
+    return Path.home() / '.cache' / 'dyag' / 'embeddings'
+
+
+def cache_path_option(value: Optional[str], disabled: bool = False) -> Optional[Path]:
+    """
+    Répertoire du cache demandé par les options --embed-cache / --no-embed-cache.
+
+    Le cache est désactivé par défaut : il est activé par --embed-cache (sans
+    valeur : default_cache_dir()) ou par la variable DYAG_EMBED_CACHE.
+
+    Args:
+        value: Valeur de --embed-cache (None = option absente, '' = sans valeur)
+        disabled: --no-embed-cache
+
+    Returns:
+        Répertoire du cache, ou None si le cache n'est pas utilisé
+    """
+    if disabled:
+        return None
+    if value:
+        return Path(value)
+    if value is not None or os.getenv('DYAG_EMBED_CACHE'):
+        return default_cache_dir()
+    return None
+
+
+def parse_size(value: str) -> int:
+    """
+    Convertit une taille lisible ('500M', '2G', '1024') en octets.
+
+    Args:
+        value: Nombre éventuellement suivi de K, M ou G
+
+    Returns:
+        Taille en octets
+    """
+    value = value.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def model_revision(model) -> str:
+    """
+    Révision (commit du hub Hugging Face) d'un modèle SentenceTransformer.
+
+    Args:
+        model: Modèle chargé
+
+    Returns:
+        Identifiant de révision, ou '' s'il n'est pas disponible
+    """
+    if hasattr(model, 'model_revision'):
+        # EmbeddingPool : révision lue dans un processus du pool
+        return model.model_revision()
+    try:
+        return model[0].auto_model.config._commit_hash or ''
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return ''
+
+
+class EmbeddingCache:
+    """
+    Cache disque des embeddings, adressé par le contenu des textes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Ouvre (ou crée) le cache.
+
+        Args:
+            path: Répertoire du cache (None = default_cache_dir())
+            max_bytes: Taille des vecteurs au-delà de laquelle les entrées les
+                      moins récemment utilisées sont évincées
+        """
+        self.path = Path(path) if path else default_cache_dir()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # isolation_level=None : les transactions sont ouvertes explicitement
+        # par _transaction() avec BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            str(self.path / 'index.sqlite'),
+            timeout=LOCK_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        with self._transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS models ("
+                " model TEXT PRIMARY KEY,"
+                " file TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " rows INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " row INTEGER NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)"
+            )
+
+    @staticmethod
+    def model_key(model_name: str, revision: str = '') -> str:
+        """Clé d'un modèle : nom et révision."""
+        return f"{model_name}@{revision}" if revision else model_name
+
+    def lookup(self, model: str, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List[str]]:
+        """
+        Cherche les embeddings de textes dans le cache.
+
+        Args:
+            model: Clé du modèle (voir model_key)
+            texts: Textes à encoder
+
+        Returns:
+            (embeddings, textes manquants) : embeddings contient None pour
+            chaque texte absent du cache
+        """
+        hashes = [content_hash(text) for text in texts]
+        found: Dict[str, int] = {}
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        # La lecture des lignes et des vecteurs se fait sous le verrou
+        # d'écriture : un compactage concurrent ne peut pas les renuméroter
+        with self._transaction():
+            info = self._model_info(model)
+            if info is not None:
+                for start in range(0, len(hashes), 500):
+                    batch = hashes[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    found.update(self._conn.execute(
+                        f"SELECT text_hash, row FROM embeddings"
+                        f" WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *batch]
+                    ).fetchall())
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                        [(time.time(), model, text_hash) for text_hash in found]
+                    )
+
+            if found:
+                file_name, dim, _ = info
+                vectors = self._vectors(file_name, dim)
+                for i, text_hash in enumerate(hashes):
+                    # Une ligne absente du fichier (cache endommagé) est recalculée
+                    if text_hash in found and found[text_hash] < len(vectors):
+                        embeddings[i] = np.array(vectors[found[text_hash]])
+
+        missing = [text for text, embedding in zip(texts, embeddings) if embedding is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return embeddings, missing
+
+    def store(self, model: str, texts: Sequence[str], embeddings) -> None:
+        """
+        Ajoute des embeddings au cache.
+
+        Args:
+            model: Clé du modèle (voir model_key)
+            texts: Textes encodés
+            embeddings: Embeddings correspondants
+        """
+        if not len(texts):
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        # Un texte répété dans le lot n'est écrit qu'une fois
+        rows_by_hash = {content_hash(text): i for i, text in enumerate(texts)}
+
+        with self._transaction():
+            # Le nombre de lignes est relu sous le verrou : c'est l'offset
+            # d'ajout, y compris si un autre processus vient d'écrire
+            file_name = hashlib.sha256(model.encode('utf-8')).hexdigest()[:16] + '.f32'
+            self._conn.execute(
+                "INSERT OR IGNORE INTO models (model, file, dim, rows) VALUES (?, ?, ?, 0)",
+                (model, file_name, vectors.shape[1])
+            )
+            file_name, dim, rows = self._model_info(model)
+            if vectors.shape[1] != dim:
+                raise ValueError(f"Dimension {vectors.shape[1]} différente du cache ({dim}) pour {model}")
+
+            known = set()
+            hashes = list(rows_by_hash)
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT text_hash FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ))
+            new = [(text_hash, i) for text_hash, i in rows_by_hash.items() if text_hash not in known]
+            if not new:
+                return
+
+            # Écriture à la suite des lignes enregistrées dans l'index : une
+            # écriture interrompue avant la mise à jour de l'index est écrasée
+            data_path = self.path / file_name
+            with open(data_path, 'r+b' if data_path.exists() else 'wb') as f:
+                f.seek(rows * dim * 4)
+                f.write(vectors[[i for _, i in new]].tobytes())
+                f.truncate()
+
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO embeddings (model, text_hash, row, last_access) VALUES (?, ?, ?, ?)",
+                [(model, text_hash, rows + offset, now) for offset, (text_hash, _) in enumerate(new)]
+            )
+            self._conn.execute(
+                "UPDATE models SET rows = ? WHERE model = ?", (rows + len(new), model)
+            )
+
+        if self._file_bytes() > self.max_bytes:
+            self.prune(int(self.max_bytes * PRUNE_TARGET))
+
+    def encode(self, model: str, texts: Sequence[str], encode: Callable) -> np.ndarray:
+        """
+        Calcule les embeddings de textes en n'encodant que ceux absents du cache.
+
+        Args:
+            model: Clé du modèle (voir model_key)
+            texts: Textes à encoder
+            encode: Fonction d'encodage d'une liste de textes (ex. SentenceTransformer.encode)
+
+        Returns:
+            Matrice (len(texts), dim) des embeddings
+        """
+        embeddings, missing = self.lookup(model, texts)
+        computed = encode(missing) if missing else None
+        return self.merge(model, embeddings, missing, computed)
+
+    def merge(self, model: str, embeddings: List[Optional[np.ndarray]], missing: List[str], computed) -> np.ndarray:
+        """
+        Complète le résultat de lookup() avec les embeddings calculés et les met en cache.
+
+        Args:
+            model: Clé du modèle (voir model_key)
+            embeddings: Embeddings renvoyés par lookup()
+            missing: Textes manquants renvoyés par lookup()
+            computed: Embeddings calculés pour les textes manquants
+
+        Returns:
+            Matrice (len(embeddings), dim) des embeddings
+        """
+        if missing:
+            computed = np.asarray(computed, dtype=np.float32)
+            self.store(model, missing, computed)
+            rows = iter(computed)
+            embeddings = [embedding if embedding is not None else next(rows) for embedding in embeddings]
+        return np.vstack(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Évince les entrées les moins récemment utilisées et compacte les fichiers.
+
+        Args:
+            max_bytes: Taille cible des vecteurs (None = max_bytes du cache)
+
+        Returns:
+            Nombre d'entrées évincées
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._transaction():
+            models = self._conn.execute("SELECT model, file, dim FROM models").fetchall()
+            dims = {model: dim for model, _, dim in models}
+            live = sum(
+                count * dims[model] * 4 for model, count in self._conn.execute(
+                    "SELECT model, COUNT(*) FROM embeddings GROUP BY model"
+                )
+            )
+
+            # Entrées les plus anciennes d'abord, tous modèles confondus
+            stale = []
+            if live > max_bytes:
+                for model, text_hash in self._conn.execute(
+                    "SELECT model, text_hash FROM embeddings ORDER BY last_access ASC"
+                ):
+                    if live <= max_bytes:
+                        break
+                    stale.append((model, text_hash))
+                    live -= dims[model] * 4
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND text_hash = ?", stale
+            )
+            evicted = len(stale)
+
+            for model, file_name, dim in models:
+                self._compact(model, file_name, dim)
+        return evicted
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Emplacement, taille, entrées par modèle, hits et misses
+        """
+        with self._lock:
+            models = {
+                model: {'entries': count, 'dim': dim, 'bytes': count * dim * 4}
+                for model, dim, count in self._conn.execute(
+                    "SELECT m.model, m.dim, COUNT(e.text_hash) FROM models m"
+                    " LEFT JOIN embeddings e ON e.model = m.model GROUP BY m.model"
+                )
+            }
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'entries': sum(info['entries'] for info in models.values()),
+            'bytes': self._file_bytes(),
+            'max_bytes': self.max_bytes,
+            'models': models,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Ferme l'index SQLite."""
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Transaction BEGIN IMMEDIATE : un seul écrivain, tous threads et processus confondus."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _vectors(self, file_name: str, dim: int) -> np.ndarray:
+        """Vecteurs d'un modèle, lus en memmap."""
+        data_path = self.path / file_name
+        if not data_path.exists() or data_path.stat().st_size < dim * 4:
+            return np.empty((0, dim), dtype=np.float32)
+        vectors = np.memmap(data_path, dtype=np.float32, mode='r')
+        return vectors[:len(vectors) // dim * dim].reshape(-1, dim)
+
+    def _model_info(self, model: str) -> Optional[Tuple[str, int, int]]:
+        return self._conn.execute(
+            "SELECT file, dim, rows FROM models WHERE model = ?", (model,)
+        ).fetchone()
+
+    def _file_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.path.glob('*.f32'))
+
+    def _compact(self, model: str, file_name: str, dim: int) -> None:
+        """Réécrit le fichier d'un modèle avec ses seules entrées indexées (sous _transaction())."""
+        entries = self._conn.execute(
+            "SELECT text_hash, row FROM embeddings WHERE model = ? ORDER BY row", (model,)
+        ).fetchall()
+        data_path = self.path / file_name
+        if len(entries) == self._model_info(model)[2]:
+            return
+
+        if entries:
+            vectors = self._vectors(file_name, dim)
+            kept = np.array(vectors[[row for _, row in entries]])
+            del vectors
+            tmp_path = data_path.with_suffix('.tmp')
+            kept.tofile(tmp_path)
+            os.replace(tmp_path, data_path)
+        elif data_path.exists():
+            data_path.unlink()
+
+        self._conn.executemany(
+            "UPDATE embeddings SET row = ? WHERE model = ? AND text_hash = ?",
+            [(new_row, model, text_hash) for new_row, (text_hash, _) in enumerate(entries)]
+        )
+        self._conn.execute("UPDATE models SET rows = ? WHERE model = ?", (len(entries), model))
@@ -0,0 +1,150 @@
+"""
+Pool de processus pour le calcul des embeddings sur CPU.
+
+Un seul appel SentenceTransformer.encode n'occupe pas tous les cœurs d'une
+machine sans GPU sur des petits lots. EmbeddingPool démarre N processus qui
+chargent chacun le modèle une fois, avec un nombre de threads limité, et
+leur distribue les lots de documents. Les embeddings sont renvoyés dans
+l'ordre des lots.
+
+Le pool expose encode() et get_sentence_embedding_dimension() comme un
+SentenceTransformer, et imap() pour traiter un flux de lots en parallèle.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# Modèle chargé dans chaque processus du pool
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """Charge le modèle dans le processus, avec `threads` threads de calcul."""
+    global _worker_model
+    # Avant l'import de torch, pour que les bibliothèques BLAS/OpenMP le prennent en compte
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+
+    from sentence_transformers import SentenceTransformer
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def _dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _revision() -> str:
+    from dyag.embedding_cache import model_revision
+    return model_revision(_worker_model)
+
+
+class EmbeddingPool:
+    """
+    Processus de calcul d'embeddings partageant le même modèle.
+    """
+
+    def __init__(self, model_name: str, workers: int, threads_per_worker: Optional[int] = None):
+        """
+        Démarre le pool.
+
+        Args:
+            model_name: Modèle Sentence Transformers chargé par chaque processus
+            workers: Nombre de processus
+            threads_per_worker: Threads de calcul par processus
+                               Si None, cœurs disponibles / workers
+        """
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        # 'spawn' : un fork après le chargement de torch peut bloquer les processus
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_name, self.threads_per_worker)
+        )
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """
+        Calcule les embeddings d'un lot dans un processus du pool.
+
+        Args:
+            texts: Documents à encoder
+            **kwargs: Ignorés (compatibilité avec SentenceTransformer.encode)
+
+        Returns:
+            Matrice (len(texts), dim) des embeddings
+        """
+        return self._executor.submit(_encode, list(texts)).result()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Dimension des embeddings du modèle."""
+        return self._executor.submit(_dimension).result()
+
+    def model_revision(self) -> str:
+        """Révision du modèle chargé par les processus (voir embedding_cache.model_revision)."""
+        return self._executor.submit(_revision).result()
+
+    def imap(
+        self,
+        batches: Iterable[Tuple[Any, List[str]]],
+        prefetch: Optional[int] = None
+    ) -> Iterator[Tuple[Any, Any]]:
+        """
+        Encode un flux de lots en parallèle, en conservant leur ordre.
+
+        Args:
+            batches: Couples (clé, documents) ; la clé est renvoyée telle quelle
+            prefetch: Nombre maximal de lots en cours de calcul
+                     Si None, deux par processus
+
+        Yields:
+            (clé, embeddings) dans l'ordre des lots ; embeddings est None pour
+            un lot vide, l'exception levée par le processus si le calcul du
+            lot a échoué
+        """
+        prefetch = prefetch or self.workers * 2
+        pending = deque()
+
+        def result(key, future):
+            try:
+                return key, future.result()
+            except Exception as e:
+                return key, e
+
+        for key, texts in batches:
+            if texts:
+                future = self._executor.submit(_encode, list(texts))
+            else:
+                future = Future()
+                future.set_result(None)
+            pending.append((key, future))
+            if len(pending) >= prefetch:
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+
+    def close(self) -> None:
+        """Arrête les processus du pool."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,337 @@
+"""
+Recherche lexicale BM25 pour le système RAG.
+
+La recherche vectorielle seule rate souvent les noms exacts d'applications,
+les sigles et les identifiants (GIDAF, MYGUSI, source_id numériques). Ce
+module fournit un index inversé BM25 persistant (SQLite), stocké à côté de
+la collection ChromaDB et mis à jour par ChunkIndexer, ainsi que la fusion
+des classements par Reciprocal Rank Fusion (RRF).
+"""
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Mots vides français (sans accents, comme les termes de tokenize) : ignorés
+# dans les questions, leurs postings couvrent presque tout le corpus
+FRENCH_STOPWORDS = frozenset({
+    'a', 'afin', 'ai', 'au', 'aux', 'avec', 'c', 'ce', 'ces', 'cet', 'cette', 'comment', 'd', 'dans', 'de',
+    'des', 'du', 'elle', 'elles', 'en', 'est', 'et', 'etre', 'il', 'ils', 'j', 'je', 'l', 'la', 'le', 'les',
+    'leur', 'leurs', 'lui', 'm', 'ma', 'mais', 'me', 'mes', 'mon', 'n', 'ne', 'nos', 'notre', 'nous', 'on',
+    'ont', 'ou', 'par', 'pas', 'pour', 'qu', 'quand', 'que', 'quel', 'quelle', 'quelles', 'quels', 'qui',
+    's', 'sa', 'se', 'ses', 'son', 'sont', 'sur', 'ta', 'te', 'tes', 'ton', 'tu', 'un', 'une', 'vos',
+    'votre', 'vous', 'y'
+})
+
+# Un terme présent dans plus de cette fraction des chunks est ignoré dans les
+# questions ("application" dans un parc d'applications)
+MAX_DOC_FREQ_RATIO = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Découpe un texte en termes pour l'index BM25.
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        Termes en minuscules, sans accents
+    """
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def bm25_index_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Emplacement de l'index BM25 d'une collection.
+
+    Args:
+        chroma_path: Chemin vers la base ChromaDB
+        collection_name: Nom de la collection
+
+    Returns:
+        Fichier SQLite de l'index
+    """
+    return Path(chroma_path) / f"{collection_name}.bm25.sqlite3"
+
+
+def matches_filter(metadata: Dict, where: Optional[Dict]) -> bool:
+    """
+    Évalue un filtre de métadonnées au format ChromaDB (where).
+
+    Opérateurs supportés: égalité simple, $eq, $ne, $in, $nin, $gt, $gte,
+    $lt, $lte, $and, $or.
+
+    Args:
+        metadata: Métadonnées du chunk
+        where: Filtre ChromaDB (None = pas de filtre)
+
+    Returns:
+        True si le chunk satisfait le filtre
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, c) for c in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, expected in condition.items():
+                if not _compare(value, operator, expected):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+def _compare(value, operator: str, expected) -> bool:
+    if operator == '$eq':
+        return value == expected
+    if operator == '$ne':
+        return value != expected
+    if operator == '$in':
+        return value in expected
+    if operator == '$nin':
+        return value not in expected
+    if value is None:
+        return False
+    if operator == '$gt':
+        return value > expected
+    if operator == '$gte':
+        return value >= expected
+    if operator == '$lt':
+        return value < expected
+    if operator == '$lte':
+        return value <= expected
+    raise ValueError(f"Opérateur de filtre non supporté: {operator}")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fusionne plusieurs classements par Reciprocal Rank Fusion.
+
+    Le score d'un document est la somme de 1 / (k + rang) sur les
+    classements où il apparaît.
+
+    Args:
+        rankings: Classements d'IDs, du plus au moins pertinent
+        k: Constante d'amortissement (60 dans l'article d'origine)
+
+    Returns:
+        (id, score) triés par score décroissant
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Index inversé BM25 persistant (SQLite).
+
+    Chaque chunk est stocké avec sa longueur (en termes) et ses métadonnées ;
+    les postings (terme, chunk, fréquence) sont indexés par terme, si bien
+    qu'une recherche ne lit que les postings des termes de la question. Les
+    mots vides et les termes présents dans plus de max_df_ratio des chunks
+    sont écartés avant cette lecture.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75, max_df_ratio: float = MAX_DOC_FREQ_RATIO):
+        """
+        Ouvre (ou crée) l'index.
+
+        Args:
+            path: Fichier SQLite de l'index
+            k1: Saturation de la fréquence des termes
+            b: Normalisation par la longueur du chunk
+            max_df_ratio: Fraction des chunks au-delà de laquelle un terme de
+                         la question est ignoré (1 = aucun terme ignoré)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " chunk_id TEXT PRIMARY KEY,"
+                " length INTEGER NOT NULL,"
+                " metadata TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL,"
+                " chunk_id TEXT NOT NULL,"
+                " tf INTEGER NOT NULL,"
+                " PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id)"
+            )
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict]] = None
+    ) -> None:
+        """
+        Ajoute (ou remplace) des chunks dans l'index.
+
+        Args:
+            ids: IDs des chunks
+            documents: Contenus des chunks
+            metadatas: Métadonnées des chunks (pour les filtres)
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock, self._conn:
+            self._delete(ids)
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                terms = Counter(tokenize(document))
+                self._conn.execute(
+                    "INSERT INTO docs (chunk_id, length, metadata) VALUES (?, ?, ?)",
+                    (chunk_id, sum(terms.values()), json.dumps(metadata or {}, ensure_ascii=False))
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in terms.items()]
+                )
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Supprime des chunks de l'index.
+
+        Args:
+            ids: IDs des chunks
+        """
+        with self._lock, self._conn:
+            self._delete(ids)
+
+    def clear(self) -> None:
+        """Vide l'index."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM postings")
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Recherche les chunks les plus pertinents au sens de BM25.
+
+        Args:
+            query: Question en langage naturel
+            n_results: Nombre de chunks à retourner
+            where: Filtre de métadonnées au format ChromaDB
+
+        Returns:
+            (chunk_id, score) triés par score décroissant
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term not in FRENCH_STOPWORDS]
+        if not terms:
+            return []
+
+        with self._lock:
+            total, avg_length = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM docs"
+            ).fetchone()
+            if not total:
+                return []
+
+            # Fréquences documentaires lues dans l'index (term, chunk_id), sans
+            # parcourir les postings : les termes trop fréquents sont écartés,
+            # sauf le plus rare si la question n'en contient pas d'autre
+            placeholders = ','.join('?' * len(terms))
+            doc_freq = dict(self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term",
+                terms
+            ).fetchall())
+            if not doc_freq:
+                return []
+            terms = [term for term in doc_freq if doc_freq[term] <= self.max_df_ratio * total]
+            if not terms:
+                terms = [min(doc_freq, key=doc_freq.get)]
+
+            placeholders = ','.join('?' * len(terms))
+            rows = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, d.length FROM postings p"
+                f" JOIN docs d ON d.chunk_id = p.chunk_id"
+                f" WHERE p.term IN ({placeholders})",
+                terms
+            ).fetchall()
+
+        scores: Dict[str, float] = {}
+        for term, chunk_id, tf, length in rows:
+            idf = math.log(1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not where:
+            return ranked[:n_results]
+
+        results = []
+        for chunk_id, metadata in self._iter_metadata(chunk_id for chunk_id, _ in ranked):
+            if matches_filter(metadata, where):
+                results.append((chunk_id, scores[chunk_id]))
+                if len(results) == n_results:
+                    break
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        """Ferme la connexion SQLite."""
+        self._conn.close()
+
+    def _iter_metadata(self, ids: Iterable[str], batch_size: int = 500):
+        """Produit (chunk_id, métadonnées) en conservant l'ordre des IDs."""
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            placeholders = ','.join('?' * len(batch))
+            with self._lock:
+                rows = dict(self._conn.execute(
+                    f"SELECT chunk_id, metadata FROM docs WHERE chunk_id IN ({placeholders})",
+                    batch
+                ).fetchall())
+            for chunk_id in batch:
+                yield chunk_id, json.loads(rows[chunk_id])
+
+    def _delete(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            self._conn.execute(f"DELETE FROM docs WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
@@ -5,7 +5,8 @@ Ce module permet d'utiliser différents fournisseurs LLM de manière uniforme.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterator
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -54,6 +55,34 @@ class LLMProvider(ABC):
         """
         pass
 
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Iterator[str]:
+        """
+        Génère une réponse de chat token par token.
+
+        Les fragments de texte sont produits au fil de la génération. La
+        valeur de retour du générateur (StopIteration.value, ou le résultat
+        de `yield from`) est le dict complet au format de chat_completion.
+
+        L'implémentation par défaut ne streame pas : elle appelle
+        chat_completion et produit la réponse en un seul fragment.
+
+        Args:
+            messages: Liste de messages [{"role": "system|user|assistant", "content": "..."}]
+            temperature: Créativité (0=précis, 1=créatif)
+            max_tokens: Longueur max de la réponse
+
+        Yields:
+            Fragments de texte de la réponse
+        """
+        response = self.chat_completion(messages, temperature=temperature, max_tokens=max_tokens)
+        yield response['content']
+        return response
+
     @abstractmethod
     def get_model_name(self) -> str:
         """Retourne le nom du modèle utilisé."""
@@ -104,11 +133,149 @@ class OpenAIProvider(LLMProvider):
             }
         }
 
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Iterator[str]:
+        """Génère une réponse en streaming via OpenAI."""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+
+        parts = []
+        usage = None
+        for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            if getattr(chunk, 'usage', None):
+                usage = chunk.usage
+
+        return {
+            'content': ''.join(parts),
+            'usage': {
+                'prompt_tokens': usage.prompt_tokens if usage else 0,
+                'completion_tokens': usage.completion_tokens if usage else 0,
+                'total_tokens': usage.total_tokens if usage else 0
+            }
+        }
+
     def get_model_name(self) -> str:
         """Retourne le nom du modèle."""
         return f"openai/{self.model}"
 
 
+def ollama_generate_payload(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    stream: bool = False
+) -> Dict:
+    """
+    Construit le corps de requête /api/generate d'Ollama à partir de messages chat.
+
+    Args:
+        model: Nom du modèle Ollama
+        messages: Liste de messages [{"role": "...", "content": "..."}]
+        temperature: Créativité (0=précis, 1=créatif)
+        max_tokens: Longueur max de la réponse
+        stream: Réponse en flux (NDJSON) ou en un seul bloc
+
+    Returns:
+        Corps JSON de la requête
+    """
+    # Ollama utilise une API compatible OpenAI
+    # Construire le prompt à partir des messages
+    prompt_parts = []
+    for msg in messages:
+        role = msg['role']
+        content = msg['content']
+        if role == 'system':
+            prompt_parts.append(f"System: {content}")
+        elif role == 'user':
+            prompt_parts.append(f"User: {content}")
+        elif role == 'assistant':
+            prompt_parts.append(f"Assistant: {content}")
+
+    prompt = "\n\n".join(prompt_parts) + "\n\nAssistant:"
+
+    return {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "options": {
+            "temperature": temperature,
+            "num_predict": max_tokens
+        }
+    }
+
+
+def parse_ollama_response(result: Dict) -> Dict:
+    """Convertit une réponse /api/generate d'Ollama au format commun des providers."""
+    # Ollama ne fournit pas toujours les tokens détaillés
+    prompt_tokens = result.get('prompt_eval_count', 0)
+    completion_tokens = result.get('eval_count', 0)
+
+    return {
+        'content': result['response'].strip(),
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def ollama_timeout_error(model: str, timeout: int) -> TimeoutError:
+    """Erreur explicite levée quand Ollama dépasse le timeout."""
+    return TimeoutError(
+        f"Le modele Ollama '{model}' a mis trop de temps a repondre (timeout: {timeout}s). "
+        f"Solutions: "
+        f"1) Augmentez le timeout (--timeout ou OLLAMA_TIMEOUT dans .env), "
+        f"2) Utilisez un modele plus leger (llama3.2:1b), "
+        f"3) Reduisez le nombre de chunks dans la question RAG, "
+        f"4) Utilisez un provider cloud (OpenAI/Anthropic)"
+    )
+
+
+def ollama_connection_error(base_url: str, error: Exception) -> ConnectionError:
+    """Erreur explicite levée quand Ollama n'est pas joignable."""
+    return ConnectionError(
+        f"Impossible de se connecter a Ollama sur {base_url}. "
+        f"Verifiez que Ollama est en cours d'execution: 'ollama serve'. "
+        f"Erreur: {error}"
+    )
+
+
+def split_system_message(messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    Sépare le prompt système des autres messages (format attendu par Anthropic).
+
+    Returns:
+        (prompt système ou None, messages user/assistant)
+    """
+    system_message = None
+    user_messages = []
+
+    for msg in messages:
+        if msg['role'] == 'system':
+            system_message = msg['content']
+        else:
+            user_messages.append(msg)
+
+    return system_message, user_messages
+
+
 class OllamaProvider(LLMProvider):
     """Provider pour Ollama (modèles locaux gratuits : LLaMA, Mistral, etc.)."""
 
@@ -146,74 +313,77 @@ class OllamaProvider(LLMProvider):
         max_tokens: int = 1000
     ) -> Dict:
         """Génère une réponse via Ollama."""
-        # Ollama utilise une API compatible OpenAI
-        # Construire le prompt à partir des messages
-        prompt_parts = []
-        for msg in messages:
-            role = msg['role']
-            content = msg['content']
-            if role == 'system':
-                prompt_parts.append(f"System: {content}")
-            elif role == 'user':
-                prompt_parts.append(f"User: {content}")
-            elif role == 'assistant':
-                prompt_parts.append(f"Assistant: {content}")
-
-        prompt = "\n\n".join(prompt_parts) + "\n\nAssistant:"
-
         try:
             # Appel à l'API Ollama
             response = self.requests.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens
-                    }
-                },
+                json=ollama_generate_payload(self.model, messages, temperature, max_tokens),
                 timeout=self.timeout
             )
 
             if response.status_code != 200:
                 raise Exception(f"Erreur Ollama: {response.text}")
 
-            result = response.json()
-
-            # Ollama ne fournit pas toujours les tokens détaillés
-            prompt_tokens = result.get('prompt_eval_count', 0)
-            completion_tokens = result.get('eval_count', 0)
-
-            return {
-                'content': result['response'].strip(),
-                'usage': {
-                    'prompt_tokens': prompt_tokens,
-                    'completion_tokens': completion_tokens,
-                    'total_tokens': prompt_tokens + completion_tokens
-                }
-            }
+            return parse_ollama_response(response.json())
 
         except self.requests.exceptions.Timeout:
-            raise TimeoutError(
-                f"Le modele Ollama '{self.model}' a mis trop de temps a repondre (timeout: {self.timeout}s). "
-                f"Solutions: "
-                f"1) Augmentez le timeout (--timeout ou OLLAMA_TIMEOUT dans .env), "
-                f"2) Utilisez un modele plus leger (llama3.2:1b), "
-                f"3) Reduisez le nombre de chunks dans la question RAG, "
-                f"4) Utilisez un provider cloud (OpenAI/Anthropic)"
-            )
+            raise ollama_timeout_error(self.model, self.timeout)
         except self.requests.exceptions.ConnectionError as e:
-            raise ConnectionError(
-                f"Impossible de se connecter a Ollama sur {self.base_url}. "
-                f"Verifiez que Ollama est en cours d'execution: 'ollama serve'. "
-                f"Erreur: {e}"
-            )
+            raise ollama_connection_error(self.base_url, e)
         except Exception as e:
             # Pour toute autre erreur, propager avec contexte
             raise Exception(f"Erreur lors de l'appel a Ollama: {e}")
 
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Iterator[str]:
+        """Génère une réponse en streaming via Ollama (NDJSON)."""
+        try:
+            response = self.requests.post(
+                f"{self.base_url}/api/generate",
+                json=ollama_generate_payload(
+                    self.model, messages, temperature, max_tokens, stream=True
+                ),
+                timeout=self.timeout,
+                stream=True
+            )
+        except self.requests.exceptions.Timeout:
+            raise ollama_timeout_error(self.model, self.timeout)
+        except self.requests.exceptions.ConnectionError as e:
+            raise ollama_connection_error(self.base_url, e)
+
+        if response.status_code != 200:
+            raise Exception(f"Erreur lors de l'appel a Ollama: Erreur Ollama: {response.text}")
+
+        parts = []
+        final = {}
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                fragment = event.get('response', '')
+                if fragment:
+                    # Ne pas émettre les espaces initiaux (cohérent avec chat_completion)
+                    if not parts:
+                        fragment = fragment.lstrip()
+                    if fragment:
+                        parts.append(fragment)
+                        yield fragment
+                if event.get('done'):
+                    final = event
+                    break
+        except self.requests.exceptions.Timeout:
+            raise ollama_timeout_error(self.model, self.timeout)
+        finally:
+            response.close()
+
+        final['response'] = ''.join(parts)
+        return parse_ollama_response(final)
+
     def get_model_name(self) -> str:
         """Retourne le nom du modèle."""
         return f"ollama/{self.model}"
@@ -243,14 +413,7 @@ class AnthropicProvider(LLMProvider):
     ) -> Dict:
         """Génère une réponse via Anthropic Claude."""
         # Anthropic nécessite de séparer le system prompt
-        system_message = None
-        user_messages = []
-
-        for msg in messages:
-            if msg['role'] == 'system':
-                system_message = msg['content']
-            else:
-                user_messages.append(msg)
+        system_message, user_messages = split_system_message(messages)
 
         # Appel à l'API Anthropic
         kwargs = {
@@ -274,10 +437,272 @@ class AnthropicProvider(LLMProvider):
             }
         }
 
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Iterator[str]:
+        """Génère une réponse en streaming via Anthropic Claude."""
+        system_message, user_messages = split_system_message(messages)
+
+        kwargs = {
+            'model': self.model,
+            'messages': user_messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+
+        if system_message:
+            kwargs['system'] = system_message
+
+        parts = []
+        with self.client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                parts.append(text)
+                yield text
+            final = stream.get_final_message()
+
+        return {
+            'content': ''.join(parts),
+            'usage': {
+                'prompt_tokens': final.usage.input_tokens,
+                'completion_tokens': final.usage.output_tokens,
+                'total_tokens': final.usage.input_tokens + final.usage.output_tokens
+            }
+        }
+
+    def get_model_name(self) -> str:
+        """Retourne le nom du modèle."""
+        return f"anthropic/{self.model}"
+
+
+class AsyncLLMProvider(ABC):
+    """
+    Classe abstraite pour les providers LLM asynchrones (asyncio).
+
+    Même contrat que LLMProvider, mais chat_completion est une coroutine :
+    un seul processus peut ainsi avoir plusieurs générations en cours.
+    """
+
+    @abstractmethod
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Dict:
+        """
+        Génère une réponse de chat sans bloquer la boucle d'événements.
+
+        Returns:
+            Même format que LLMProvider.chat_completion
+        """
+        pass
+
+    @abstractmethod
+    def get_model_name(self) -> str:
+        """Retourne le nom du modèle utilisé."""
+        pass
+
+    async def aclose(self) -> None:
+        """Libère les connexions HTTP du provider."""
+        pass
+
+
+class AsyncOpenAIProvider(AsyncLLMProvider):
+    """Provider asynchrone pour OpenAI et API compatibles."""
+
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", base_url: str = None):
+        """
+        Initialise le provider OpenAI asynchrone.
+
+        Args:
+            api_key: Clé API OpenAI (ou Scaleway, etc.)
+            model: Nom du modèle
+            base_url: URL de base pour l'API (optionnel)
+        """
+        from openai import AsyncOpenAI
+
+        if base_url:
+            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        else:
+            self.client = AsyncOpenAI(api_key=api_key)
+        self.model = model
+        self.base_url = base_url
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Dict:
+        """Génère une réponse via OpenAI."""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+        return {
+            'content': response.choices[0].message.content,
+            'usage': {
+                'prompt_tokens': response.usage.prompt_tokens,
+                'completion_tokens': response.usage.completion_tokens,
+                'total_tokens': response.usage.total_tokens
+            }
+        }
+
+    def get_model_name(self) -> str:
+        """Retourne le nom du modèle."""
+        return f"openai/{self.model}"
+
+    async def aclose(self) -> None:
+        """Ferme le client HTTP."""
+        await self.client.close()
+
+
+class AsyncOllamaProvider(AsyncLLMProvider):
+    """
+    Provider asynchrone pour Ollama.
+
+    Utilise httpx (installé avec les SDK openai/anthropic). Sans httpx,
+    les appels requests sont exécutés dans un thread pour ne pas bloquer
+    la boucle d'événements.
+    """
+
+    def __init__(self, model: str = "llama3.2", base_url: str = "http://localhost:11434", timeout: int = None):
+        """
+        Initialise le provider Ollama asynchrone.
+
+        Contrairement à OllamaProvider, la disponibilité du serveur n'est pas
+        vérifiée à l'initialisation : une erreur de connexion est levée au
+        premier appel.
+
+        Args:
+            model: Nom du modèle Ollama
+            base_url: URL de l'API Ollama (par défaut: http://localhost:11434)
+            timeout: Timeout en secondes pour les requêtes (par défaut: 300s)
+        """
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout if timeout is not None else int(os.getenv('OLLAMA_TIMEOUT', '300'))
+
+        try:
+            import httpx
+            self.httpx = httpx
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+        except ImportError:
+            import requests
+            self.httpx = None
+            self.client = None
+            self.requests = requests
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Dict:
+        """Génère une réponse via Ollama."""
+        payload = ollama_generate_payload(self.model, messages, temperature, max_tokens)
+        url = f"{self.base_url}/api/generate"
+
+        if self.client is None:
+            import asyncio
+            return await asyncio.to_thread(self._post_blocking, url, payload)
+
+        try:
+            response = await self.client.post(url, json=payload)
+        except self.httpx.TimeoutException:
+            raise ollama_timeout_error(self.model, self.timeout)
+        except self.httpx.ConnectError as e:
+            raise ollama_connection_error(self.base_url, e)
+
+        if response.status_code != 200:
+            raise Exception(f"Erreur lors de l'appel a Ollama: Erreur Ollama: {response.text}")
+
+        return parse_ollama_response(response.json())
+
+    def _post_blocking(self, url: str, payload: Dict) -> Dict:
+        """Appel requests synchrone (repli quand httpx n'est pas installé)."""
+        try:
+            response = self.requests.post(url, json=payload, timeout=self.timeout)
+        except self.requests.exceptions.Timeout:
+            raise ollama_timeout_error(self.model, self.timeout)
+        except self.requests.exceptions.ConnectionError as e:
+            raise ollama_connection_error(self.base_url, e)
+
+        if response.status_code != 200:
+            raise Exception(f"Erreur lors de l'appel a Ollama: Erreur Ollama: {response.text}")
+
+        return parse_ollama_response(response.json())
+
+    def get_model_name(self) -> str:
+        """Retourne le nom du modèle."""
+        return f"ollama/{self.model}"
+
+    async def aclose(self) -> None:
+        """Ferme le client HTTP."""
+        if self.client is not None:
+            await self.client.aclose()
+
+
+class AsyncAnthropicProvider(AsyncLLMProvider):
+    """Provider asynchrone pour Anthropic Claude."""
+
+    def __init__(self, api_key: str, model: str = "claude-3-5-sonnet-20241022"):
+        """
+        Initialise le provider Anthropic asynchrone.
+
+        Args:
+            api_key: Clé API Anthropic
+            model: Nom du modèle
+        """
+        from anthropic import AsyncAnthropic
+
+        self.client = AsyncAnthropic(api_key=api_key)
+        self.model = model
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> Dict:
+        """Génère une réponse via Anthropic Claude."""
+        system_message, user_messages = split_system_message(messages)
+
+        kwargs = {
+            'model': self.model,
+            'messages': user_messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+
+        if system_message:
+            kwargs['system'] = system_message
+
+        response = await self.client.messages.create(**kwargs)
+
+        return {
+            'content': response.content[0].text,
+            'usage': {
+                'prompt_tokens': response.usage.input_tokens,
+                'completion_tokens': response.usage.output_tokens,
+                'total_tokens': response.usage.input_tokens + response.usage.output_tokens
+            }
+        }
+
     def get_model_name(self) -> str:
         """Retourne le nom du modèle."""
         return f"anthropic/{self.model}"
 
+    async def aclose(self) -> None:
+        """Ferme le client HTTP."""
+        await self.client.close()
+
 
 class LLMProviderFactory:
     """
@@ -328,6 +753,57 @@ class LLMProviderFactory:
             >>> # Spécifier Ollama avec timeout custom
             >>> provider = LLMProviderFactory.create_provider('ollama', timeout=600)
         """
+        return LLMProviderFactory._create(
+            provider, model, api_key, timeout,
+            classes={
+                'ollama': OllamaProvider,
+                'openai': OpenAIProvider,
+                'anthropic': AnthropicProvider
+            }
+        )
+
+    @staticmethod
+    def create_async_provider(
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[int] = None
+    ) -> 'AsyncLLMProvider':
+        """
+        Crée un provider LLM asynchrone (même configuration que create_provider).
+
+        Args:
+            provider: Nom du provider ('openai', 'anthropic', 'claude', 'ollama')
+                     Si None, détecté automatiquement depuis les variables d'env
+            model: Nom du modèle spécifique
+            api_key: Clé API
+            timeout: Timeout en secondes (uniquement pour Ollama)
+
+        Returns:
+            Instance de AsyncLLMProvider
+
+        Example:
+            >>> provider = LLMProviderFactory.create_async_provider('ollama')
+            >>> result = await provider.chat_completion(messages)
+        """
+        return LLMProviderFactory._create(
+            provider, model, api_key, timeout,
+            classes={
+                'ollama': AsyncOllamaProvider,
+                'openai': AsyncOpenAIProvider,
+                'anthropic': AsyncAnthropicProvider
+            }
+        )
+
+    @staticmethod
+    def _create(
+        provider: Optional[str],
+        model: Optional[str],
+        api_key: Optional[str],
+        timeout: Optional[int],
+        classes: Dict[str, type]
+    ):
+        """Résout la configuration du provider et instancie la classe correspondante."""
         # Auto-détection du provider si non spécifié
         if provider is None:
             # D'abord vérifier la variable LLM_PROVIDER
@@ -350,7 +826,7 @@ class LLMProviderFactory:
         if provider == 'ollama':
             model = model or os.getenv('LLM_MODEL', 'llama3.2')
             base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-            return OllamaProvider(model=model, base_url=base_url, timeout=timeout)
+            return classes['ollama'](model=model, base_url=base_url, timeout=timeout)
 
         elif provider == 'openai':
             api_key = api_key or os.getenv('OPENAI_API_KEY')
@@ -362,7 +838,7 @@ class LLMProviderFactory:
 
             model = model or os.getenv('LLM_MODEL', 'gpt-4o-mini')
             base_url = os.getenv('OPENAI_BASE_URL')  # Support pour Scaleway AI, etc.
-            return OpenAIProvider(api_key=api_key, model=model, base_url=base_url)
+            return classes['openai'](api_key=api_key, model=model, base_url=base_url)
 
         elif provider in ['anthropic', 'claude']:
             api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
@@ -373,7 +849,7 @@ class LLMProviderFactory:
                 )
 
             model = model or os.getenv('LLM_MODEL', 'claude-3-5-sonnet-20241022')
-            return AnthropicProvider(api_key=api_key, model=model)
+            return classes['anthropic'](api_key=api_key, model=model)
 
         else:
             raise ValueError(
@@ -36,6 +36,8 @@ from dyag.commands import (
     register_compare_rag_command,
     register_index_rag_command,
     register_query_rag_command,
+    register_rag_serve_command,
+    register_embed_cache_command,
     register_markdown_to_rag_command,
     register_test_rag_command,
     register_rag_stats_command,
@@ -110,6 +112,8 @@ def create_parser():
     register_compare_rag_command(subparsers)
     register_index_rag_command(subparsers)
     register_query_rag_command(subparsers)
+    register_rag_serve_command(subparsers)
+    register_embed_cache_command(subparsers)
     register_markdown_to_rag_command(subparsers)
     register_test_rag_command(subparsers)
     register_rag_stats_command(subparsers)
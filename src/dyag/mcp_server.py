@@ -184,6 +184,12 @@ class MCPServer:
                             "type": "string",
                             "description": "Output JSON file for detailed results"
                         },
+                        "concurrency": {
+                            "type": "integer",
+                            "description": "Number of concurrent LLM calls; questions are retrieved in one batch when > 1 (default: 1)",
+                            "default": 1,
+                            "minimum": 1
+                        },
                         "collection": {
                             "type": "string",
                             "description": "ChromaDB collection name (default: applications)",
@@ -521,7 +527,8 @@ class MCPServer:
                         questions=questions,
                         n_chunks=arguments.get("n_chunks", 5),
                         max_questions=arguments.get("max_questions"),
-                        output_file=arguments.get("output")
+                        output_file=arguments.get("output"),
+                        concurrency=arguments.get("concurrency", 1)
                     )
 
                     # Format response
@@ -10,6 +10,8 @@ from typing import Dict, List, Any
 from datetime import datetime
 from difflib import SequenceMatcher
 
+from dyag.rag_metrics import summarize_stages
+
 
 def calculate_similarity(expected: str, obtained: str) -> float:
     """
@@ -152,6 +154,19 @@ def generate_markdown_report(
     report.append(f"| **Tokens moyens** | {metadata.get('total_tokens', 0)//metadata.get('total_questions', 1)} tokens |\n")
     report.append(f"| **Temps total** | {metadata.get('total_time', 0)/60:.1f} minutes |\n\n")
 
+    # Latency per pipeline stage (only present for evaluations run with timings)
+    latency = summarize_stages(r.get("timings", {}) for r in results if r.get("success", True))
+    if latency:
+        report.append("### Latence par Étape\n\n")
+        report.append("| Étape | Mesures | p50 | p95 | p99 | Max |\n")
+        report.append("|-------|---------|-----|-----|-----|-----|\n")
+        for stage, summary in latency.items():
+            report.append(
+                f"| {stage} | {summary['count']} | {summary['p50']:.3f}s | {summary['p95']:.3f}s "
+                f"| {summary['p99']:.3f}s | {summary['max']:.3f}s |\n"
+            )
+        report.append("\n")
+
     report.append("### Métriques Qualitatives\n\n")
     report.append("| Métrique | Valeur | Commentaire |\n")
     report.append("|----------|--------|-------------|\n")
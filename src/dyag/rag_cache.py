@@ -0,0 +1,585 @@
+"""
+Caches pour le système RAG.
+
+Ce module fournit des caches en mémoire (avec persistance optionnelle sur
+disque) pour éviter de recalculer les étapes coûteuses du pipeline RAG.
+"""
+
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalise une question pour l'utiliser comme clé de cache.
+
+    Args:
+        text: Question brute
+
+    Returns:
+        Question normalisée (Unicode NFC, espaces compactés)
+    """
+    text = unicodedata.normalize('NFC', text or '')
+    return ' '.join(text.split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU borné des embeddings de questions.
+
+    Les entrées sont indexées par (nom du modèle d'embedding, question
+    normalisée). Le cache peut être sauvegardé sur disque pour qu'un
+    processus redémarré parte avec un cache déjà chaud.
+    """
+
+    def __init__(self, max_size: int = 1024, persist_path: Optional[str] = None):
+        """
+        Initialise le cache.
+
+        Args:
+            max_size: Nombre maximal d'embeddings conservés (0 = cache désactivé)
+            persist_path: Fichier JSON de persistance (optionnel)
+                         Chargé à l'initialisation et sauvegardé à la sortie
+        """
+        self.max_size = max(0, max_size)
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def get(self, model_name: str, query: str) -> Optional[List[float]]:
+        """
+        Récupère l'embedding d'une question s'il est en cache.
+
+        Args:
+            model_name: Nom du modèle d'embedding
+            query: Question en langage naturel
+
+        Returns:
+            Embedding ou None si absent
+        """
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model_name: str, query: str, embedding: List[float]) -> None:
+        """
+        Ajoute l'embedding d'une question au cache.
+
+        Args:
+            model_name: Nom du modèle d'embedding
+            query: Question en langage naturel
+            embedding: Embedding de la question
+        """
+        if self.max_size == 0:
+            return
+
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            self._entries[key] = list(embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache et remet les compteurs à zéro."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Taille, capacité, hits, misses et taux de hit
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
+
+    def load(self) -> int:
+        """
+        Charge le cache depuis le fichier de persistance.
+
+        Returns:
+            Nombre d'entrées chargées
+        """
+        if not self.persist_path or not self.persist_path.exists():
+            return 0
+
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[WARNING] Cache d'embeddings illisible ({self.persist_path}): {e}")
+            return 0
+
+        with self._lock:
+            for model_name, query, embedding in data.get('entries', []):
+                self._entries[(model_name, query)] = embedding
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    def save(self) -> None:
+        """Sauvegarde le cache dans le fichier de persistance (ordre LRU conservé)."""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            entries = [
+                [model_name, query, embedding]
+                for (model_name, query), embedding in self._entries.items()
+            ]
+
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False)
+        tmp_path.replace(self.persist_path)
+
+
+def content_hash(text: str) -> str:
+    """
+    Calcule l'empreinte SHA-256 d'un contenu textuel.
+
+    Args:
+        text: Contenu du chunk (ou tout autre texte)
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """
+    Cache persistant (SQLite) des réponses générées par le LLM.
+
+    La clé combine la question normalisée, les IDs et empreintes des chunks
+    de contexte, le modèle, la température et l'empreinte du prompt : si un
+    chunk est réindexé avec un contenu différent, la clé change et l'ancienne
+    réponse n'est plus servie. Les entrées expirent après `ttl` secondes et
+    les moins récemment utilisées sont évincées au-delà de `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: int = 10000
+    ):
+        """
+        Initialise le cache.
+
+        Args:
+            path: Fichier SQLite du cache (créé si absent)
+            ttl: Durée de vie des entrées en secondes (None = illimitée)
+            max_entries: Nombre maximal de réponses conservées
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_chunks ("
+                " key TEXT NOT NULL,"
+                " chunk_id TEXT NOT NULL,"
+                " content_hash TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_answer_chunks_id ON answer_chunks(chunk_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_answers_access ON answers(last_access)"
+            )
+
+    @staticmethod
+    def make_key(
+        question: str,
+        chunks: List[Dict],
+        model: str,
+        temperature: float,
+        prompt_hash: str
+    ) -> str:
+        """
+        Construit la clé de cache d'une génération.
+
+        Args:
+            question: Question de l'utilisateur
+            chunks: Chunks de contexte (avec 'id' et 'content')
+            model: Nom du modèle LLM
+            temperature: Température de génération
+            prompt_hash: Empreinte du prompt système/utilisateur
+
+        Returns:
+            Clé hexadécimale
+        """
+        chunk_keys = sorted((c['id'], content_hash(c['content'])) for c in chunks)
+        payload = json.dumps(
+            [normalize_query(question), chunk_keys, model, temperature, prompt_hash],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Récupère une réponse en cache.
+
+        Args:
+            key: Clé construite avec make_key
+
+        Returns:
+            Résultat mis en cache ou None (absent ou expiré)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    with self._conn:
+                        self._delete_keys([key])
+                self.misses += 1
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE answers SET last_access = ? WHERE key = ?", (now, key)
+                )
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, result: Dict, chunks: List[Dict]) -> None:
+        """
+        Enregistre une réponse.
+
+        Args:
+            key: Clé construite avec make_key
+            result: Résultat à mettre en cache (sérialisable en JSON)
+            chunks: Chunks de contexte ayant servi à la génération
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, result, created_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            self._conn.execute("DELETE FROM answer_chunks WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO answer_chunks (key, chunk_id, content_hash) VALUES (?, ?, ?)",
+                [(key, c['id'], content_hash(c['content'])) for c in chunks]
+            )
+            self._evict()
+
+    def invalidate_chunks(self, chunk_hashes: Dict[str, str]) -> int:
+        """
+        Supprime les réponses construites sur une ancienne version de chunks.
+
+        Args:
+            chunk_hashes: {chunk_id: empreinte du contenu actuel}
+
+        Returns:
+            Nombre de réponses supprimées
+        """
+        if not chunk_hashes:
+            return 0
+
+        with self._lock, self._conn:
+            stale = set()
+            items = list(chunk_hashes.items())
+            for start in range(0, len(items), 500):
+                batch = items[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, chunk_id, content_hash FROM answer_chunks"
+                    f" WHERE chunk_id IN ({placeholders})",
+                    [chunk_id for chunk_id, _ in batch]
+                ).fetchall()
+                stale.update(
+                    key for key, chunk_id, old_hash in rows
+                    if chunk_hashes[chunk_id] != old_hash
+                )
+            self._delete_keys(list(stale))
+            return len(stale)
+
+    def prune(self) -> int:
+        """
+        Supprime les entrées expirées et applique la limite de taille.
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        with self._lock, self._conn:
+            before = self._count()
+            if self.ttl is not None:
+                expired = [
+                    row[0] for row in self._conn.execute(
+                        "SELECT key FROM answers WHERE created_at < ?",
+                        (time.time() - self.ttl,)
+                    )
+                ]
+                self._delete_keys(expired)
+            self._evict()
+            return before - self._count()
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Nombre d'entrées, hits, misses et taux de hit
+        """
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._count()
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Ferme la connexion SQLite."""
+        self._conn.close()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées au-delà de max_entries."""
+        overflow = self._count() - self.max_entries
+        if overflow > 0:
+            keys = [
+                row[0] for row in self._conn.execute(
+                    "SELECT key FROM answers ORDER BY last_access ASC LIMIT ?", (overflow,)
+                )
+            ]
+            self._delete_keys(keys)
+
+    def _delete_keys(self, keys: List[str]) -> None:
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            self._conn.execute(f"DELETE FROM answers WHERE key IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM answer_chunks WHERE key IN ({placeholders})", batch)
+
+
+class SemanticCache:
+    """
+    Cache sémantique des réponses : réutilise la réponse d'une question
+    antérieure quasi identique (paraphrase).
+
+    Les embeddings des questions passées sont gardés dans un petit index
+    vectoriel en mémoire. Une réponse est réutilisée si la similarité cosinus
+    dépasse `threshold` et que le filtre de métadonnées est identique.
+    """
+
+    EVICTION_POLICIES = ('lru', 'fifo')
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 1000,
+        eviction: str = 'lru'
+    ):
+        """
+        Initialise le cache.
+
+        Args:
+            threshold: Similarité cosinus minimale pour réutiliser une réponse
+            max_entries: Nombre maximal de questions conservées
+            eviction: Politique d'éviction ('lru' ou 'fifo')
+        """
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(
+                f"Politique d'éviction '{eviction}' non supportée. "
+                f"Valeurs possibles: {', '.join(self.EVICTION_POLICIES)}"
+            )
+
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.eviction = eviction
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._vectors = None  # Matrice (max_entries, dim) allouée au premier ajout
+        self._entries: List[Optional[Dict]] = [None] * self.max_entries
+        self._filters = [None] * self.max_entries
+        self._created = np.zeros(self.max_entries)
+        self._accessed = np.zeros(self.max_entries)
+        self._used = np.zeros(self.max_entries, dtype=bool)
+        self._clock = 0
+
+    @staticmethod
+    def _filter_key(filter_metadata: Optional[Dict]) -> str:
+        return json.dumps(filter_metadata or {}, sort_keys=True, ensure_ascii=False)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def lookup(
+        self,
+        embedding: List[float],
+        filter_metadata: Optional[Dict] = None
+    ) -> Optional[Tuple[Dict, float]]:
+        """
+        Cherche une question antérieure assez proche.
+
+        Args:
+            embedding: Embedding de la question courante
+            filter_metadata: Filtre de métadonnées de la requête courante
+
+        Returns:
+            (résultat mis en cache, similarité) ou None
+        """
+        filter_key = self._filter_key(filter_metadata)
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if self._vectors is None or not self._used.any():
+                self.misses += 1
+                return None
+
+            similarities = self._vectors @ query
+            candidates = self._used & np.array(
+                [f == filter_key for f in self._filters], dtype=bool
+            )
+            similarities = np.where(candidates, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._accessed[best] = self._tick()
+            self.hits += 1
+            return dict(self._entries[best]), similarity
+
+    def add(
+        self,
+        embedding: List[float],
+        result: Dict,
+        filter_metadata: Optional[Dict] = None
+    ) -> None:
+        """
+        Ajoute une question et sa réponse au cache.
+
+        Args:
+            embedding: Embedding de la question
+            result: Réponse à réutiliser
+            filter_metadata: Filtre de métadonnées utilisé pour la réponse
+        """
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            free = np.flatnonzero(~self._used)
+            if len(free):
+                slot = int(free[0])
+            else:
+                ages = self._accessed if self.eviction == 'lru' else self._created
+                slot = int(np.argmin(ages))
+                self.evictions += 1
+
+            now = self._tick()
+            self._vectors[slot] = vector
+            self._entries[slot] = result
+            self._filters[slot] = self._filter_key(filter_metadata)
+            self._created[slot] = now
+            self._accessed[slot] = now
+            self._used[slot] = True
+
+    def clear(self) -> None:
+        """Vide le cache et remet les compteurs à zéro."""
+        with self._lock:
+            self._used[:] = False
+            self._entries = [None] * self.max_entries
+            self._filters = [None] * self.max_entries
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return int(self._used.sum())
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Taille, seuil, politique d'éviction, hits, misses et taux de hit
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'eviction': self.eviction,
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
@@ -0,0 +1,221 @@
+"""
+Mesure des latences du pipeline RAG.
+
+RAGQuerySystem chronomètre chaque étape (embedding de la question,
+recherche, reranking, mise en forme du contexte, premier token et
+génération LLM) et les enregistre dans un registre en mémoire. Le registre
+s'exporte au format texte Prometheus ou en JSON (servi par rag-serve sur
+/metrics et /metrics.json).
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+
+# Étapes chronométrées, dans l'ordre du pipeline (clés des résultats de ask())
+STAGES = [
+    'embedding_time',
+    'search_time',
+    'rerank_time',
+    'compression_time',
+    'packing_time',
+    'first_token_time',
+    'generation_time',
+    'total_time',
+]
+
+# Bornes des buckets des histogrammes (secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """
+    Calcule un percentile par interpolation linéaire.
+
+    Args:
+        values: Valeurs mesurées
+        q: Percentile entre 0 et 100
+
+    Returns:
+        Valeur du percentile, ou None si aucune valeur
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Iterable[float]) -> Dict:
+    """
+    Résume une série de mesures.
+
+    Args:
+        values: Valeurs mesurées
+
+    Returns:
+        count, mean, p50, p95, p99 et max
+    """
+    values = list(values)
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else None,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None
+    }
+
+
+def summarize_stages(timings: Iterable[Dict]) -> Dict[str, Dict]:
+    """
+    Agrège les durées d'étapes de plusieurs requêtes.
+
+    Args:
+        timings: Un dictionnaire {étape: durée} par requête
+
+    Returns:
+        {étape: résumé (voir summarize)} pour les étapes mesurées, dans l'ordre de STAGES
+    """
+    values: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for entry in timings:
+        for stage in STAGES:
+            if entry.get(stage) is not None:
+                values[stage].append(entry[stage])
+    return {stage: summarize(v) for stage, v in values.items() if v}
+
+
+class Histogram:
+    """
+    Histogramme cumulatif (format Prometheus).
+
+    Les dernières mesures sont aussi conservées (fenêtre bornée) pour
+    calculer des percentiles exacts dans l'export JSON.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 10000):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    Registre de métriques en mémoire (histogrammes et compteurs), thread-safe.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Initialise le registre.
+
+        Args:
+            buckets: Bornes des buckets des histogrammes (secondes)
+        """
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Enregistre une mesure dans un histogramme.
+
+        Args:
+            name: Nom de la métrique (ex: 'search_time')
+            value: Valeur mesurée
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def observe_timings(self, timings: Dict) -> None:
+        """
+        Enregistre les durées d'étapes d'une requête.
+
+        Args:
+            timings: {nom d'étape: durée en secondes} (clés de STAGES)
+        """
+        for name, value in timings.items():
+            if name in STAGES and value is not None:
+                self.observe(name, value)
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """
+        Incrémente un compteur.
+
+        Args:
+            name: Nom du compteur (ex: 'questions')
+            value: Incrément
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        """Remet le registre à zéro."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_dict(self) -> Dict:
+        """
+        Exporte le registre en JSON.
+
+        Returns:
+            {'histograms': {nom: {count, sum, mean, p50, p95, p99, max}},
+             'counters': {nom: valeur}}
+        """
+        with self._lock:
+            histograms = {}
+            for name, histogram in self._histograms.items():
+                summary = summarize(histogram.recent)
+                summary['count'] = histogram.count
+                summary['sum'] = histogram.sum
+                histograms[name] = summary
+            return {'histograms': histograms, 'counters': dict(self._counters)}
+
+    def to_prometheus(self, prefix: str = 'dyag_rag') -> str:
+        """
+        Exporte le registre au format texte Prometheus.
+
+        Args:
+            prefix: Préfixe des noms de métriques
+
+        Returns:
+            Exposition texte (version 0.0.4)
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+
+            for name, histogram in sorted(self._histograms.items()):
+                metric = f"{prefix}_{name[:-len('_time')] if name.endswith('_time') else name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registre du processus, partagé par toutes les instances de RAGQuerySystem
+REGISTRY = MetricsRegistry()
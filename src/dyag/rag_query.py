@@ -11,11 +11,15 @@ import os
 if 'TRANSFORMERS_CACHE' in os.environ and 'HF_HOME' not in os.environ:
     os.environ['HF_HOME'] = os.environ['TRANSFORMERS_CACHE']
 
-import chromadb
 from sentence_transformers import SentenceTransformer
 import sys
 import io
-from typing import List, Dict, Optional
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Iterator, Tuple, Union
 from pathlib import Path
 import json
 from dotenv import load_dotenv
@@ -28,10 +32,36 @@ if sys.platform == 'win32' and __name__ == '__main__':
 # Support pour import direct ou module
 try:
     from .llm_providers import LLMProviderFactory
+    from .rag_cache import (
+        QueryEmbeddingCache, AnswerCache, SemanticCache, normalize_query, content_hash
+    )
+    from .hybrid_search import BM25Index, bm25_index_path, reciprocal_rank_fusion
+    from .reranker import CrossEncoderReranker
+    from .context_packer import (
+        compress_context, format_context, pack_context, resolve_prompt_budget, estimate_tokens
+    )
+    from .rag_metrics import REGISTRY
+    from .vector_store import detect_store, open_vector_store, distance_to_similarity
+    from .embedding_cache import EmbeddingCache, model_revision
+    from .app_index import app_index_name
+    from .app_router import AppNameRouter, app_names_path
 except ImportError:
     # Ajouter le répertoire parent au path pour import direct
     sys.path.insert(0, str(Path(__file__).parent))
     from llm_providers import LLMProviderFactory
+    from rag_cache import (
+        QueryEmbeddingCache, AnswerCache, SemanticCache, normalize_query, content_hash
+    )
+    from hybrid_search import BM25Index, bm25_index_path, reciprocal_rank_fusion
+    from reranker import CrossEncoderReranker
+    from context_packer import (
+        compress_context, format_context, pack_context, resolve_prompt_budget, estimate_tokens
+    )
+    from rag_metrics import REGISTRY
+    from vector_store import detect_store, open_vector_store, distance_to_similarity
+    from embedding_cache import EmbeddingCache, model_revision
+    from app_index import app_index_name
+    from app_router import AppNameRouter, app_names_path
 
 # Charger les variables d'environnement depuis .env
 env_path = Path(__file__).parent.parent.parent / '.env'
@@ -41,6 +71,41 @@ else:
     load_dotenv()
 
 
+# Prompt système par défaut
+DEFAULT_SYSTEM_PROMPT = """Tu es un assistant spécialisé dans les applications informatiques.
+Réponds aux questions en te basant UNIQUEMENT sur le contexte fourni.
+Si l'information n'est pas dans le contexte, dis-le clairement.
+Cite toujours tes sources en indiquant les IDs des chunks utilisés.
+Sois précis, détaillé et professionnel."""
+
+# Prompt utilisateur ({context} et {question} sont remplacés à l'appel)
+USER_PROMPT_TEMPLATE = """Contexte:
+{context}
+
+Question: {question}
+
+Instructions:
+- Réponds de manière précise et détaillée
+- Base-toi UNIQUEMENT sur le contexte fourni
+- Cite tes sources (IDs des chunks) entre crochets
+- Si tu ne sais pas ou si l'information n'est pas dans le contexte, dis-le clairement
+- Structure ta réponse de façon claire"""
+
+# Longueur maximale des réponses (fait aussi partie de la clé du cache de réponses)
+DEFAULT_MAX_TOKENS = 1000
+
+
+@dataclass
+class CollectionShard:
+    """Collection interrogée par RAGQuerySystem, avec ses index BM25, d'applications et de noms éventuels."""
+    name: str
+    store: str
+    collection: object
+    bm25_index: Optional[BM25Index] = None
+    app_index: Optional[object] = None
+    app_router: Optional[AppNameRouter] = None
+
+
 class RAGQuerySystem:
     """
     Système de Q&A avec Retrieval Augmented Generation.
@@ -52,21 +117,44 @@ class RAGQuerySystem:
     def __init__(
         self,
         chroma_path: str = "./chroma_db",
-        collection_name: str = "applications",
+        collection_name: Union[str, List[str]] = "applications",
         embedding_model: str = "all-MiniLM-L6-v2",
-        llm_provider: Optional[str] = None,
+        llm_provider: Optional[Union[str, object]] = None,
         llm_model: Optional[str] = None,
         api_key: Optional[str] = None,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        query_cache_size: int = 1024,
+        query_cache_path: Optional[str] = None,
+        answer_cache_path: Optional[str] = None,
+        answer_cache_ttl: Optional[float] = None,
+        answer_cache_size: int = 10000,
+        semantic_cache_threshold: Optional[float] = None,
+        semantic_cache_size: int = 1000,
+        semantic_cache_eviction: str = 'lru',
+        hybrid_search: Optional[bool] = None,
+        rrf_k: int = 60,
+        rerank_model: Optional[str] = None,
+        rerank_candidates: int = 4,
+        prompt_budget: Optional[int] = None,
+        metrics=None,
+        store: Optional[str] = None,
+        embedding_cache_path: Optional[str] = None,
+        app_index: Optional[bool] = None,
+        app_candidates: int = 20,
+        app_router: Optional[bool] = None,
+        compression_budget: Optional[int] = None
     ):
         """
         Initialise le système RAG.
 
         Args:
-            chroma_path: Chemin vers la base ChromaDB
-            collection_name: Nom de la collection ChromaDB
+            chroma_path: Répertoire de la base vectorielle (ChromaDB ou numpy)
+            collection_name: Nom de la collection ChromaDB, ou liste de collections
+                            interrogées en parallèle (voir search_chunks)
             embedding_model: Modèle Sentence Transformers pour embeddings
-            llm_provider: Provider LLM ('openai', 'anthropic', 'claude', 'ollama')
+            llm_provider: Provider LLM ('openai', 'anthropic', 'claude', 'ollama'),
+                         ou provider déjà construit (llm_model, api_key et
+                         timeout sont alors ignorés)
                          Si None, détecté automatiquement depuis .env
             llm_model: Modèle LLM spécifique
                       Si None, utilise le modèle par défaut du provider
@@ -74,41 +162,252 @@ class RAGQuerySystem:
                     Si None, récupérée depuis les variables d'environnement
             timeout: Timeout en secondes (uniquement pour Ollama)
                     Si None, utilise OLLAMA_TIMEOUT depuis .env (défaut: 300s)
+            query_cache_size: Nombre d'embeddings de questions gardés en cache LRU
+                             (0 = cache désactivé)
+            query_cache_path: Fichier JSON de persistance du cache d'embeddings
+                             Si None, le cache reste en mémoire uniquement
+            answer_cache_path: Fichier SQLite du cache de réponses LLM
+                              Si None, les réponses ne sont pas mises en cache
+            answer_cache_ttl: Durée de vie des réponses en cache (secondes, None = illimitée)
+            answer_cache_size: Nombre maximal de réponses en cache
+            semantic_cache_threshold: Similarité cosinus à partir de laquelle ask()
+                                     réutilise la réponse d'une question proche
+                                     Si None, le cache sémantique est désactivé
+            semantic_cache_size: Nombre maximal de questions du cache sémantique
+            semantic_cache_eviction: Politique d'éviction du cache sémantique ('lru', 'fifo')
+            hybrid_search: Fusionner la recherche vectorielle et BM25 (RRF)
+                          Si None, activé dès que l'index BM25 de la collection existe
+            rrf_k: Constante de la Reciprocal Rank Fusion
+            rerank_model: Modèle CrossEncoder pour reclasser les chunks
+                         Si None, pas de reranking
+            rerank_candidates: Nombre de candidats récupérés avant reranking,
+                              en multiple du nombre de chunks demandés
+            prompt_budget: Budget du prompt en tokens (0 = illimité)
+                          Si None, RAG_PROMPT_TOKENS depuis .env, sinon
+                          illimité (voir context_packer)
+            metrics: MetricsRegistry recevant les durées de chaque étape
+                    Si None, registre du processus (rag_metrics.REGISTRY)
+            store: Backend vectoriel ('chroma' ou 'numpy', voir vector_store)
+                  Si None, détecté d'après les fichiers de chaque collection
+            embedding_cache_path: Répertoire du cache d'embeddings partagé avec
+                                 index-rag (voir embedding_cache), consulté
+                                 avant d'encoder une question absente du cache LRU
+            app_index: Recherche hiérarchique : trouver d'abord les applications
+                      proches dans l'index des applications (voir app_index),
+                      puis chercher les chunks de ces seules applications
+                      Si None, activée dès que l'index de la collection existe
+            app_candidates: Nombre d'applications retenues par la première étape
+            app_router: Limiter la recherche aux applications nommées dans la
+                       question (table des noms de index-rag, voir app_router)
+                       Si None, activé dès que la table de la collection existe
+            compression_budget: Tokens de contexte gardés par la compression
+                               extractive (phrases les plus proches de la
+                               question, voir context_packer.compress_context)
+                               Si None ou 0, le contexte n'est pas compressé
         """
-        # ChromaDB
+        # Base vectorielle
         self.chroma_path = Path(chroma_path)
-        self.client = chromadb.PersistentClient(path=str(self.chroma_path))
+        names = [collection_name] if isinstance(collection_name, str) else list(collection_name)
+        if not names:
+            raise ValueError("Aucune collection à interroger")
 
-        try:
-            self.collection = self.client.get_collection(collection_name)
-        except Exception:
-            raise ValueError(
-                f"Collection '{collection_name}' non trouvée. "
-                f"Veuillez d'abord indexer vos chunks avec index_chunks.py"
-            )
+        self.shards: List[CollectionShard] = []
+        for name in names:
+            shard_store = store or detect_store(chroma_path, name)
+            try:
+                collection = open_vector_store(shard_store, chroma_path, name)
+            except Exception:
+                raise ValueError(
+                    f"Collection '{name}' non trouvée. "
+                    f"Veuillez d'abord indexer vos chunks avec index_chunks.py"
+                )
+            self.shards.append(CollectionShard(name, shard_store, collection))
+        self.collection_names = names
+        self.collection = self.shards[0].collection
+        self.store = self.shards[0].store
+
+        # Index BM25 (créé par ChunkIndexer à côté de chaque collection)
+        self.bm25_index = None
+        self.rrf_k = rrf_k
+        bm25_paths = [bm25_index_path(chroma_path, name) for name in names]
+        missing = [path for path in bm25_paths if not path.exists()]
+        if hybrid_search or (hybrid_search is None and not missing):
+            if missing:
+                print(f"[WARNING] Index BM25 absent ({', '.join(str(p) for p in missing)}), "
+                      f"recherche vectorielle seule. "
+                      f"Réindexez la collection avec index-rag pour le créer.")
+            else:
+                for shard, path in zip(self.shards, bm25_paths):
+                    shard.bm25_index = BM25Index(path)
+                self.bm25_index = self.shards[0].bm25_index
+
+        # Index des applications (créé par index-rag --app-index)
+        self.app_candidates = max(1, app_candidates)
+        if app_index or app_index is None:
+            for shard in self.shards:
+                name = app_index_name(shard.name)
+                try:
+                    shard.app_index = open_vector_store(store or detect_store(chroma_path, name), chroma_path, name)
+                except Exception:
+                    if app_index:
+                        print(f"[WARNING] Index des applications absent ({name}), recherche sur tous les chunks. "
+                              f"Réindexez la collection avec index-rag --app-index pour le créer.")
+                    continue
+                if not shard.app_index.count():
+                    shard.app_index = None
+
+        # Table des noms d'applications (créée par index-rag)
+        if app_router or app_router is None:
+            for shard in self.shards:
+                names_path = app_names_path(chroma_path, shard.name)
+                if names_path.exists():
+                    shard.app_router = AppNameRouter(names_path)
+                elif app_router:
+                    print(f"[WARNING] Table des noms d'applications absente ({names_path}). "
+                          f"Réindexez la collection avec index-rag pour la créer.")
+
+        # Une collection par thread pour la recherche multi-collections
+        self._shard_executor = None
+        if len(self.shards) > 1:
+            self._shard_executor = ThreadPoolExecutor(max_workers=len(self.shards))
 
         # Modèle d'embedding
         print(f"Chargement du modèle d'embedding: {embedding_model}")
+        self.embedding_model_name = embedding_model
         self.embedding_model = SentenceTransformer(embedding_model)
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(embedding_cache_path)
+            self.embedding_key = EmbeddingCache.model_key(embedding_model, model_revision(self.embedding_model))
+        self.query_cache = QueryEmbeddingCache(
+            max_size=query_cache_size,
+            persist_path=query_cache_path
+        )
+        self.answer_cache = None
+        if answer_cache_path:
+            self.answer_cache = AnswerCache(
+                answer_cache_path,
+                ttl=answer_cache_ttl,
+                max_entries=answer_cache_size
+            )
+        self.semantic_cache = None
+        if semantic_cache_threshold is not None:
+            self.semantic_cache = SemanticCache(
+                threshold=semantic_cache_threshold,
+                max_entries=semantic_cache_size,
+                eviction=semantic_cache_eviction
+            )
+
+        self.metrics = metrics if metrics is not None else REGISTRY
+
+        # Reranking
+        self.reranker = CrossEncoderReranker(rerank_model) if rerank_model else None
+        self.rerank_candidates = max(1, rerank_candidates)
 
         # LLM Provider
-        print(f"Initialisation du provider LLM...")
-        try:
-            self.llm_provider = LLMProviderFactory.create_provider(
-                provider=llm_provider,
-                model=llm_model,
-                api_key=api_key,
-                timeout=timeout
-            )
-            print(f"[OK] Provider LLM: {self.llm_provider.get_model_name()}")
-        except Exception as e:
-            raise ValueError(f"Erreur d'initialisation du provider LLM: {e}")
+        if llm_provider is not None and not isinstance(llm_provider, str):
+            self.llm_provider = llm_provider
+        else:
+            print(f"Initialisation du provider LLM...")
+            try:
+                self.llm_provider = LLMProviderFactory.create_provider(
+                    provider=llm_provider,
+                    model=llm_model,
+                    api_key=api_key,
+                    timeout=timeout
+                )
+                print(f"[OK] Provider LLM: {self.llm_provider.get_model_name()}")
+            except Exception as e:
+                raise ValueError(f"Erreur d'initialisation du provider LLM: {e}")
+
+        self.prompt_budget = resolve_prompt_budget(prompt_budget)
+        self.compression_budget = compression_budget or None
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Calcule l'embedding d'une question en passant par le cache LRU.
+
+        Args:
+            query: Question en langage naturel
+
+        Returns:
+            Embedding de la question
+        """
+        embedding = self.query_cache.get(self.embedding_model_name, query)
+        if embedding is None:
+            embedding = self._encode([query])[0].tolist()
+            self.query_cache.put(self.embedding_model_name, query, embedding)
+        return embedding
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Calcule les embeddings de plusieurs questions en un seul appel encode.
+
+        Les questions déjà présentes dans le cache LRU ne sont pas réencodées.
+
+        Args:
+            queries: Questions en langage naturel
+
+        Returns:
+            Embeddings dans l'ordre des questions
+        """
+        embeddings = [
+            self.query_cache.get(self.embedding_model_name, q) for q in queries
+        ]
+        # Questions absentes du cache, sans doublons
+        missing = list(dict.fromkeys(
+            normalize_query(q) for q, e in zip(queries, embeddings) if e is None
+        ))
+
+        if missing:
+            encoded = self._encode(missing).tolist()
+            by_query = dict(zip(missing, encoded))
+            for query, embedding in by_query.items():
+                self.query_cache.put(self.embedding_model_name, query, embedding)
+            embeddings = [
+                e if e is not None else by_query[normalize_query(q)]
+                for q, e in zip(queries, embeddings)
+            ]
+
+        return embeddings
+
+    def _encode(self, texts: List[str]):
+        """Encode des textes, en passant par le cache d'embeddings s'il est activé."""
+        def encode(missing):
+            return self.embedding_model.encode(missing, show_progress_bar=False, convert_to_numpy=True)
+
+        if self.embedding_cache is None:
+            return encode(texts)
+        return self.embedding_cache.encode(self.embedding_key, texts, encode)
+
+    @staticmethod
+    def _format_results(results: Dict, index: int = 0) -> List[Dict]:
+        """
+        Convertit la réponse de collection.query en liste de chunks.
+
+        Args:
+            results: Résultat brut de collection.query
+            index: Position de la requête dans le lot
+
+        Returns:
+            Liste de chunks avec leurs distances
+        """
+        chunks = []
+        for i in range(len(results['ids'][index])):
+            chunks.append({
+                'id': results['ids'][index][i],
+                'content': results['documents'][index][i],
+                'metadata': results['metadatas'][index][i],
+                'distance': results['distances'][index][i]
+            })
+        return chunks
 
     def search_chunks(
         self,
         query: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict] = None
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict] = None
     ) -> List[Dict]:
         """
         Recherche les chunks les plus pertinents pour une question.
@@ -118,30 +417,354 @@ class RAGQuerySystem:
             n_results: Nombre de chunks à récupérer (top K)
             filter_metadata: Filtres optionnels sur les métadonnées
                            Ex: {"source_id": "383"} pour une app spécifique
+            timings: Dictionnaire complété avec la durée des étapes, en secondes
+                    ('embedding_time', 'search_time' et 'rerank_time' si actif,
+                    'collection_times' par collection si plusieurs sont interrogées)
 
         Returns:
             Liste de chunks avec leurs scores de similarité
         """
-        # Générer embedding de la question
-        query_embedding = self.embedding_model.encode(query).tolist()
+        timings = timings if timings is not None else {}
+        n_candidates = self._rerank_count(n_results)
+
+        # Générer embedding de la question (ou le récupérer du cache)
+        start_time = time.time()
+        query_embedding = self.embed_query(query)
+        timings['embedding_time'] = time.time() - start_time
+
+        # Rechercher dans la base vectorielle
+        start_time = time.time()
+        chunks = self._search([query], [query_embedding], n_candidates, filter_metadata, timings)[0]
+        timings['search_time'] = time.time() - start_time
+
+        if self.reranker is not None:
+            chunks = self._rerank([query], [chunks], n_results, timings)[0]
+        return chunks
+
+    def search_chunks_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Recherche les chunks pertinents pour plusieurs questions à la fois.
+
+        Les embeddings sont calculés en un seul appel encode et toutes les
+        questions sont envoyées dans un seul collection.query par collection.
+
+        Args:
+            queries: Questions en langage naturel
+            n_results: Nombre de chunks à récupérer par question (top K)
+            filter_metadata: Filtres optionnels sur les métadonnées
+            timings: Dictionnaire complété avec la durée des étapes pour tout le lot
+
+        Returns:
+            Une liste de chunks par question, dans l'ordre des questions
+        """
+        if not queries:
+            return []
+
+        timings = timings if timings is not None else {}
+        n_candidates = self._rerank_count(n_results)
+
+        start_time = time.time()
+        query_embeddings = self.embed_queries(queries)
+        timings['embedding_time'] = time.time() - start_time
+
+        start_time = time.time()
+        all_chunks = self._search(queries, query_embeddings, n_candidates, filter_metadata, timings)
+        timings['search_time'] = time.time() - start_time
+
+        if self.reranker is not None:
+            all_chunks = self._rerank(queries, all_chunks, n_results, timings)
+        return all_chunks
+
+    def _search(
+        self,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        n_results: int,
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Interroge toutes les collections et fusionne leurs résultats.
+
+        Avec plusieurs collections, chacune est interrogée dans son propre
+        thread : la recherche dure le temps de la collection la plus lente.
+        Les distances sont converties en similarité cosinus (les collections
+        n'utilisent pas forcément la même distance), puis les candidats sont
+        fusionnés en un seul top-k, par similarité ou, en mode hybride, par
+        score RRF (calculé par rang dans chaque collection).
+
+        Args:
+            queries: Questions en langage naturel
+            query_embeddings: Embeddings des questions
+            n_results: Nombre de chunks à retourner par question
+            filter_metadata: Filtres optionnels sur les métadonnées
+            timings: Dictionnaire complété avec 'collection_times'
+                    ({collection: durée en secondes}) si plusieurs collections
+
+        Returns:
+            Une liste de chunks par question ; avec plusieurs collections,
+            chaque chunk porte 'collection' et 'similarity'
+        """
+        if self._shard_executor is None:
+            return self._search_shard(self.shards[0], queries, query_embeddings, n_results, filter_metadata)
+
+        def search(shard: CollectionShard):
+            start_time = time.time()
+            all_chunks = self._search_shard(shard, queries, query_embeddings, n_results, filter_metadata)
+            return all_chunks, time.time() - start_time
 
-        # Rechercher dans ChromaDB
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
+        per_shard = list(self._shard_executor.map(search, self.shards))
+        if timings is not None:
+            timings['collection_times'] = {
+                shard.name: elapsed for shard, (_, elapsed) in zip(self.shards, per_shard)
+            }
+
+        merged = []
+        for i in range(len(queries)):
+            candidates = [chunk for all_chunks, _ in per_shard for chunk in all_chunks[i]]
+            # Sans fusion RRF (pas d'index BM25 ou filtre non supporté) : similarité
+            hybrid = candidates and all('rrf_score' in c for c in candidates)
+            score_key = 'rrf_score' if hybrid else 'similarity'
+            candidates.sort(
+                key=lambda c: c[score_key] if c[score_key] is not None else float('-inf'),
+                reverse=True
+            )
+            merged.append(candidates[:n_results])
+        return merged
+
+    def _search_shard(
+        self,
+        shard: CollectionShard,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        n_results: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """Recherche vectorielle (fusionnée avec BM25 si actif) dans une collection."""
+        filters, routed = self._app_filters(shard, queries, query_embeddings, filter_metadata)
+        if filters is None:
+            filters = [filter_metadata] * len(queries)
+            results = shard.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=self._candidate_count(n_results),
+                where=filter_metadata
+            )
+            all_chunks = [self._format_results(results, i) for i in range(len(queries))]
+        else:
+            # Un filtre par question : une recherche par question
+            all_chunks = [
+                self._format_results(shard.collection.query(
+                    query_embeddings=[embedding],
+                    n_results=self._candidate_count(n_results),
+                    where=where
+                ))
+                for embedding, where in zip(query_embeddings, filters)
+            ]
+            if routed:
+                self._drop_weak_routes(shard, query_embeddings, all_chunks, filters, routed, n_results, filter_metadata)
+
+        if shard.bm25_index is not None:
+            all_chunks = [
+                self._fuse_bm25(query, chunks, n_results, where, shard)
+                for query, chunks, where in zip(queries, all_chunks, filters)
+            ]
+
+        if self._shard_executor is not None:
+            metric = shard.collection.distance_metric()
+            for chunks in all_chunks:
+                for chunk in chunks:
+                    chunk['collection'] = shard.name
+                    chunk['similarity'] = (
+                        distance_to_similarity(chunk['distance'], metric)
+                        if chunk['distance'] is not None else None
+                    )
+        return all_chunks
+
+    def _app_filters(
+        self,
+        shard: CollectionShard,
+        queries: List[str],
+        query_embeddings: List[List[float]],
+        filter_metadata: Optional[Dict] = None
+    ) -> Tuple[Optional[List[Dict]], List[int]]:
+        """
+        Applications auxquelles limiter la recherche de chaque question.
+
+        Une question qui nomme des applications (table des noms) est limitée
+        à celles-ci. Les autres passent, si la collection en a un, par l'index
+        des applications : recherche hiérarchique sur les app_candidates
+        applications les plus proches.
+
+        Returns:
+            (filtre de chaque question combiné avec filter_metadata, positions
+            des questions routées par nom) ; le filtre vaut None si aucune
+            question n'est limitée ou si filter_metadata désigne déjà les
+            applications (source_id)
+        """
+        if filter_metadata and 'source_id' in filter_metadata:
+            return None, []
+
+        app_filters: List[Optional[Dict]] = [None] * len(queries)
+        if shard.app_router is not None:
+            for i, query in enumerate(queries):
+                source_ids = shard.app_router.match(query)
+                if source_ids:
+                    app_filters[i] = {'source_id': {'$in': source_ids}}
+        routed = [i for i, where in enumerate(app_filters) if where is not None]
+
+        remaining = [i for i, where in enumerate(app_filters) if where is None]
+        if shard.app_index is not None and remaining:
+            results = shard.app_index.query(
+                query_embeddings=[query_embeddings[i] for i in remaining],
+                n_results=self.app_candidates
+            )
+            for i, metadatas in zip(remaining, results['metadatas']):
+                app_filters[i] = {'source_id': {'$in': [meta['source_id'] for meta in metadatas]}}
+
+        if all(where is None for where in app_filters):
+            return None, []
+        return [
+            filter_metadata if where is None
+            else {'$and': [filter_metadata, where]} if filter_metadata else where
+            for where in app_filters
+        ], routed
+
+    # Écart de similarité au-delà duquel le routage par nom est abandonné
+    ROUTER_FALLBACK_MARGIN = 0.15
+
+    def _drop_weak_routes(
+        self,
+        shard: CollectionShard,
+        query_embeddings: List[List[float]],
+        all_chunks: List[List[Dict]],
+        filters: List[Optional[Dict]],
+        routed: List[int],
+        n_results: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> None:
+        """
+        Abandonne le routage par nom des questions mal servies par l'application nommée.
+
+        Un nom peut apparaître dans une question qui ne porte pas sur
+        l'application. Les questions routées sont aussi cherchées, en un lot,
+        sans filtre d'application : si le meilleur chunk de l'application
+        nommée est moins similaire que celui de toute la collection de plus
+        de ROUTER_FALLBACK_MARGIN, la recherche non filtrée est retenue.
+        all_chunks et filters sont modifiés en place.
+        """
+        results = shard.collection.query(
+            query_embeddings=[query_embeddings[i] for i in routed],
+            n_results=self._candidate_count(n_results),
             where=filter_metadata
         )
+        metric = shard.collection.distance_metric()
 
-        # Formater résultats
-        chunks = []
-        for i in range(len(results['ids'][0])):
-            chunks.append({
-                'id': results['ids'][0][i],
-                'content': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'distance': results['distances'][0][i]
-            })
+        def best_similarity(chunks: List[Dict]) -> float:
+            return max(
+                (distance_to_similarity(c['distance'], metric) for c in chunks if c['distance'] is not None),
+                default=float('-inf')
+            )
+
+        for position, i in enumerate(routed):
+            unfiltered = self._format_results(results, position)
+            if best_similarity(all_chunks[i]) < best_similarity(unfiltered) - self.ROUTER_FALLBACK_MARGIN:
+                all_chunks[i] = unfiltered
+                filters[i] = filter_metadata
+
+    def _rerank_count(self, n_results: int) -> int:
+        """Nombre de candidats à récupérer avant reranking."""
+        if self.reranker is None:
+            return n_results
+        return n_results * self.rerank_candidates
+
+    def _rerank(
+        self,
+        queries: List[str],
+        all_chunks: List[List[Dict]],
+        n_results: int,
+        timings: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """Reclasse les candidats avec le cross-encoder et garde les n_results meilleurs."""
+        start_time = time.time()
+        reranked = self.reranker.rerank_many(queries, all_chunks, top_k=n_results)
+        if timings is not None:
+            timings['rerank_time'] = time.time() - start_time
+        return reranked
+
+    # Candidats récupérés par chaque méthode avant fusion (multiple de n_results)
+    HYBRID_CANDIDATES = 4
+
+    def _candidate_count(self, n_results: int) -> int:
+        """Nombre de chunks à demander à la base vectorielle (plus large en mode hybride)."""
+        if self.bm25_index is None:
+            return n_results
+        return n_results * self.HYBRID_CANDIDATES
+
+    def _fuse_bm25(
+        self,
+        query: str,
+        dense_chunks: List[Dict],
+        n_results: int,
+        filter_metadata: Optional[Dict] = None,
+        shard: Optional[CollectionShard] = None
+    ) -> List[Dict]:
+        """
+        Fusionne les résultats vectoriels avec ceux de l'index BM25 (RRF).
+
+        Args:
+            query: Question en langage naturel
+            dense_chunks: Candidats de la recherche vectorielle, par distance croissante
+            n_results: Nombre de chunks à retourner
+            filter_metadata: Filtres optionnels sur les métadonnées
+            shard: Collection interrogée (None = première collection)
+
+        Returns:
+            Chunks fusionnés avec 'rrf_score' et 'bm25_score'
+            ('distance' vaut None pour les chunks trouvés uniquement par BM25)
+        """
+        shard = shard or self.shards[0]
+        try:
+            lexical = shard.bm25_index.search(
+                query, n_results * self.HYBRID_CANDIDATES, filter_metadata
+            )
+        except ValueError:
+            # Filtre non supporté par l'index BM25 : recherche vectorielle seule
+            return dense_chunks[:n_results]
 
+        fused = reciprocal_rank_fusion(
+            [[c['id'] for c in dense_chunks], [chunk_id for chunk_id, _ in lexical]],
+            k=self.rrf_k
+        )[:n_results]
+
+        by_id = {c['id']: c for c in dense_chunks}
+        missing = [chunk_id for chunk_id, _ in fused if chunk_id not in by_id]
+        if missing:
+            found = shard.collection.get(ids=missing)
+            for chunk_id, document, metadata in zip(
+                found['ids'], found['documents'], found['metadatas']
+            ):
+                by_id[chunk_id] = {
+                    'id': chunk_id,
+                    'content': document,
+                    'metadata': metadata,
+                    'distance': None
+                }
+
+        bm25_scores = dict(lexical)
+        chunks = []
+        for chunk_id, score in fused:
+            # Un chunk absent de la collection (index BM25 en retard) est ignoré
+            if chunk_id in by_id:
+                chunk = dict(by_id[chunk_id])
+                chunk['rrf_score'] = score
+                chunk['bm25_score'] = bm25_scores.get(chunk_id)
+                chunks.append(chunk)
         return chunks
 
     def generate_answer(
@@ -150,7 +773,8 @@ class RAGQuerySystem:
         chunks: List[Dict],
         system_prompt: Optional[str] = None,
         temperature: float = 0.3,
-        max_tokens: int = 1000
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        timings: Optional[Dict] = None
     ) -> Dict:
         """
         Génère une réponse avec le LLM basée sur les chunks de contexte.
@@ -161,52 +785,162 @@ class RAGQuerySystem:
             system_prompt: Prompt système personnalisé (optionnel)
             temperature: Créativité du modèle (0=précis, 1=créatif)
             max_tokens: Longueur maximale de la réponse
+            timings: Dictionnaire complété avec la durée des étapes, en secondes
+                    ('compression_time' si le contexte est compressé,
+                    'packing_time', et 'generation_time' si le LLM est appelé)
 
         Returns:
             Dictionnaire avec réponse, sources, et métadonnées
         """
-        # Construire le contexte à partir des chunks
-        context = "\n\n---\n\n".join([
-            f"[Chunk {i+1} - ID: {c['id']}]\n{c['content']}"
-            for i, c in enumerate(chunks)
-        ])
+        timings = timings if timings is not None else {}
 
-        # Prompt système par défaut
-        if system_prompt is None:
-            system_prompt = """Tu es un assistant spécialisé dans les applications informatiques.
-Réponds aux questions en te basant UNIQUEMENT sur le contexte fourni.
-Si l'information n'est pas dans le contexte, dis-le clairement.
-Cite toujours tes sources en indiquant les IDs des chunks utilisés.
-Sois précis, détaillé et professionnel."""
+        chunks, packing = self.pack_context(question, chunks, system_prompt, timings)
+        messages = self.build_messages(question, chunks, system_prompt)
 
-        # Prompt utilisateur
-        user_prompt = f"""Contexte:
-{context}
-
-Question: {question}
-
-Instructions:
-- Réponds de manière précise et détaillée
-- Base-toi UNIQUEMENT sur le contexte fourni
-- Cite tes sources (IDs des chunks) entre crochets
-- Si tu ne sais pas ou si l'information n'est pas dans le contexte, dis-le clairement
-- Structure ta réponse de façon claire"""
+        # Réponse déjà générée pour la même question et le même contexte ?
+        cache_key, cached = self._lookup_answer(question, chunks, messages, temperature, max_tokens)
+        if cached is not None:
+            cached['context_packing'] = packing
+            return cached
 
         # Appel au LLM via le provider
+        start_time = time.time()
         response = self.llm_provider.chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=temperature,
             max_tokens=max_tokens
         )
+        timings['generation_time'] = time.time() - start_time
+
+        result = self._build_answer_result(response, chunks, self.llm_provider.get_model_name())
+        result['context_packing'] = packing
+        self._store_answer(cache_key, result, chunks)
+        return result
+
+    def pack_context(
+        self,
+        question: str,
+        chunks: List[Dict],
+        system_prompt: Optional[str] = None,
+        timings: Optional[Dict] = None
+    ):
+        """
+        Compresse les chunks (si compression_budget), les dédoublonne et les
+        fait tenir dans le budget du prompt.
+
+        Args:
+            question: Question de l'utilisateur
+            chunks: Chunks de contexte, du plus au moins pertinent
+            system_prompt: Prompt système personnalisé (optionnel)
+            timings: Dictionnaire complété avec 'compression_time' et 'packing_time'
+
+        Returns:
+            (chunks retenus, rapport de context_packer.pack_context, complété
+            par le rapport de compress_context sous 'compression')
+        """
+        timings = timings if timings is not None else {}
+
+        compression = None
+        if self.compression_budget and chunks:
+            start_time = time.time()
+            chunks, compression = compress_context(
+                self.embed_query(question), chunks, self._encode, self.compression_budget
+            )
+            timings['compression_time'] = time.time() - start_time
+
+        start_time = time.time()
+        max_tokens = None
+        if self.prompt_budget is not None:
+            overhead = estimate_tokens(
+                (system_prompt or DEFAULT_SYSTEM_PROMPT)
+                + USER_PROMPT_TEMPLATE.format(context='', question=question)
+            )
+            max_tokens = max(0, self.prompt_budget - overhead)
+        chunks, packing = pack_context(chunks, max_tokens)
+        timings['packing_time'] = time.time() - start_time
+
+        if compression is not None:
+            packing['compression'] = compression
+        return chunks, packing
+
+    def _lookup_answer(
+        self,
+        question: str,
+        chunks: List[Dict],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ):
+        """
+        Cherche une réponse dans le cache de réponses.
+
+        Returns:
+            (clé de cache ou None si le cache est désactivé, résultat ou None)
+        """
+        if self.answer_cache is None:
+            return None, None
+
+        prompt_hash = content_hash(json.dumps(
+            [messages[0]['content'], USER_PROMPT_TEMPLATE, max_tokens],
+            ensure_ascii=False
+        ))
+        cache_key = AnswerCache.make_key(
+            question, chunks, self.llm_provider.get_model_name(), temperature, prompt_hash
+        )
+
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            cached['chunks_used'] = chunks
+            cached['cache_hit'] = True
+        return cache_key, cached
+
+    def _store_answer(self, cache_key: Optional[str], result: Dict, chunks: List[Dict]) -> None:
+        """Enregistre une réponse fraîchement générée dans le cache de réponses."""
+        result['cache_hit'] = False
+        if cache_key is not None:
+            cached = {k: v for k, v in result.items() if k not in ('chunks_used', 'cache_hit')}
+            self.answer_cache.put(cache_key, cached, chunks)
+
+    @staticmethod
+    def build_messages(
+        question: str,
+        chunks: List[Dict],
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Construit les messages (system + user) envoyés au LLM.
 
+        Args:
+            question: Question de l'utilisateur
+            chunks: Chunks de contexte récupérés
+            system_prompt: Prompt système personnalisé (optionnel)
+
+        Returns:
+            Liste de messages au format chat
+        """
+        # Construire le contexte à partir des chunks
+        context = format_context(chunks)
+
+        # Prompt système par défaut
+        if system_prompt is None:
+            system_prompt = DEFAULT_SYSTEM_PROMPT
+
+        # Prompt utilisateur
+        user_prompt = USER_PROMPT_TEMPLATE.format(context=context, question=question)
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    @staticmethod
+    def _build_answer_result(response: Dict, chunks: List[Dict], model: str) -> Dict:
+        """Assemble le dictionnaire de réponse à partir de la sortie du provider."""
         return {
             'answer': response['content'],
             'sources': [c['id'] for c in chunks],
             'chunks_used': chunks,
-            'model': self.llm_provider.get_model_name(),
+            'model': model,
             'tokens_used': response['usage']['total_tokens'],
             'prompt_tokens': response['usage']['prompt_tokens'],
             'completion_tokens': response['usage']['completion_tokens']
@@ -236,26 +970,243 @@ Instructions:
             >>> result = rag.ask("Qui héberge GIDAF ?")
             >>> print(result['answer'])
         """
+        start_time = time.time()
+        timings = {}
+
+        # 0. Paraphrase d'une question déjà traitée ?
+        result = self._lookup_paraphrase(question, filter_metadata)
+        if result is not None:
+            return self._record_timings(result, timings, start_time)
+
         # 1. Rechercher chunks pertinents
-        chunks = self.search_chunks(question, n_chunks, filter_metadata)
+        chunks = self.search_chunks(question, n_chunks, filter_metadata, timings)
 
         if not chunks:
-            return {
-                'question': question,
-                'answer': "Aucun chunk pertinent trouvé pour cette question.",
-                'sources': [],
-                'chunks_used': [],
-                'tokens_used': 0
-            }
+            return self._record_timings(self._no_chunks_result(question), timings, start_time)
 
         # 2. Générer réponse
-        result = self.generate_answer(question, chunks, temperature=temperature)
+        result = self.generate_answer(question, chunks, temperature=temperature, timings=timings)
 
         # 3. Ajouter la question
         result['question'] = question
+        self._store_paraphrase(question, result, filter_metadata)
+
+        return self._record_timings(result, timings, start_time)
 
+    def _lookup_paraphrase(self, question: str, filter_metadata: Optional[Dict]) -> Optional[Dict]:
+        """Réponse du cache sémantique à une paraphrase d'une question déjà traitée (ou None)."""
+        if self.semantic_cache is None:
+            return None
+        hit = self.semantic_cache.lookup(self.embed_query(question), filter_metadata)
+        if hit is None:
+            return None
+        result, similarity = hit
+        result['cached_question'] = result.get('question')
+        result['question'] = question
+        result['semantic_cache_hit'] = True
+        result['similarity'] = similarity
         return result
 
+    def _store_paraphrase(self, question: str, result: Dict, filter_metadata: Optional[Dict]) -> None:
+        """Enregistre une réponse fraîchement générée dans le cache sémantique."""
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(self.embed_query(question), dict(result), filter_metadata)
+            result['semantic_cache_hit'] = False
+
+    def _record_timings(self, result: Dict, timings: Dict, start_time: float) -> Dict:
+        """
+        Ajoute les durées d'étapes (et 'total_time') au résultat et les
+        enregistre dans le registre de métriques.
+        """
+        timings['total_time'] = time.time() - start_time
+        result.update(timings)
+        self.metrics.observe_timings(timings)
+        self.metrics.inc('questions')
+        return result
+
+    def ask_stream(
+        self,
+        question: str,
+        n_chunks: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3,
+        max_tokens: int = DEFAULT_MAX_TOKENS
+    ) -> Iterator[Dict]:
+        """
+        Pose une question et produit la réponse au fil de la génération.
+
+        Les sources sont produites dès la fin de la recherche, puis la réponse
+        token par token, puis le résultat complet (même format que ask()).
+        Une paraphrase trouvée dans le cache sémantique produit directement
+        la réponse entière (un seul événement token, sans sources).
+
+        Args:
+            question: Question en langage naturel
+            n_chunks: Nombre de chunks à utiliser comme contexte
+            filter_metadata: Filtres optionnels sur les métadonnées
+            temperature: Créativité du modèle (0=précis, 1=créatif)
+            max_tokens: Longueur maximale de la réponse
+
+        Yields:
+            Événements {'type': 'sources', 'sources': [...], 'chunks': [...]},
+            puis {'type': 'token', 'content': str},
+            puis {'type': 'done', 'result': dict}
+
+        Example:
+            >>> for event in rag.ask_stream("Qui héberge GIDAF ?"):
+            ...     if event['type'] == 'token':
+            ...         print(event['content'], end='', flush=True)
+        """
+        start_time = time.time()
+        timings = {}
+
+        # Paraphrase d'une question déjà traitée : réponse complète d'un coup
+        result = self._lookup_paraphrase(question, filter_metadata)
+        if result is not None:
+            self._record_timings(result, timings, start_time)
+            yield {'type': 'token', 'content': result['answer']}
+            yield {'type': 'done', 'result': result}
+            return
+
+        chunks = self.search_chunks(question, n_chunks, filter_metadata, timings)
+
+        chunks, packing = self.pack_context(question, chunks, timings=timings)
+
+        yield {
+            'type': 'sources',
+            'sources': [c['id'] for c in chunks],
+            'chunks': chunks
+        }
+
+        if not chunks:
+            result = self._record_timings(self._no_chunks_result(question), timings, start_time)
+            yield {'type': 'token', 'content': result['answer']}
+            yield {'type': 'done', 'result': result}
+            return
+
+        messages = self.build_messages(question, chunks)
+
+        cache_key, cached = self._lookup_answer(question, chunks, messages, temperature, max_tokens)
+        if cached is not None:
+            cached['question'] = question
+            cached['context_packing'] = packing
+            self._store_paraphrase(question, cached, filter_metadata)
+            self._record_timings(cached, timings, start_time)
+            yield {'type': 'token', 'content': cached['answer']}
+            yield {'type': 'done', 'result': cached}
+            return
+
+        generation_start = time.time()
+        stream = self.llm_provider.stream_chat_completion(
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+        while True:
+            try:
+                fragment = next(stream)
+            except StopIteration as stop:
+                response = stop.value
+                break
+            if 'first_token_time' not in timings:
+                timings['first_token_time'] = time.time() - generation_start
+            yield {'type': 'token', 'content': fragment}
+        timings['generation_time'] = time.time() - generation_start
+
+        result = self._build_answer_result(response, chunks, self.llm_provider.get_model_name())
+        result['context_packing'] = packing
+        self._store_answer(cache_key, result, chunks)
+        result['question'] = question
+        self._store_paraphrase(question, result, filter_metadata)
+        self._record_timings(result, timings, start_time)
+
+        yield {'type': 'done', 'result': result}
+
+    def ask_many(
+        self,
+        questions: List[str],
+        n_chunks: int = 5,
+        concurrency: int = 4,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3
+    ) -> List[Dict]:
+        """
+        Pose plusieurs questions en parallèle.
+
+        La recherche est vectorisée (un seul encode et un seul
+        collection.query pour toutes les questions), puis les générations
+        LLM sont lancées en parallèle dans un pool de threads borné.
+
+        Args:
+            questions: Questions en langage naturel
+            n_chunks: Nombre de chunks à utiliser comme contexte
+            concurrency: Nombre maximal d'appels LLM simultanés
+            filter_metadata: Filtres optionnels sur les métadonnées
+            temperature: Créativité du modèle (0=précis, 1=créatif)
+
+        Returns:
+            Réponses dans l'ordre des questions. Une génération en échec
+            produit une réponse None avec le message dans la clé 'error'.
+            'total_time' ne couvre que la génération de la question (la
+            recherche est faite en lot, sa durée n'est enregistrée que dans
+            le registre de métriques).
+
+        Example:
+            >>> rag = RAGQuerySystem()
+            >>> results = rag.ask_many(["Qui héberge GIDAF ?", "Qu'est-ce que MYGUSI ?"])
+            >>> print(results[1]['answer'])
+        """
+        batch_timings = {}
+        all_chunks = self.search_chunks_many(questions, n_chunks, filter_metadata, batch_timings)
+        self.metrics.observe_timings(batch_timings)
+
+        def answer(question: str, chunks: List[Dict]) -> Dict:
+            if not chunks:
+                return self._no_chunks_result(question)
+
+            start_time = time.time()
+            timings = {}
+            try:
+                result = self.generate_answer(
+                    question, chunks, temperature=temperature, timings=timings
+                )
+            except Exception as e:
+                return {
+                    'question': question,
+                    'answer': None,
+                    'sources': [c['id'] for c in chunks],
+                    'chunks_used': chunks,
+                    'tokens_used': 0,
+                    'total_time': time.time() - start_time,
+                    'error': str(e)
+                }
+
+            result['question'] = question
+            result.update(timings)
+            result['total_time'] = time.time() - start_time
+            self.metrics.observe_timings(timings)
+            self.metrics.inc('questions')
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [
+                executor.submit(answer, question, chunks)
+                for question, chunks in zip(questions, all_chunks)
+            ]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _no_chunks_result(question: str) -> Dict:
+        """Réponse renvoyée lorsqu'aucun chunk n'a été trouvé."""
+        return {
+            'question': question,
+            'answer': "Aucun chunk pertinent trouvé pour cette question.",
+            'sources': [],
+            'chunks_used': [],
+            'tokens_used': 0
+        }
+
     def get_stats(self) -> Dict:
         """
         Récupère les statistiques de la base vectorielle.
@@ -263,21 +1214,247 @@ Instructions:
         Returns:
             Statistiques (nombre de chunks, etc.)
         """
-        count = self.collection.count()
+        counts = {shard.name: shard.collection.count() for shard in self.shards}
 
         return {
-            'total_chunks': count,
-            'collection_name': self.collection.name,
-            'embedding_model': self.embedding_model,
-            'llm_model': self.llm_provider.get_model_name()
+            'total_chunks': sum(counts.values()),
+            'collection_name': ','.join(self.collection_names),
+            'collections': counts,
+            'store': self.store,
+            'embedding_model': self.embedding_model_name,
+            'llm_model': self.llm_provider.get_model_name(),
+            'prompt_budget': self.prompt_budget,
+            'compression_budget': self.compression_budget,
+            'query_cache': self.query_cache.get_stats(),
+            'answer_cache': self.answer_cache.get_stats() if self.answer_cache else None,
+            'semantic_cache': self.semantic_cache.get_stats() if self.semantic_cache else None,
+            'hybrid_search': self.bm25_index is not None,
+            'app_index': any(shard.app_index is not None for shard in self.shards),
+            'app_router': any(shard.app_router is not None for shard in self.shards),
+            'reranker': self.reranker.get_stats() if self.reranker else None
         }
 
 
+class AsyncRAGQuerySystem:
+    """
+    Version asyncio de RAGQuerySystem.
+
+    La recherche (embedding + ChromaDB) et les caches sont exécutés dans un
+    pool de threads et la génération passe par un AsyncLLMProvider : un seul
+    processus peut ainsi traiter plusieurs questions en parallèle pendant que
+    le LLM répond. Les ressources de recherche (collections, modèle
+    d'embedding, caches) sont celles d'un RAGQuerySystem construit avec le
+    provider asynchrone, accessible via l'attribut `retrieval` : aucun
+    provider synchrone n'est créé.
+    """
+
+    def __init__(
+        self,
+        chroma_path: str = "./chroma_db",
+        collection_name: str = "applications",
+        embedding_model: str = "all-MiniLM-L6-v2",
+        llm_provider: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Initialise le système RAG asynchrone.
+
+        Args:
+            chroma_path: Chemin vers la base ChromaDB
+            collection_name: Nom de la collection ChromaDB
+            embedding_model: Modèle Sentence Transformers pour embeddings
+            llm_provider: Provider LLM ('openai', 'anthropic', 'claude', 'ollama')
+            llm_model: Modèle LLM spécifique
+            api_key: Clé API du provider
+            timeout: Timeout en secondes (uniquement pour Ollama)
+            max_workers: Taille du pool de threads pour l'embedding et la recherche
+            **kwargs: Options de recherche et de cache transmises à RAGQuerySystem
+        """
+        try:
+            self.llm_provider = LLMProviderFactory.create_async_provider(
+                provider=llm_provider,
+                model=llm_model,
+                api_key=api_key,
+                timeout=timeout
+            )
+        except Exception as e:
+            raise ValueError(f"Erreur d'initialisation du provider LLM asynchrone: {e}")
+
+        self.retrieval = RAGQuerySystem(
+            chroma_path=chroma_path,
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            llm_provider=self.llm_provider,
+            **kwargs
+        )
+        self.collection = self.retrieval.collection
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _run(self, func, *args):
+        """Exécute une fonction bloquante dans le pool de threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def search_chunks(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        timings: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Version asynchrone de RAGQuerySystem.search_chunks."""
+        return await self._run(self.retrieval.search_chunks, query, n_results, filter_metadata, timings)
+
+    async def generate_answer(
+        self,
+        question: str,
+        chunks: List[Dict],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        timings: Optional[Dict] = None
+    ) -> Dict:
+        """Version asynchrone de RAGQuerySystem.generate_answer."""
+        timings = timings if timings is not None else {}
+
+        chunks, packing = await self._run(self.retrieval.pack_context, question, chunks, system_prompt, timings)
+        messages = RAGQuerySystem.build_messages(question, chunks, system_prompt)
+
+        cache_key, cached = await self._run(
+            self.retrieval._lookup_answer, question, chunks, messages, temperature, max_tokens
+        )
+        if cached is not None:
+            cached['context_packing'] = packing
+            return cached
+
+        start_time = time.time()
+        response = await self.llm_provider.chat_completion(
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        timings['generation_time'] = time.time() - start_time
+
+        result = RAGQuerySystem._build_answer_result(
+            response, chunks, self.llm_provider.get_model_name()
+        )
+        result['context_packing'] = packing
+        await self._run(self.retrieval._store_answer, cache_key, result, chunks)
+        return result
+
+    async def ask(
+        self,
+        question: str,
+        n_chunks: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3
+    ) -> Dict:
+        """
+        Pose une question sans bloquer la boucle d'événements.
+
+        Example:
+            >>> rag = AsyncRAGQuerySystem()
+            >>> result = await rag.ask("Qui héberge GIDAF ?")
+        """
+        start_time = time.time()
+        timings = {}
+        retrieval = self.retrieval
+
+        # Paraphrase d'une question déjà traitée ?
+        result = await self._run(retrieval._lookup_paraphrase, question, filter_metadata)
+        if result is not None:
+            return retrieval._record_timings(result, timings, start_time)
+
+        chunks = await self.search_chunks(question, n_chunks, filter_metadata, timings)
+
+        if not chunks:
+            return retrieval._record_timings(
+                RAGQuerySystem._no_chunks_result(question), timings, start_time
+            )
+
+        result = await self.generate_answer(
+            question, chunks, temperature=temperature, timings=timings
+        )
+        result['question'] = question
+        await self._run(retrieval._store_paraphrase, question, result, filter_metadata)
+
+        return retrieval._record_timings(result, timings, start_time)
+
+    async def ask_many(
+        self,
+        questions: List[str],
+        n_chunks: int = 5,
+        concurrency: int = 16,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3
+    ) -> List[Dict]:
+        """
+        Pose plusieurs questions avec au plus `concurrency` générations en vol.
+
+        La recherche est faite en un seul lot (voir RAGQuerySystem.search_chunks_many).
+
+        Returns:
+            Réponses dans l'ordre des questions (erreurs dans la clé 'error')
+        """
+        batch_timings = {}
+        all_chunks = await self._run(
+            self.retrieval.search_chunks_many, questions, n_chunks, filter_metadata, batch_timings
+        )
+        self.retrieval.metrics.observe_timings(batch_timings)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def answer(question: str, chunks: List[Dict]) -> Dict:
+            if not chunks:
+                return RAGQuerySystem._no_chunks_result(question)
+
+            async with semaphore:
+                start_time = time.time()
+                timings = {}
+                try:
+                    result = await self.generate_answer(
+                        question, chunks, temperature=temperature, timings=timings
+                    )
+                except Exception as e:
+                    return {
+                        'question': question,
+                        'answer': None,
+                        'sources': [c['id'] for c in chunks],
+                        'chunks_used': chunks,
+                        'tokens_used': 0,
+                        'total_time': time.time() - start_time,
+                        'error': str(e)
+                    }
+
+            result['question'] = question
+            result.update(timings)
+            result['total_time'] = time.time() - start_time
+            self.retrieval.metrics.observe_timings(timings)
+            self.retrieval.metrics.inc('questions')
+            return result
+
+        return await asyncio.gather(*[
+            answer(question, chunks) for question, chunks in zip(questions, all_chunks)
+        ])
+
+    def get_stats(self) -> Dict:
+        """Statistiques de la base vectorielle (voir RAGQuerySystem.get_stats)."""
+        return self.retrieval.get_stats()
+
+    async def aclose(self) -> None:
+        """Ferme les connexions du provider et le pool de threads."""
+        await self.llm_provider.aclose()
+        self._executor.shutdown(wait=False)
+
+
 def main():
     """
     Fonction principale pour tester le système en ligne de commande.
     """
-    import sys
     import argparse
 
     parser = argparse.ArgumentParser(
@@ -299,9 +1476,31 @@ def main():
         type=int,
         help='Timeout en secondes pour Ollama (défaut: 300s ou OLLAMA_TIMEOUT dans .env)'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Afficher la réponse au fil de la génération'
+    )
 
     args = parser.parse_args()
 
+    def answer(question: str, n_chunks: int) -> Dict:
+        if not args.stream:
+            result = rag.ask(question, n_chunks=n_chunks)
+            print(f"\n💬 Réponse:")
+            print(result['answer'])
+            return result
+
+        for event in rag.ask_stream(question, n_chunks=n_chunks):
+            if event['type'] == 'sources':
+                print(f"\n📚 Sources: {', '.join(event['sources'][:3])}...")
+                print(f"\n💬 Réponse:")
+            elif event['type'] == 'token':
+                print(event['content'], end='', flush=True)
+            else:
+                print()
+                return event['result']
+
     print("Initialisation du système RAG...")
     rag = RAGQuerySystem(timeout=args.timeout)
 
@@ -315,10 +1514,7 @@ def main():
         print(f"\n❓ Question: {args.query}")
         print("\n🔍 Recherche en cours...")
 
-        result = rag.ask(args.query, n_chunks=args.n_chunks)
-
-        print(f"\n💬 Réponse:")
-        print(result['answer'])
+        result = answer(args.query, args.n_chunks)
 
         print(f"\n📊 Métadonnées:")
         print(f"  - Sources: {len(result['sources'])} chunks")
@@ -340,10 +1536,7 @@ def main():
                 continue
 
             print("\n🔍 Recherche en cours...")
-            result = rag.ask(question)
-
-            print(f"\n💬 Réponse:")
-            print(result['answer'])
+            result = answer(question, 5)
 
             print(f"\n📊 Métadonnées:")
             print(f"  - Sources: {len(result['sources'])} chunks")
@@ -0,0 +1,404 @@
+"""
+Serveur RAG résident.
+
+Garde en mémoire un RAGQuerySystem (client ChromaDB, modèle d'embedding,
+provider LLM) et répond aux questions en HTTP sur localhost ou sur une
+socket UNIX. query-rag l'utilise automatiquement lorsqu'il tourne, ce qui
+évite de recharger les modèles à chaque appel.
+
+Ce module n'importe ni ChromaDB ni Sentence Transformers : le client reste
+léger à charger.
+
+API (JSON):
+    GET  /health  -> configuration du serveur (collection, modèles, options, pid)
+    GET  /stats   -> RAGQuerySystem.get_stats()
+    GET  /metrics -> latences par étape au format texte Prometheus
+    GET  /metrics.json -> mêmes métriques en JSON (percentiles p50/p95/p99)
+    POST /ask     -> RAGQuerySystem.ask() ; avec "stream": true, les
+                     événements de ask_stream() sont renvoyés en NDJSON
+"""
+
+import http.client
+import json
+import os
+import socket
+import socketserver
+import stat
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_SERVER_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+# Variable d'environnement permettant de changer l'adresse par défaut
+SERVER_URL_ENV = 'DYAG_RAG_SERVER'
+
+
+def default_server_url() -> str:
+    """Adresse du serveur RAG (DYAG_RAG_SERVER ou http://127.0.0.1:8765)."""
+    return os.environ.get(SERVER_URL_ENV) or DEFAULT_SERVER_URL
+
+
+def parse_server_url(url: str) -> Dict:
+    """
+    Décode l'adresse d'un serveur RAG.
+
+    Args:
+        url: 'http://hote:port' ou 'unix:///chemin/vers/socket'
+
+    Returns:
+        {'scheme': 'http', 'host': ..., 'port': ...}
+        ou {'scheme': 'unix', 'path': ...}
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'unix':
+        path = parsed.path or parsed.netloc
+        if not path:
+            raise ValueError(f"Adresse de socket UNIX invalide: {url}")
+        return {'scheme': 'unix', 'path': path}
+    if parsed.scheme == 'http':
+        return {
+            'scheme': 'http',
+            'host': parsed.hostname or DEFAULT_HOST,
+            'port': parsed.port or DEFAULT_PORT
+        }
+    raise ValueError(f"Adresse de serveur non supportée: {url} (http://... ou unix://...)")
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Traite les requêtes HTTP adressées au serveur RAG."""
+
+    server_version = 'dyag-rag-serve'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.server.describe())
+        elif self.path == '/stats':
+            self._send_json(200, self.server.rag.get_stats())
+        elif self.path == '/metrics':
+            body = self.server.rag.metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/metrics.json':
+            self._send_json(200, self.server.rag.metrics.to_dict())
+        else:
+            self._send_json(404, {'error': f"Route inconnue: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/ask':
+            self._send_json(404, {'error': f"Route inconnue: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+            question = payload['question']
+            kwargs = {
+                'n_chunks': int(payload.get('n_chunks', 5)),
+                'filter_metadata': payload.get('filter_metadata'),
+                'temperature': float(payload.get('temperature', 0.3))
+            }
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {'error': f"Requête invalide: {e}"})
+            return
+
+        if payload.get('stream'):
+            self._stream(question, kwargs)
+            return
+
+        try:
+            result = self.server.rag.ask(question, **kwargs)
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+        self._send_json(200, result)
+
+    def _stream(self, question: str, kwargs: Dict) -> None:
+        """Renvoie les événements de ask_stream() au fil de l'eau (une ligne JSON par événement)."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.end_headers()
+
+        try:
+            for event in self.server.rag.ask_stream(question, **kwargs):
+                self._write_line(event)
+        except Exception as e:
+            self._write_line({'type': 'error', 'error': str(e)})
+
+    def _write_line(self, data: Dict) -> None:
+        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: Dict) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Les connexions sur socket UNIX n'ont pas d'adresse (host, port)
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _RAGServerMixin:
+    """Partie commune aux serveurs HTTP et socket UNIX."""
+
+    daemon_threads = True
+
+    def attach(self, rag, url: str, verbose: bool = False, settings: Optional[Dict] = None) -> None:
+        self.rag = rag
+        self.url = url
+        self.verbose = verbose
+        self.settings = settings or {}
+
+    def describe(self) -> Dict:
+        """Configuration du serveur, utilisée par les clients pour vérifier la correspondance."""
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'url': self.url,
+            'chroma_path': str(Path(self.rag.chroma_path).resolve()),
+            'collection': ','.join(self.rag.collection_names),
+            'embedding_model': self.rag.embedding_model_name,
+            'llm_model': self.rag.llm_provider.get_model_name(),
+            'settings': self.settings
+        }
+
+
+class RAGHTTPServer(_RAGServerMixin, ThreadingHTTPServer):
+    """Serveur RAG en HTTP (une thread par requête)."""
+
+
+class RAGUnixServer(_RAGServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serveur RAG sur socket UNIX (une thread par requête)."""
+
+    def server_bind(self):
+        # Une socket laissée par un serveur arrêté brutalement empêcherait le bind
+        if not self._remove_socket() and os.path.lexists(self.server_address):
+            raise ValueError(f"{self.server_address} existe et n'est pas une socket UNIX")
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        self._remove_socket()
+
+    def _remove_socket(self) -> bool:
+        """Supprime le fichier de la socket, s'il en est bien une (jamais un autre fichier)."""
+        try:
+            if not stat.S_ISSOCK(os.lstat(self.server_address).st_mode):
+                return False
+        except FileNotFoundError:
+            return False
+        os.unlink(self.server_address)
+        return True
+
+
+def create_server(rag, url: Optional[str] = None, verbose: bool = False, settings: Optional[Dict] = None):
+    """
+    Crée le serveur RAG (sans le démarrer).
+
+    Args:
+        rag: RAGQuerySystem déjà initialisé
+        url: Adresse d'écoute ('http://127.0.0.1:8765' ou 'unix:///chemin')
+        verbose: Journaliser chaque requête
+        settings: Options du RAGQuerySystem publiées dans /health
+                 (voir query_rag.rag_settings)
+
+    Returns:
+        Serveur prêt pour serve_forever()
+    """
+    url = url or default_server_url()
+    address = parse_server_url(url)
+
+    if address['scheme'] == 'unix':
+        server = RAGUnixServer(address['path'], RAGRequestHandler)
+    else:
+        server = RAGHTTPServer((address['host'], address['port']), RAGRequestHandler)
+        if address['port'] == 0:
+            url = f"http://{address['host']}:{server.server_address[1]}"
+
+    server.attach(rag, url, verbose, settings)
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """Connexion HTTP sur socket UNIX."""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RAGServerClient:
+    """
+    Client du serveur RAG.
+
+    Expose ask(), ask_stream() et get_stats() avec la même signature que
+    RAGQuerySystem, pour pouvoir être utilisé à sa place.
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 600.0):
+        """
+        Initialise le client.
+
+        Args:
+            url: Adresse du serveur (défaut: DYAG_RAG_SERVER ou http://127.0.0.1:8765)
+            timeout: Timeout des requêtes en secondes (la génération peut être longue)
+        """
+        self.url = url or default_server_url()
+        self.address = parse_server_url(self.url)
+        self.timeout = timeout
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self.address['scheme'] == 'unix':
+            return _UnixHTTPConnection(self.address['path'], timeout)
+        return http.client.HTTPConnection(self.address['host'], self.address['port'], timeout=timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None,
+                 timeout: Optional[float] = None):
+        conn = self._connection(timeout or self.timeout)
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json; charset=utf-8'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        return conn, conn.getresponse()
+
+    def _json(self, method: str, path: str, payload: Optional[Dict] = None,
+              timeout: Optional[float] = None) -> Dict:
+        conn, response = self._request(method, path, payload, timeout)
+        try:
+            data = json.loads(response.read().decode('utf-8'))
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise RuntimeError(f"Serveur RAG ({response.status}): {data.get('error')}")
+        return data
+
+    def health(self, timeout: float = 0.5) -> Optional[Dict]:
+        """
+        Interroge le serveur.
+
+        Args:
+            timeout: Délai maximal en secondes
+
+        Returns:
+            Configuration du serveur ou None s'il ne répond pas
+        """
+        try:
+            return self._json('GET', '/health', timeout=timeout)
+        except (OSError, http.client.HTTPException, ValueError, RuntimeError):
+            return None
+
+    def get_stats(self) -> Dict:
+        """Statistiques du RAGQuerySystem du serveur."""
+        return self._json('GET', '/stats')
+
+    def get_metrics(self) -> Dict:
+        """Latences par étape mesurées par le serveur (voir MetricsRegistry.to_dict)."""
+        return self._json('GET', '/metrics.json')
+
+    def ask(
+        self,
+        question: str,
+        n_chunks: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3
+    ) -> Dict:
+        """Pose une question au serveur (voir RAGQuerySystem.ask)."""
+        return self._json('POST', '/ask', {
+            'question': question,
+            'n_chunks': n_chunks,
+            'filter_metadata': filter_metadata,
+            'temperature': temperature
+        })
+
+    def ask_stream(
+        self,
+        question: str,
+        n_chunks: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        temperature: float = 0.3
+    ) -> Iterator[Dict]:
+        """Pose une question au serveur en streaming (voir RAGQuerySystem.ask_stream)."""
+        conn, response = self._request('POST', '/ask', {
+            'question': question,
+            'n_chunks': n_chunks,
+            'filter_metadata': filter_metadata,
+            'temperature': temperature,
+            'stream': True
+        })
+        try:
+            if response.status != 200:
+                data = json.loads(response.read().decode('utf-8'))
+                raise RuntimeError(f"Serveur RAG ({response.status}): {data.get('error')}")
+
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line.decode('utf-8'))
+                if event['type'] == 'error':
+                    raise RuntimeError(f"Serveur RAG: {event['error']}")
+                yield event
+        finally:
+            conn.close()
+
+
+def find_server(
+    url: Optional[str] = None,
+    chroma_path: Optional[str] = None,
+    collection_name: Optional[str] = None,
+    embedding_model: Optional[str] = None,
+    settings: Optional[Dict] = None
+) -> Optional[RAGServerClient]:
+    """
+    Cherche un serveur RAG actif servant la même base.
+
+    Args:
+        url: Adresse du serveur (défaut: DYAG_RAG_SERVER ou http://127.0.0.1:8765)
+        chroma_path: Base ChromaDB attendue (None = ne pas vérifier)
+        collection_name: Collection attendue, ou collections séparées par des
+                        virgules (None = ne pas vérifier)
+        embedding_model: Modèle d'embedding attendu (None = ne pas vérifier)
+        settings: Options du RAGQuerySystem attendues (reranking, caches,
+                 budget du prompt...), None = ne pas vérifier
+
+    Returns:
+        Client connecté, ou None si aucun serveur compatible ne répond
+    """
+    try:
+        client = RAGServerClient(url)
+    except ValueError:
+        return None
+
+    info = client.health()
+    if info is None:
+        return None
+
+    if chroma_path is not None and info.get('chroma_path') != str(Path(chroma_path).resolve()):
+        return None
+    if collection_name is not None and info.get('collection') != collection_name:
+        return None
+    if embedding_model is not None and info.get('embedding_model') != embedding_model:
+        return None
+    if settings is not None and info.get('settings') != settings:
+        return None
+
+    return client
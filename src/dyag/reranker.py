@@ -0,0 +1,151 @@
+"""
+Reranking des chunks par cross-encoder.
+
+La recherche vectorielle (bi-encoder) classe les chunks de façon
+approximative. Un cross-encoder lit la question et le chunk ensemble et
+donne un classement bien plus précis : on peut alors récupérer largement
+(k×N candidats), rescorer et n'envoyer au LLM que les k meilleurs chunks.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sentence_transformers import CrossEncoder
+
+try:
+    from .rag_cache import content_hash, normalize_query
+except ImportError:
+    from rag_cache import content_hash, normalize_query
+
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """
+    Rerank de chunks avec un cross-encoder local.
+
+    Toutes les paires (question, chunk) non présentes dans le cache sont
+    scorées en une seule passe batchée. Les scores sont mis en cache (LRU)
+    par (empreinte de la question, ID du chunk, empreinte du contenu).
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        batch_size: int = 32,
+        cache_size: int = 10000
+    ):
+        """
+        Charge le modèle.
+
+        Args:
+            model_name: Modèle CrossEncoder (Sentence Transformers)
+            batch_size: Taille des lots de la passe de scoring
+            cache_size: Nombre maximal de scores gardés en cache (0 = désactivé)
+        """
+        print(f"Chargement du modèle de reranking: {model_name}")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name)
+        self.batch_size = batch_size
+        self.cache_size = max(0, cache_size)
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query_hash: str, chunk: Dict) -> Tuple[str, str, str]:
+        return (query_hash, chunk['id'], content_hash(chunk['content']))
+
+    def rerank(self, query: str, chunks: List[Dict], top_k: Optional[int] = None) -> List[Dict]:
+        """
+        Reclasse les chunks d'une question.
+
+        Args:
+            query: Question en langage naturel
+            chunks: Chunks candidats (avec 'id' et 'content')
+            top_k: Nombre de chunks à conserver (None = tous)
+
+        Returns:
+            Chunks triés par 'rerank_score' décroissant
+        """
+        return self.rerank_many([query], [chunks], top_k)[0]
+
+    def rerank_many(
+        self,
+        queries: List[str],
+        chunk_lists: List[List[Dict]],
+        top_k: Optional[int] = None
+    ) -> List[List[Dict]]:
+        """
+        Reclasse les chunks de plusieurs questions en une seule passe.
+
+        Args:
+            queries: Questions en langage naturel
+            chunk_lists: Chunks candidats de chaque question
+            top_k: Nombre de chunks à conserver par question (None = tous)
+
+        Returns:
+            Une liste de chunks triés par 'rerank_score' par question
+        """
+        keys = [
+            [self._key(content_hash(normalize_query(query)), chunk) for chunk in chunks]
+            for query, chunks in zip(queries, chunk_lists)
+        ]
+
+        # Paires absentes du cache, sans doublons
+        with self._lock:
+            scores = {}
+            pending = {}
+            for query, chunks, chunk_keys in zip(queries, chunk_lists, keys):
+                for chunk, key in zip(chunks, chunk_keys):
+                    if key in scores or key in pending:
+                        continue
+                    if key in self._scores:
+                        self._scores.move_to_end(key)
+                        scores[key] = self._scores[key]
+                        self.hits += 1
+                    else:
+                        pending[key] = (query, chunk['content'])
+                        self.misses += 1
+
+        if pending:
+            predicted = self.model.predict(
+                list(pending.values()),
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            new_scores = dict(zip(pending, (float(s) for s in predicted)))
+            scores.update(new_scores)
+
+            if self.cache_size:
+                with self._lock:
+                    self._scores.update(new_scores)
+                    while len(self._scores) > self.cache_size:
+                        self._scores.popitem(last=False)
+
+        reranked = []
+        for chunks, chunk_keys in zip(chunk_lists, keys):
+            scored = [dict(chunk, rerank_score=scores[key]) for chunk, key in zip(chunks, chunk_keys)]
+            scored.sort(key=lambda c: c['rerank_score'], reverse=True)
+            reranked.append(scored[:top_k] if top_k is not None else scored)
+        return reranked
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache de scores.
+
+        Returns:
+            Modèle, taille du cache, hits, misses et taux de hit
+        """
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'cache_size': len(self._scores),
+            'max_cache_size': self.cache_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0
+        }
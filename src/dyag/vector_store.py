@@ -0,0 +1,1103 @@
+"""
+Stockage vectoriel des chunks RAG.
+
+Deux backends exposent la même interface, calquée sur celle d'une
+collection ChromaDB (add, query, get, delete, count) :
+
+- 'chroma' : collection ChromaDB persistante (défaut historique)
+- 'numpy'  : embeddings normalisés dans un fichier .npy ouvert en memmap,
+             chunks et métadonnées dans un fichier JSONL à côté. La recherche
+             est un produit matriciel, ou passe par un index IVF (partition
+             k-means) au-delà de IVF_MIN_VECTORS vecteurs. Sans autre
+             dépendance que NumPy, ce backend démarre et répond bien plus vite
+             que ChromaDB sur quelques dizaines de milliers de chunks.
+             Les embeddings peuvent y être stockés en float16 ou en int8
+             (quantification scalaire par vecteur), et réduits à moins de
+             dimensions (troncature ou ACP) ; les questions subissent la même
+             projection. compression_report() mesure le rappel obtenu par
+             rapport au stockage float32 complet.
+
+Les deux backends sont rangés dans le même répertoire (--chroma-path).
+"""
+
+import io
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .hybrid_search import matches_filter
+except ImportError:
+    from hybrid_search import matches_filter
+
+
+STORE_TYPES = ('chroma', 'numpy')
+DEFAULT_STORE = 'chroma'
+
+# Types de stockage des embeddings du backend numpy
+STORE_DTYPES = ('float32', 'float16', 'int8')
+
+# Réductions de dimension du backend numpy
+PROJECTIONS = ('truncate', 'pca')
+
+# Nombre d'embeddings utilisés pour ajuster l'ACP et pour compression_report()
+PROJECTION_SAMPLE_SIZE = 2000
+
+# En dessous de ce nombre de vecteurs, la recherche exacte est plus rapide que l'IVF
+IVF_MIN_VECTORS = 20000
+
+# Nombre de lignes converties en float32 à la fois pendant la recherche exacte
+SEARCH_BLOCK_SIZE = 16384
+
+
+def numpy_store_path(chroma_path: str, collection_name: str) -> Path:
+    """
+    Chemin du répertoire d'une collection du backend numpy.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        Chemin '<chroma_path>/<collection>.npstore'
+    """
+    return Path(chroma_path) / f"{collection_name}.npstore"
+
+
+def detect_store(chroma_path: str, collection_name: str) -> str:
+    """
+    Détermine le backend d'une collection existante.
+
+    Args:
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+
+    Returns:
+        'numpy' si la collection existe au format numpy, 'chroma' sinon
+    """
+    if (numpy_store_path(chroma_path, collection_name) / 'store.json').exists():
+        return 'numpy'
+    return 'chroma'
+
+
+def fit_projection(embeddings: np.ndarray, dims: int, method: str = 'truncate') -> Dict:
+    """
+    Ajuste une réduction de dimension des embeddings.
+
+    Args:
+        embeddings: Échantillon d'embeddings (n, dim) ; inutilisé pour 'truncate'
+        dims: Nombre de dimensions conservées
+        method: 'truncate' (premières dimensions, adapté aux modèles
+               Matryoshka) ou 'pca' (analyse en composantes principales)
+
+    Returns:
+        Projection {'method', 'dims', 'mean', 'components'} pour apply_projection
+    """
+    if method not in PROJECTIONS:
+        raise ValueError(f"Projection inconnue: {method} (choix: {', '.join(PROJECTIONS)})")
+    if method == 'truncate':
+        return {'method': method, 'dims': dims, 'mean': None, 'components': None}
+
+    vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    if len(vectors) < dims:
+        raise ValueError(f"ACP sur {dims} dimensions impossible avec {len(vectors)} embeddings")
+    mean = vectors.mean(axis=0)
+    _, _, components = np.linalg.svd(vectors - mean, full_matrices=False)
+    return {'method': method, 'dims': dims, 'mean': mean, 'components': components[:dims].astype(np.float32)}
+
+
+def apply_projection(vectors: np.ndarray, projection: Optional[Dict]) -> np.ndarray:
+    """
+    Projette des embeddings normalisés et renormalise le résultat.
+
+    Args:
+        vectors: Embeddings normalisés (n, dim)
+        projection: Résultat de fit_projection (None = aucune réduction)
+
+    Returns:
+        Embeddings (n, dims) normalisés
+    """
+    if projection is None:
+        return vectors
+    if projection['method'] == 'truncate':
+        return _normalize_rows(vectors[:, :projection['dims']])
+    return _normalize_rows((vectors - projection['mean']) @ projection['components'].T)
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Convertit des embeddings float32 dans le type de stockage.
+
+    En int8, chaque vecteur est divisé par son échelle (max(|x|) / 127) ;
+    l'échelle est conservée à part pour reconstruire les scores.
+
+    Args:
+        vectors: Embeddings float32 (n, dim)
+        dtype: 'float32', 'float16' ou 'int8'
+
+    Returns:
+        (codes, échelles) ; échelles vaut None hors int8
+    """
+    if dtype != 'int8':
+        return vectors.astype(dtype), None
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Reconstruit des embeddings float32 à partir de leur stockage (voir quantize)."""
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors *= np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+def compression_report(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    dims: Optional[int] = None,
+    projection: str = 'truncate',
+    k: int = 10
+) -> List[Dict]:
+    """
+    Mesure le rappel des stockages compressés par rapport au float32 complet.
+
+    Pour chaque combinaison (type de stockage, dimensions), les k plus proches
+    voisins de chaque requête sont comparés à ceux de la recherche exacte en
+    float32 sur toutes les dimensions.
+
+    Args:
+        embeddings: Embeddings du corpus (n, dim)
+        queries: Embeddings des requêtes (m, dim)
+        dims: Dimensions réduites à évaluer en plus des dimensions complètes
+        projection: Méthode de réduction ('truncate' ou 'pca')
+        k: Nombre de voisins comparés
+
+    Returns:
+        Une ligne par configuration : dtype, dims, bytes_per_vector, recall
+    """
+    corpus = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    queries = _normalize_rows(np.asarray(queries, dtype=np.float32))
+    k = min(k, len(corpus))
+    baseline = np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+    projections = [None]
+    if dims and dims < corpus.shape[1]:
+        projections.append(fit_projection(corpus, dims, projection))
+
+    report = []
+    for proj in projections:
+        projected_corpus = apply_projection(corpus, proj)
+        projected_queries = apply_projection(queries, proj)
+        for dtype in STORE_DTYPES:
+            codes, scales = quantize(projected_corpus, dtype)
+            found = np.argsort(-(projected_queries @ dequantize(codes, scales).T), axis=1)[:, :k]
+            recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, baseline)])
+            report.append({
+                'dtype': dtype,
+                'dims': projected_corpus.shape[1],
+                'projection': proj['method'] if proj else None,
+                'bytes_per_vector': codes.shape[1] * codes.itemsize + (4 if scales is not None else 0),
+                'recall': float(recall)
+            })
+    return report
+
+
+def distance_to_similarity(distance: float, metric: str) -> float:
+    """
+    Convertit une distance renvoyée par query() en similarité cosinus.
+
+    Les collections n'utilisent pas toutes la même distance (ChromaDB mesure
+    par défaut le carré de la distance L2, le backend numpy la distance
+    cosinus) : la similarité permet de comparer les résultats de plusieurs
+    collections. Pour 'l2', les embeddings sont supposés normalisés, ce qui
+    est le cas des modèles Sentence Transformers utilisés par dyag.
+
+    Args:
+        distance: Distance entre la question et le chunk
+        metric: Distance de la collection ('cosine', 'ip' ou 'l2')
+
+    Returns:
+        Similarité cosinus (1 = identique)
+    """
+    if metric == 'l2':
+        return 1.0 - distance / 2.0
+    if metric in ('cosine', 'ip'):
+        return 1.0 - distance
+    raise ValueError(f"Distance inconnue: {metric}")
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def open_vector_store(
+    store: str,
+    chroma_path: str,
+    collection_name: str,
+    create: bool = False,
+    reset: bool = False,
+    **options
+) -> 'VectorStore':
+    """
+    Ouvre (ou crée) une collection.
+
+    Args:
+        store: Backend ('chroma' ou 'numpy')
+        chroma_path: Répertoire de la base vectorielle
+        collection_name: Nom de la collection
+        create: Créer la collection si elle n'existe pas
+        reset: Supprimer la collection existante avant de l'ouvrir
+        **options: Options propres au backend (ex: dtype, nprobe pour numpy)
+
+    Returns:
+        VectorStore prêt à l'emploi
+    """
+    if store == 'chroma':
+        return ChromaVectorStore(chroma_path, collection_name, create=create, reset=reset)
+    if store == 'numpy':
+        return NumpyVectorStore(chroma_path, collection_name, create=create, reset=reset, **options)
+    raise ValueError(f"Backend vectoriel inconnu: {store} (choix: {', '.join(STORE_TYPES)})")
+
+
+class VectorStore(ABC):
+    """
+    Interface commune des backends vectoriels.
+
+    Les résultats suivent le format de ChromaDB : query() renvoie des listes
+    par requête ('ids', 'documents', 'metadatas', 'distances'), get() des
+    listes plates ('ids', 'documents', 'metadatas').
+    """
+
+    name: str
+
+    @abstractmethod
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: Sequence[Sequence[float]]
+    ) -> None:
+        """Ajoute des chunks avec leurs embeddings (un ID existant est remplacé)."""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        where: Optional[Dict] = None
+    ) -> Dict:
+        """Renvoie les n_results chunks les plus proches de chaque requête."""
+        pass
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Récupère des chunks par ID ou par filtre de métadonnées.
+
+        include limite les champs renvoyés ('documents', 'metadatas' ; None =
+        les deux) : les champs exclus valent None.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Supprime des chunks."""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Nombre de chunks de la collection."""
+        pass
+
+    @abstractmethod
+    def replace(self, collection_name: str) -> None:
+        """
+        Remplace la collection collection_name par celle-ci, qui prend son nom.
+
+        Permet de reconstruire une collection à part (index-rag --reset) sans
+        exposer une collection à moitié vide aux requêtes en cours. Un
+        processus qui a ouvert l'ancienne collection continue de la lire
+        (numpy) ou doit la rouvrir (chroma, où elle est supprimée).
+        """
+        pass
+
+    @abstractmethod
+    def modification_stamp(self) -> str:
+        """Valeur qui change à chaque écriture dans la collection (cache des statistiques)."""
+        pass
+
+    def distance_metric(self) -> str:
+        """Distance utilisée par query() ('cosine', 'ip' ou 'l2', voir distance_to_similarity)."""
+        return 'cosine'
+
+    def optimize(self) -> None:
+        """Reconstruit les structures d'accélération après une indexation."""
+        pass
+
+    def close(self) -> None:
+        """Libère les ressources du backend."""
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """Collection ChromaDB persistante."""
+
+    def __init__(self, chroma_path: str, collection_name: str, create: bool = False, reset: bool = False):
+        """
+        Ouvre une collection ChromaDB.
+
+        Args:
+            chroma_path: Répertoire de la base ChromaDB
+            collection_name: Nom de la collection
+            create: Créer la collection si elle n'existe pas
+            reset: Supprimer la collection existante
+        """
+        # Import différé : ChromaDB est long à charger et inutile avec le backend numpy
+        import chromadb
+
+        self.chroma_path = Path(chroma_path)
+        self.client = chromadb.PersistentClient(path=str(chroma_path))
+        if reset:
+            try:
+                self.client.delete_collection(collection_name)
+            except Exception:
+                pass
+
+        if create:
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata={"description": "Chunks d'applications pour RAG"}
+            )
+        else:
+            self.collection = self.client.get_collection(collection_name)
+        self.name = self.collection.name
+
+    def add(self, ids, documents, metadatas, embeddings) -> None:
+        self.collection.upsert(
+            ids=ids, documents=documents, metadatas=metadatas,
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist()
+        )
+
+    def query(self, query_embeddings, n_results=10, where=None) -> Dict:
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> Dict:
+        return self.collection.get(
+            ids=ids, where=where, limit=limit, offset=offset,
+            include=include if include is not None else ['documents', 'metadatas']
+        )
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def replace(self, collection_name: str) -> None:
+        # L'ancienne collection est renommée avant d'être supprimée : son nom
+        # désigne toujours une collection complète. Les processus qui l'avaient
+        # ouverte (rag-serve) doivent la rouvrir pour lire la nouvelle.
+        old_name = f"{collection_name}_old"
+        try:
+            self.client.delete_collection(old_name)
+        except Exception:
+            pass
+        try:
+            old = self.client.get_collection(collection_name)
+        except Exception:
+            old = None
+        if old is not None:
+            old.modify(name=old_name)
+        self.collection.modify(name=collection_name)
+        if old is not None:
+            self.client.delete_collection(old_name)
+        self.name = collection_name
+
+    def modification_stamp(self) -> str:
+        # Base SQLite commune aux collections : toute écriture change le tampon
+        database = self.chroma_path / 'chroma.sqlite3'
+        mtime = database.stat().st_mtime_ns if database.exists() else 0
+        return f"{self.count()}:{mtime}"
+
+    def distance_metric(self) -> str:
+        return (self.collection.metadata or {}).get('hnsw:space', 'l2')
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Collection en mémoire projetée (memmap) sur des fichiers NumPy.
+
+    Fichiers du répertoire de la collection :
+        store.json      dimensions, type de stockage, projection, nombre de chunks
+        embeddings.npy  matrice (n, dims) des embeddings normalisés
+        scales.npy      échelle de chaque vecteur (stockage int8 uniquement)
+        projection.npz  moyenne et composantes de l'ACP (projection 'pca')
+        chunks.jsonl    une ligne {id, document, metadata} par ligne de la matrice
+        ivf.npz         centroïdes et affectations de l'index IVF (si construit)
+
+    Les distances renvoyées sont des distances cosinus (1 - similarité).
+    Ajouter un ID existant remplace le chunk : sa nouvelle version est ajoutée
+    à la fin des fichiers et masque l'ancienne, retirée par optimize().
+    """
+
+    def __init__(
+        self,
+        chroma_path: str,
+        collection_name: str,
+        create: bool = False,
+        reset: bool = False,
+        dtype: str = 'float32',
+        dims: Optional[int] = None,
+        projection: str = 'truncate',
+        nprobe: int = 16,
+        ivf_min_vectors: int = IVF_MIN_VECTORS
+    ):
+        """
+        Ouvre une collection numpy.
+
+        Args:
+            chroma_path: Répertoire de la base vectorielle
+            collection_name: Nom de la collection
+            create: Créer la collection si elle n'existe pas
+            reset: Supprimer la collection existante
+            dtype: Type de stockage des embeddings d'une nouvelle collection
+                  ('float32', 'float16' ou 'int8')
+            dims: Nombre de dimensions stockées d'une nouvelle collection
+                 (None = toutes)
+            projection: Réduction de dimension si dims est fourni
+                       ('truncate' ou 'pca' ; l'ACP doit être ajustée avec
+                       fit_projection avant le premier add)
+            nprobe: Nombre de partitions IVF explorées par requête
+            ivf_min_vectors: Taille de collection à partir de laquelle optimize()
+                            construit l'index IVF
+        """
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Type de stockage inconnu: {dtype} (choix: {', '.join(STORE_DTYPES)})")
+        if projection not in PROJECTIONS:
+            raise ValueError(f"Projection inconnue: {projection} (choix: {', '.join(PROJECTIONS)})")
+
+        self.name = collection_name
+        self.path = numpy_store_path(chroma_path, collection_name)
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self._lock = threading.Lock()
+
+        if reset and self.path.exists():
+            shutil.rmtree(self.path)
+        self._set_paths()
+
+        if not self._config_path.exists():
+            if not create:
+                raise ValueError(f"Collection '{collection_name}' non trouvée dans {self.path.parent}")
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.config = {
+                'version': 1, 'dim': None, 'dtype': dtype, 'metric': 'cosine', 'count': 0,
+                'dims': dims, 'projection': projection if dims else None
+            }
+            self._save_config()
+        else:
+            with open(self._config_path, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Chargement et persistance
+    # ------------------------------------------------------------------
+
+    def _set_paths(self) -> None:
+        self._config_path = self.path / 'store.json'
+        self._embeddings_path = self.path / 'embeddings.npy'
+        self._scales_path = self.path / 'scales.npy'
+        self._projection_path = self.path / 'projection.npz'
+        self._chunks_path = self.path / 'chunks.jsonl'
+        self._ivf_path = self.path / 'ivf.npz'
+
+    def _load(self) -> None:
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        if self._chunks_path.exists():
+            with open(self._chunks_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._ids.append(record['id'])
+                    self._documents.append(record['document'])
+                    self._metadatas.append(record['metadata'])
+        self._filter_masks: Dict[str, np.ndarray] = {}
+        self._value_rows: Dict[str, Dict] = {}
+        self._dead = None
+
+        self._matrix = None
+        self._scales = None
+        if self._embeddings_path.exists():
+            self._matrix = np.load(self._embeddings_path, mmap_mode='r')
+        if self._scales_path.exists():
+            self._scales = np.load(self._scales_path, mmap_mode='r')
+
+        # Écriture interrompue entre les embeddings et chunks.jsonl : les lignes
+        # sans leur contrepartie sont ignorées, puis retirées des fichiers à la
+        # prochaine écriture (index-rag --resume reprend la construction)
+        lengths = [len(self._ids), len(self._matrix) if self._matrix is not None else 0]
+        if self._scales is not None or self.config['dtype'] == 'int8':
+            lengths.append(len(self._scales) if self._scales is not None else 0)
+        n = min(lengths)
+        self._needs_repair = any(length != n for length in lengths)
+        if self._needs_repair:
+            del self._ids[n:], self._documents[n:], self._metadatas[n:]
+            if self._matrix is not None:
+                self._matrix = self._matrix[:n]
+            if self._scales is not None:
+                self._scales = self._scales[:n]
+        # Un ID présent sur plusieurs lignes désigne sa dernière version
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+
+        self._projection = None
+        if self.config.get('projection') == 'truncate':
+            self._projection = fit_projection(None, self.config['dims'], 'truncate')
+        elif self.config.get('projection') == 'pca' and self._projection_path.exists():
+            saved = np.load(self._projection_path)
+            self._projection = {
+                'method': 'pca', 'dims': self.config['dims'],
+                'mean': saved['mean'], 'components': saved['components']
+            }
+
+        self._centroids = None
+        self._assignments = None
+        self._lists = None
+        if self._ivf_path.exists():
+            ivf = np.load(self._ivf_path)
+            if len(ivf['assignments']) == len(self._ids):
+                self._centroids = ivf['centroids']
+                self._assignments = ivf['assignments']
+
+    def _save_config(self) -> None:
+        tmp_path = self._config_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.config, f, indent=2)
+        os.replace(tmp_path, self._config_path)
+
+    def _write_chunks(self, rows: Optional[range] = None) -> None:
+        """
+        Écrit chunks.jsonl : ajoute les lignes rows à la fin du fichier, ou
+        le réécrit en entier (remplacement atomique) si rows est None.
+        """
+        if rows is not None:
+            path = self._chunks_path
+            mode = 'a'
+        else:
+            path = self._chunks_path.with_suffix('.tmp')
+            mode = 'w'
+            rows = range(len(self._ids))
+        with open(path, mode, encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({
+                    'id': self._ids[row],
+                    'document': self._documents[row],
+                    'metadata': self._metadatas[row]
+                }, ensure_ascii=False) + '\n')
+        if path != self._chunks_path:
+            os.replace(path, self._chunks_path)
+
+    @staticmethod
+    def _save_array(path: Path, array: np.ndarray) -> None:
+        """
+        Réécrit un fichier .npy par remplacement atomique : un processus qui
+        l'a projeté en mémoire (rag-serve) garde l'ancien fichier, alors
+        qu'une réécriture sur place le tronquerait sous sa projection (SIGBUS).
+        """
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _append_rows(path: Path, rows: np.ndarray) -> None:
+        """Ajoute des lignes à un fichier .npy sans réécrire les précédentes."""
+        if not path.exists():
+            NumpyVectorStore._save_array(path, rows)
+            return
+
+        with open(path, 'r+b') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            header_size = f.tell()
+
+            # L'en-tête .npy est complété par des espaces pour pouvoir
+            # agrandir la première dimension sur place
+            header = io.BytesIO()
+            header_data = {
+                'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': fortran_order,
+                'shape': (shape[0] + len(rows),) + tuple(shape[1:])
+            }
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(header, header_data)
+            else:
+                np.lib.format.write_array_header_2_0(header, header_data)
+
+            if len(header.getvalue()) == header_size:
+                f.seek(0)
+                f.write(header.getvalue())
+                f.seek(0, io.SEEK_END)
+                f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+                return
+
+        existing = np.load(path)
+        NumpyVectorStore._save_array(path, np.concatenate([existing, rows]))
+
+    def _repair(self) -> None:
+        """Réécrit des fichiers cohérents après une écriture interrompue (voir _load)."""
+        if not self._needs_repair:
+            return
+        codes = np.asarray(self._matrix) if self._matrix is not None else None
+        scales = np.asarray(self._scales) if self._scales is not None else None
+        self._matrix = None
+        self._scales = None
+        if codes is not None:
+            self._save_array(self._embeddings_path, codes)
+        if scales is not None:
+            self._save_array(self._scales_path, scales)
+        if codes is not None:
+            self._reload_matrix()
+        self._write_chunks()
+        self._save_ivf()
+        self.config['count'] = len(self._rows)
+        self._save_config()
+        self._needs_repair = False
+
+    def _append_embeddings(self, codes: np.ndarray, scales: Optional[np.ndarray]) -> None:
+        # Fermer les projections mémoire avant de modifier les fichiers
+        self._matrix = None
+        self._scales = None
+        self._append_rows(self._embeddings_path, codes)
+        if scales is not None:
+            self._append_rows(self._scales_path, scales)
+        self._reload_matrix()
+
+    def _reload_matrix(self) -> None:
+        self._matrix = np.load(self._embeddings_path, mmap_mode='r')
+        if self._scales_path.exists():
+            self._scales = np.load(self._scales_path, mmap_mode='r')
+
+    def _save_ivf(self) -> None:
+        if self._centroids is None:
+            if self._ivf_path.exists():
+                self._ivf_path.unlink()
+            return
+        tmp_path = self._ivf_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, centroids=self._centroids, assignments=self._assignments)
+        os.replace(tmp_path, self._ivf_path)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    @property
+    def needs_fit(self) -> bool:
+        """True si la projection ACP doit être ajustée (fit_projection) avant d'ajouter des chunks."""
+        return self.config.get('projection') == 'pca' and self._projection is None
+
+    def fit_projection(self, embeddings: Sequence[Sequence[float]]) -> None:
+        """
+        Ajuste l'ACP de la collection sur un échantillon d'embeddings.
+
+        Args:
+            embeddings: Échantillon représentatif du corpus (au moins dims embeddings)
+        """
+        if self.config.get('projection') != 'pca':
+            return
+        if self._ids:
+            raise ValueError(f"La projection de la collection '{self.name}' est déjà utilisée")
+        self._projection = fit_projection(embeddings, self.config['dims'], 'pca')
+        with open(self._projection_path, 'wb') as f:
+            np.savez(f, mean=self._projection['mean'], components=self._projection['components'])
+
+    def _prepare(self, embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        """Normalise et projette des embeddings (chunks ou questions) dans l'espace stocké."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("Les embeddings doivent former une matrice (n, dim)")
+        if self.config['dim'] is not None and vectors.shape[1] != self.config['dim']:
+            raise ValueError(
+                f"Dimension d'embedding {vectors.shape[1]} incompatible avec "
+                f"la collection '{self.name}' ({self.config['dim']})"
+            )
+        if self.needs_fit:
+            raise ValueError(f"Projection ACP de la collection '{self.name}' non ajustée (fit_projection)")
+        return apply_projection(_normalize_rows(vectors), self._projection)
+
+    def add(self, ids, documents, metadatas, embeddings) -> None:
+        if not ids:
+            return
+        vectors = self._prepare(embeddings)
+
+        with self._lock:
+            self._repair()
+            # Dernière occurrence d'un ID dans le lot. Un ID déjà indexé est
+            # ajouté comme les autres : réécrire sa ligne sur place coûterait
+            # une réécriture de chunks.jsonl, sous les lecteurs de la collection
+            positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+            first_row = len(self._ids)
+            for chunk_id, i in positions.items():
+                self._rows[chunk_id] = len(self._ids)
+                self._ids.append(chunk_id)
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+            new_vectors = vectors[list(positions.values())]
+            self._append_embeddings(*quantize(new_vectors, self.config['dtype']))
+            if self._centroids is not None:
+                self._assignments = np.concatenate([self._assignments, self._assign(new_vectors)])
+            self._write_chunks(range(first_row, len(self._ids)))
+
+            self.config['dim'] = int(np.asarray(embeddings).shape[1])
+            self.config['count'] = len(self._rows)
+            self._save_config()
+            if self._centroids is not None:
+                self._save_ivf()
+            self._clear_caches()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._repair()
+            rows = {self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows}
+            if not rows:
+                return
+            self._compact(np.array(
+                [row for row in self._current_rows() if row not in rows], dtype=np.int64
+            ))
+
+    def _compact(self, kept_rows: np.ndarray) -> None:
+        """Réécrit la collection avec ses seules lignes kept_rows (remplacement atomique des fichiers)."""
+        codes = np.asarray(self._matrix)[kept_rows]
+        scales = np.asarray(self._scales)[kept_rows] if self._scales is not None else None
+        self._ids = [self._ids[row] for row in kept_rows]
+        self._documents = [self._documents[row] for row in kept_rows]
+        self._metadatas = [self._metadatas[row] for row in kept_rows]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+
+        self._matrix = None
+        self._scales = None
+        self._save_array(self._embeddings_path, codes)
+        if scales is not None:
+            self._save_array(self._scales_path, scales)
+        self._reload_matrix()
+        self._write_chunks()
+        if self._centroids is not None:
+            self._assignments = self._assignments[kept_rows]
+            self._save_ivf()
+
+        self.config['count'] = len(self._ids)
+        self._save_config()
+        self._clear_caches()
+
+    def _clear_caches(self) -> None:
+        self._lists = None
+        self._dead = None
+        self._filter_masks.clear()
+        self._value_rows.clear()
+
+    def optimize(self) -> None:
+        """
+        Construit l'index IVF si la collection dépasse ivf_min_vectors vecteurs
+        (et le supprime sinon), après avoir retiré des fichiers les versions
+        remplacées des chunks.
+        """
+        with self._lock:
+            self._repair()
+            if len(self._rows) < len(self._ids):
+                self._compact(self._current_rows())
+            n = len(self._ids)
+            if n < self.ivf_min_vectors:
+                self._centroids = None
+                self._assignments = None
+            else:
+                self._centroids = self._train_centroids(int(np.sqrt(n)))
+                self._assignments = np.concatenate([
+                    self._assign(self._block(start, min(start + SEARCH_BLOCK_SIZE, n)))
+                    for start in range(0, n, SEARCH_BLOCK_SIZE)
+                ])
+            self._lists = None
+            self._save_ivf()
+
+    def _train_centroids(self, n_lists: int, iterations: int = 10) -> np.ndarray:
+        """K-means sphérique sur un échantillon de la collection."""
+        rng = np.random.default_rng(0)
+        n = len(self._ids)
+        sample_rows = np.sort(rng.choice(n, size=min(n, n_lists * 64), replace=False))
+        sample = self._gather(sample_rows)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            # Partition vide : réinitialisée sur un point au hasard
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = _normalize_rows(sums)
+        return centroids.astype(np.float32)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def _dead_rows(self) -> Optional[np.ndarray]:
+        """Masque des lignes remplacées par une version plus récente de leur chunk (None s'il n'y en a pas)."""
+        if len(self._rows) == len(self._ids):
+            return None
+        if self._dead is None:
+            self._dead = np.ones(len(self._ids), dtype=bool)
+            self._dead[list(self._rows.values())] = False
+        return self._dead
+
+    def _current_rows(self) -> np.ndarray:
+        """Lignes des versions courantes des chunks, dans l'ordre des fichiers."""
+        dead = self._dead_rows()
+        return np.arange(len(self._ids)) if dead is None else np.flatnonzero(~dead)
+
+    def _block(self, start: int, stop: int) -> np.ndarray:
+        """Lignes start:stop de la matrice, en float32."""
+        scales = self._scales[start:stop] if self._scales is not None else None
+        return dequantize(self._matrix[start:stop], scales)
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        """Lignes choisies de la matrice, en float32."""
+        scales = self._scales[rows] if self._scales is not None else None
+        return dequantize(self._matrix[rows], scales)
+
+    def _filter_rows(self, where: Dict) -> np.ndarray:
+        """Lignes dont les métadonnées satisfont le filtre (mises en cache par filtre)."""
+        key = json.dumps(where, sort_keys=True)
+        rows = self._filter_masks.get(key)
+        if rows is None:
+            rows = self._indexed_rows(where)
+        if rows is None:
+            rows = np.array(
+                [row for row in self._current_rows().tolist() if matches_filter(self._metadatas[row], where)],
+                dtype=np.int64
+            )
+            if len(self._filter_masks) >= 64:
+                self._filter_masks.clear()
+            self._filter_masks[key] = rows
+        return rows
+
+    def _indexed_rows(self, where: Dict) -> Optional[np.ndarray]:
+        """
+        Lignes d'un filtre d'égalité ou $in sur un seul champ, lues dans un
+        index valeur -> lignes construit à la première utilisation du champ
+        (ex: {'source_id': {'$in': [...]}}), éventuellement combiné par $and
+        à d'autres conditions. None pour les autres filtres.
+        """
+        if len(where) != 1:
+            return None
+        field, condition = next(iter(where.items()))
+        if field == '$and':
+            for i, part in enumerate(condition):
+                rows = self._indexed_rows(part)
+                if rows is not None:
+                    rest = {'$and': condition[:i] + condition[i + 1:]}
+                    return np.array(
+                        [row for row in rows if matches_filter(self._metadatas[row], rest)],
+                        dtype=np.int64
+                    )
+            return None
+        if field.startswith('$'):
+            return None
+        if not isinstance(condition, dict):
+            values = [condition]
+        elif list(condition) == ['$eq']:
+            values = [condition['$eq']]
+        elif list(condition) == ['$in']:
+            values = condition['$in']
+        else:
+            return None
+        if not all(isinstance(value, (str, int, float, bool)) for value in values):
+            return None
+
+        index = self._value_rows.get(field)
+        if index is None:
+            index = {}
+            for row in self._current_rows().tolist():
+                value = self._metadatas[row].get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    index.setdefault(value, []).append(row)
+            self._value_rows[field] = index
+
+        found = [index.get(value, []) for value in set(values)]
+        return np.sort(np.array([row for rows in found for row in rows], dtype=np.int64))
+
+    def _ivf_lists(self):
+        """Lignes de chaque partition IVF (ordre, début de chaque partition)."""
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind='stable')
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(self._assignments, minlength=len(self._centroids)))])
+            self._lists = (order, offsets)
+        return self._lists
+
+    def _ivf_candidates(self, query: np.ndarray) -> np.ndarray:
+        order, offsets = self._ivf_lists()
+        probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        return np.sort(np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes]))
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Similarités (m, len(rows)) entre les requêtes et des lignes de la collection."""
+        if rows is None:
+            n = len(self._ids)
+            return np.concatenate([
+                queries @ self._block(start, min(start + SEARCH_BLOCK_SIZE, n)).T
+                for start in range(0, n, SEARCH_BLOCK_SIZE)
+            ], axis=1)
+        return queries @ self._gather(rows).T
+
+    @staticmethod
+    def _top(scores: np.ndarray, n_results: int) -> np.ndarray:
+        if n_results < len(scores):
+            top = np.argpartition(-scores, n_results - 1)[:n_results]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind='stable')]
+
+    def query(self, query_embeddings, n_results=10, where=None) -> Dict:
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if not self._rows:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+        queries = self._prepare(query_embeddings)
+        n_results = min(n_results, len(self._rows))
+
+        # Les versions remplacées des chunks sont exclues des filtres, et
+        # écartées par un score -inf sans filtre
+        dead = self._dead_rows()
+        filtered = self._filter_rows(where) if where else None
+        use_ivf = self._centroids is not None and (filtered is None or len(filtered) > self.ivf_min_vectors)
+
+        if use_ivf:
+            per_query = []
+            for query in queries:
+                rows = self._ivf_candidates(query)
+                if filtered is not None:
+                    rows = np.intersect1d(rows, filtered, assume_unique=True)
+                elif dead is not None:
+                    rows = rows[~dead[rows]]
+                if len(rows) < n_results:
+                    # Trop peu de candidats dans les partitions explorées
+                    rows = filtered
+                scores = self._scores(query[None, :], rows)[0]
+                if rows is None and dead is not None:
+                    scores[dead] = -np.inf
+                per_query.append((rows, scores))
+        else:
+            all_scores = self._scores(queries, filtered)
+            if filtered is None and dead is not None:
+                all_scores[:, dead] = -np.inf
+            per_query = [(filtered, scores) for scores in all_scores]
+
+        for rows, scores in per_query:
+            top = self._top(scores, n_results)
+            top_rows = rows[top] if rows is not None else top
+            results['ids'].append([self._ids[row] for row in top_rows])
+            results['documents'].append([self._documents[row] for row in top_rows])
+            results['metadatas'].append([self._metadatas[row] for row in top_rows])
+            results['distances'].append([float(1 - scores[i]) for i in top])
+        return results
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> Dict:
+        include = include if include is not None else ['documents', 'metadatas']
+        if ids is not None:
+            rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+        else:
+            rows = self._current_rows().tolist()
+        if where:
+            rows = [row for row in rows if matches_filter(self._metadatas[row], where)]
+
+        rows = list(rows)[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+        return {
+            'ids': [self._ids[row] for row in rows],
+            'documents': [self._documents[row] for row in rows] if 'documents' in include else None,
+            'metadatas': [self._metadatas[row] for row in rows] if 'metadatas' in include else None
+        }
+
+    def modification_stamp(self) -> str:
+        mtimes = [path.stat().st_mtime_ns for path in (self._config_path, self._chunks_path) if path.exists()]
+        return f"{len(self._rows)}:{max(mtimes, default=0)}"
+
+    def get_stats(self) -> Dict:
+        """
+        Statistiques du stockage.
+
+        Returns:
+            count, dim (embeddings du modèle), stored_dim, dtype, projection,
+            octets par vecteur, taille sur disque et paramètres IVF
+        """
+        stored_dim = self._matrix.shape[1] if self._matrix is not None else self.config.get('dims')
+        bytes_per_vector = None
+        if stored_dim:
+            bytes_per_vector = stored_dim * np.dtype(self.config['dtype']).itemsize
+            bytes_per_vector += 4 if self.config['dtype'] == 'int8' else 0
+        return {
+            'count': len(self._rows),
+            'dim': self.config['dim'],
+            'stored_dim': stored_dim,
+            'dtype': self.config['dtype'],
+            'projection': self.config.get('projection'),
+            'bytes_per_vector': bytes_per_vector,
+            'embeddings_bytes': sum(
+                path.stat().st_size for path in (self._embeddings_path, self._scales_path) if path.exists()
+            ),
+            'ivf_lists': len(self._centroids) if self._centroids is not None else 0,
+            'nprobe': self.nprobe
+        }
+
+    def replace(self, collection_name: str) -> None:
+        target = numpy_store_path(self.path.parent, collection_name)
+        with self._lock:
+            # Les processus qui ont ouvert l'ancienne collection gardent leurs
+            # fichiers mappés : seul le nom du répertoire change
+            old = target.with_name(target.name + '.old')
+            if old.exists():
+                shutil.rmtree(old)
+            if target.exists():
+                os.replace(target, old)
+            os.replace(self.path, target)
+            shutil.rmtree(old, ignore_errors=True)
+            self.name = collection_name
+            self.path = target
+            self._set_paths()
+
+    def close(self) -> None:
+        self._matrix = None
+        self._scales = None
@@ -0,0 +1,26 @@
+"""
+Tests unitaires pour le module evaluate_rag.
+"""
+
+from unittest.mock import MagicMock
+
+from dyag.commands.evaluate_rag import evaluate_rag
+
+
+def test_batch_search_failure_reported_per_question():
+    """Test qu'un échec de la recherche en lot n'interrompt pas l'évaluation."""
+    rag = MagicMock()
+    rag.ask_many.side_effect = RuntimeError("collection.query en échec")
+
+    def ask(question, n_chunks=5):
+        if question == "Q1 ?":
+            raise RuntimeError("filtre invalide")
+        return {'answer': f"réponse {question}", 'sources': ['c1'], 'tokens_used': 3}
+
+    rag.ask.side_effect = ask
+    questions = [{'question': q, 'expected_answer': "x"} for q in ("Q0 ?", "Q1 ?", "Q2 ?")]
+
+    stats = evaluate_rag(rag, questions, concurrency=4)
+
+    assert (stats['successful'], stats['failed']) == (2, 1)
+    assert [r['error'] for r in stats['results']] == [None, "filtre invalide", None]
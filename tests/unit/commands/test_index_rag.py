@@ -0,0 +1,491 @@
+"""
+Tests unitaires pour le module index_rag (lecture des chunks, indexation incrémentale).
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from dyag.commands import index_rag
+from dyag.commands.index_rag import (
+    ChunkIndexer, IndexManifest, batched, checkpoint_path, chunk_file_format, iter_chunks,
+    length_batches, manifest_path, source_fingerprint
+)
+from dyag.app_index import summary_vector
+from dyag.app_router import AppNameRouter, app_names_path
+from dyag.embedding_pool import EmbeddingPool
+from dyag.vector_store import NumpyVectorStore
+
+
+class FakeEncoder:
+    """Embeddings déterministes : histogramme des lettres du texte."""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 26
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), 26), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                if 'a' <= char <= 'z':
+                    vectors[row, ord(char) - ord('a')] += 1
+        return vectors + 0.01
+
+
+@pytest.fixture
+def make_indexer(temp_dir):
+    def factory(**kwargs):
+        with patch('dyag.commands.index_rag.SentenceTransformer', FakeEncoder):
+            return ChunkIndexer(chroma_path=str(temp_dir), store='numpy', **kwargs)
+    return factory
+
+
+def chunk(chunk_id, content, **metadata):
+    return {'id': chunk_id, 'content': content, 'metadata': dict(metadata)}
+
+
+class TestChunkFiles:
+    """Tests de la lecture des fichiers de chunks."""
+
+    def test_chunk_file_format(self):
+        """Test de la détection du format, compression comprise."""
+        assert chunk_file_format("chunks.jsonl") == 'jsonl'
+        assert chunk_file_format("chunks.jsonl.gz") == 'jsonl'
+        assert chunk_file_format("export.v2.json.zst") == 'json'
+        assert chunk_file_format("chunks.csv") is None
+
+    def test_iter_chunks_gzip(self, temp_dir):
+        """Test de la lecture d'un JSONL compressé, lignes invalides ignorées."""
+        path = temp_dir / "chunks.jsonl.gz"
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(chunk('a', "gidaf")) + "\n\n{invalide\n" + json.dumps(chunk('b', "mygusi")) + "\n")
+
+        assert [c['id'] for c in iter_chunks(path)] == ['a', 'b']
+
+    def test_batched(self):
+        """Test du découpage en lots."""
+        assert list(batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def record(chunk_id, tokens):
+    return (chunk_id, "x" * (tokens * 4), {})
+
+
+class TestLengthBatches:
+    """Tests du découpage en lots par longueur."""
+
+    def test_sorted_within_window(self):
+        """Test que les chunks sont triés par longueur dans chaque fenêtre."""
+        records = [record('a', 250), record('b', 10), record('c', 240), record('d', 12), record('e', 5)]
+        batches = list(length_batches(iter(records), batch_size=2, sort_window=4))
+        assert [[r[0] for r in batch] for batch in batches] == [['b', 'd'], ['c', 'a'], ['e']]
+
+    def test_max_batch_tokens(self):
+        """Test des lots limités en tokens, remplissage compris."""
+        records = [record(str(i), tokens) for i, tokens in enumerate([10, 10, 10, 50, 60, 200])]
+        batches = list(length_batches(iter(records), batch_size=100, max_batch_tokens=120))
+        assert [len(batch) for batch in batches] == [3, 2, 1]
+
+    def test_token_limit_caps_long_documents(self):
+        """Test que la longueur est plafonnée à la troncature du modèle."""
+        records = [record('a', 1000), record('b', 1000)]
+        batches = list(length_batches(iter(records), 1, max_batch_tokens=512, token_limit=256))
+        assert len(batches) == 1
+
+    def test_duplicate_id_last_version_wins(self, make_indexer):
+        """Test qu'un ID répété dans la fenêtre garde sa dernière version après tri."""
+        indexer = make_indexer()
+        indexer.index_chunks([chunk('a', "version longue " * 10), chunk('b', "gidaf"), chunk('a', "courte")],
+                             batch_size=1, sort_window=10, show_progress=False)
+        assert indexer.collection.get(ids=['a'])['documents'] == ["courte"]
+
+
+class TestStreamingIndexing:
+    """Tests de l'indexation d'un itérateur de chunks."""
+
+    def test_generator_is_consumed_in_batches(self, make_indexer):
+        """Test que les chunks sont lus au fur et à mesure des lots."""
+        consumed = []
+
+        def source():
+            for i in range(5):
+                consumed.append(i)
+                yield chunk(f"c{i}", f"contenu {i}")
+
+        indexer = make_indexer()
+        encode = indexer.embedding_model.encode
+
+        def checked_encode(texts, **kwargs):
+            # Au moment d'encoder un lot, seul ce lot (et le début du suivant) a été lu
+            assert len(consumed) <= len(indexer.embedding_model.calls) * 2 + 3
+            return encode(texts, **kwargs)
+
+        indexer.embedding_model.encode = checked_encode
+        stats = indexer.index_chunks(source(), batch_size=2, show_progress=False)
+
+        assert stats['indexed'] == 5 and stats['total'] == 5
+        assert [len(batch) for batch in indexer.embedding_model.calls] == [2, 2, 1]
+
+    def test_duplicate_ids_in_batch(self, make_indexer):
+        """Test qu'un ID répété dans un lot garde sa dernière version."""
+        indexer = make_indexer()
+        indexer.index_chunks([chunk('a', "ancien"), chunk('a', "nouveau")], show_progress=False)
+        assert indexer.collection.get()['documents'] == ["nouveau"]
+
+
+class TestPipelinedIndexing:
+    """Tests du recouvrement entre calcul des embeddings et écriture."""
+
+    def test_next_batch_embedded_during_write(self, make_indexer):
+        """Test que le lot suivant est encodé pendant l'écriture du lot courant."""
+        indexer = make_indexer()
+        second_batch_encoded = threading.Event()
+        overlapped = []
+        encode, add = indexer.embedding_model.encode, indexer.collection.add
+
+        def tracking_encode(texts, **kwargs):
+            if len(indexer.embedding_model.calls) == 1:
+                second_batch_encoded.set()
+            return encode(texts, **kwargs)
+
+        def slow_add(ids, **kwargs):
+            if ids == ['c0', 'c1']:
+                overlapped.append(second_batch_encoded.wait(timeout=5))
+            return add(ids=ids, **kwargs)
+
+        indexer.embedding_model.encode = tracking_encode
+        indexer.collection.add = slow_add
+        stats = indexer.index_chunks([chunk(f"c{i}", f"contenu {i}") for i in range(4)],
+                                     batch_size=2, show_progress=False)
+
+        assert overlapped == [True]
+        assert stats['indexed'] == 4
+
+    @pytest.mark.parametrize("pipeline_depth", [0, 2])
+    def test_write_errors_counted_per_batch(self, make_indexer, pipeline_depth):
+        """Test qu'un lot en échec est compté sans interrompre les autres."""
+        indexer = make_indexer()
+        add = indexer.collection.add
+
+        def failing_add(ids, **kwargs):
+            if 'c2' in ids:
+                raise RuntimeError("disque plein")
+            return add(ids=ids, **kwargs)
+
+        indexer.collection.add = failing_add
+        stats = indexer.index_chunks([chunk(f"c{i}", f"contenu {i}") for i in range(5)],
+                                     batch_size=2, show_progress=False, pipeline_depth=pipeline_depth)
+
+        assert (stats['indexed'], stats['errors'], stats['total']) == (3, 2, 5)
+        assert sorted(indexer.manifest.entries) == ['c0', 'c1', 'c4']
+
+
+    def test_writer_failure_stops_indexing(self, make_indexer, monkeypatch):
+        """Test qu'une exception du thread d'écriture interrompt l'indexation au lieu de la bloquer."""
+        monkeypatch.setattr(index_rag, 'CHECKPOINT_INTERVAL', 0)
+        indexer = make_indexer(checkpoint_source="source-v1")
+
+        def full_disk(*args):
+            raise OSError("disque plein")
+
+        indexer.checkpoint.save = full_disk
+        outcome = []
+
+        def run():
+            try:
+                indexer.index_chunks([chunk(f"c{i}", f"contenu {i}") for i in range(20)],
+                                     batch_size=1, show_progress=False, pipeline_depth=1)
+            except OSError as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        assert [str(e) for e in outcome] == ["disque plein"]
+        assert len(indexer.embedding_model.calls) < 20
+
+class SlowEncoder(FakeEncoder):
+    """Les premiers lots sont les plus lents : ils finissent après les suivants."""
+
+    def encode(self, texts, **kwargs):
+        if any("boom" in text for text in texts):
+            raise RuntimeError("processus interrompu")
+        time.sleep(0.05 if texts[0].endswith(('0', '1')) else 0)
+        return super().encode(texts, **kwargs)
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """EmbeddingPool dont les processus sont remplacés par des threads."""
+    monkeypatch.setattr('dyag.embedding_pool._worker_model', SlowEncoder())
+    pool = EmbeddingPool.__new__(EmbeddingPool)
+    pool.model_name, pool.workers, pool.threads_per_worker = "fake", 3, 1
+    pool._executor = ThreadPoolExecutor(max_workers=3)
+    yield pool
+    pool.close()
+
+
+class TestEmbeddingPool:
+    """Tests du calcul des embeddings par un pool de processus (--workers)."""
+
+    def test_imap_keeps_batch_order(self, thread_pool):
+        """Test que les embeddings reviennent dans l'ordre des lots."""
+        batches = [(i, [f"lot {i}"]) for i in range(6)]
+        results = list(thread_pool.imap(iter(batches), prefetch=4))
+        assert [key for key, _ in results] == list(range(6))
+        assert np.allclose(results[0][1], SlowEncoder().encode(["lot 0"]))
+
+    def test_indexer_with_pool(self, make_indexer, thread_pool):
+        """Test qu'un lot en échec dans le pool est compté sans bloquer les autres."""
+        indexer = make_indexer()
+        indexer.embedding_model = thread_pool
+        chunks = [chunk(f"c{i}", f"contenu {i}") for i in range(5)] + [chunk('c5', "boom")]
+        stats = indexer.index_chunks(chunks, batch_size=1, show_progress=False)
+
+        assert (stats['indexed'], stats['errors']) == (5, 1)
+        assert indexer.collection.get()['ids'] == [f"c{i}" for i in range(5)]
+
+
+class TestEmbeddingCache:
+    """Tests du cache d'embeddings consulté par ChunkIndexer."""
+
+    def test_recreated_collection_embeds_nothing(self, make_indexer, temp_dir):
+        """Test qu'une collection recréée avec --reset réutilise les embeddings en cache."""
+        cache_dir = str(temp_dir / "embeddings")
+        chunks = [chunk(f"c{i}", name) for i, name in enumerate(["gidaf", "mygusi", "sitadel", "bdrep"])]
+        first = make_indexer(embedding_cache_path=cache_dir)
+        first.index_chunks([dict(c) for c in chunks], batch_size=3, show_progress=False)
+        first.close()
+
+        indexer = make_indexer(embedding_cache_path=cache_dir, reset_collection=True)
+        stats = indexer.index_chunks([dict(c) for c in chunks], batch_size=3, show_progress=False)
+
+        assert indexer.embedding_model.calls == []
+        assert stats['embeddings_cached'] == 4 and stats['indexed'] == 4
+        assert indexer.collection.query(query_embeddings=FakeEncoder().encode(["sitadel"]).tolist(),
+                                        n_results=1)['ids'] == [['c2']]
+
+
+class TestResumableIndexing:
+    """Tests des points de reprise et de la reconstruction avec --reset."""
+
+    def test_resume_skips_written_batches(self, make_indexer, temp_dir, monkeypatch):
+        """Test que --resume repart du premier lot non écrit."""
+        monkeypatch.setattr(index_rag, 'CHECKPOINT_INTERVAL', 0)
+        chunks = [chunk(f"c{i}", name) for i, name in enumerate(["gidaf", "mygusi", "sitadel", "bdrep", "ades", "icpe"])]
+
+        def crashing_source():
+            yield from chunks[:4]
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            make_indexer(checkpoint_source="source-v1").index_chunks(
+                crashing_source(), batch_size=2, show_progress=False
+            )
+        assert checkpoint_path(temp_dir, "applications").exists()
+
+        # Autre source : le point de reprise est ignoré
+        assert make_indexer(checkpoint_source="source-v2", resume=True).resume_offset == 0
+
+        indexer = make_indexer(checkpoint_source="source-v1", resume=True)
+        stats = indexer.index_chunks([dict(c) for c in chunks], batch_size=2, show_progress=False)
+
+        assert stats['resumed'] == 2 and stats['indexed'] == 4 and stats['total'] == 6
+        assert indexer.embedding_model.calls == [["sitadel", "bdrep"], ["ades", "icpe"]]
+        assert indexer.collection.count() == 6
+        assert not checkpoint_path(temp_dir, "applications").exists()
+
+    def test_unchanged_batches_advance_checkpoint(self, make_indexer, temp_dir, monkeypatch):
+        """Test que les lots inchangés d'une réindexation incrémentale font avancer le point de reprise."""
+        monkeypatch.setattr(index_rag, 'CHECKPOINT_INTERVAL', 0)
+        chunks = [chunk(f"c{i}", name) for i, name in enumerate(["gidaf", "mygusi", "sitadel", "bdrep", "ades", "icpe"])]
+        make_indexer().index_chunks([dict(c) for c in chunks], batch_size=2, show_progress=False)
+
+        def crashing_source():
+            yield from (dict(c) for c in chunks[:4])
+            yield chunk("c4", "ades modifié")
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            make_indexer(checkpoint_source="source-v2").index_chunks(
+                crashing_source(), batch_size=2, show_progress=False, incremental=True
+            )
+
+        assert make_indexer(checkpoint_source="source-v2", resume=True).resume_offset == 4
+
+    def test_source_fingerprint(self, temp_dir, monkeypatch):
+        """Test que l'empreinte change avec le contenu, la taille ou les paramètres, sans lire tout le fichier."""
+        monkeypatch.setattr(index_rag, 'FINGERPRINT_BLOCK_SIZE', 4)
+        path = temp_dir / "chunks.jsonl"
+        path.write_bytes(b"debut-milieu-fin")
+        stat = path.stat()
+        fingerprint = source_fingerprint(path)
+
+        assert source_fingerprint(path) == fingerprint
+        assert source_fingerprint(path, 'section') != fingerprint
+        path.write_bytes(b"debut-MILIEU-fin")
+        # Même taille et même date : seul le milieu, non lu, a changé
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert source_fingerprint(path) == fingerprint
+        path.write_bytes(b"debut-milieu-FIN")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert source_fingerprint(path) != fingerprint
+
+    def test_reset_swaps_complete_collection(self, make_indexer, temp_dir):
+        """Test que la collection reste interrogeable pendant sa reconstruction."""
+        make_indexer().index_chunks([chunk('old', "ancien contenu")], show_progress=False)
+
+        indexer = make_indexer(reset_collection=True)
+        live_counts = []
+        add = indexer.collection.add
+
+        def checking_add(**kwargs):
+            live = make_indexer().collection
+            live_counts.append(live.get()['ids'])
+            return add(**kwargs)
+
+        indexer.collection.add = checking_add
+        indexer.index_chunks([chunk('a', "gidaf"), chunk('b', "mygusi")], batch_size=1, show_progress=False)
+
+        assert live_counts == [['old'], ['old']]
+        assert make_indexer().collection.get()['ids'] == ['a', 'b']
+        assert sorted(IndexManifest(manifest_path(temp_dir, "applications")).entries) == ['a', 'b']
+        assert indexer.bm25_index.search("gidaf", 5)[0][0] == 'a'
+        assert not list(temp_dir.glob("applications_build*"))
+
+
+class TestIndexManifest:
+    """Tests pour la classe IndexManifest."""
+
+    def test_status_and_persistence(self, temp_dir):
+        """Test de la détection des chunks modifiés et de la sauvegarde."""
+        manifest = IndexManifest(temp_dir / "m.json")
+        manifest.update(['a'], ["contenu"], [{'nom': 'GIDAF'}])
+        manifest.save()
+
+        reloaded = IndexManifest(temp_dir / "m.json")
+        assert reloaded.status('a', "contenu", {'nom': 'GIDAF'}) == 'unchanged'
+        assert reloaded.status('a', "contenu", {'nom': 'MYGUSI'}) == 'updated'
+        assert reloaded.status('a', "autre", {'nom': 'GIDAF'}) == 'updated'
+        assert reloaded.status('b', "contenu", {}) == 'added'
+
+
+class TestIncrementalIndexing:
+    """Tests de ChunkIndexer.index_chunks(incremental=True)."""
+
+    def test_only_changes_are_embedded(self, make_indexer, temp_dir):
+        """Test que seuls les chunks nouveaux ou modifiés sont recalculés."""
+        indexer = make_indexer()
+        indexer.index_chunks([
+            chunk('a', "gidaf est hébergé"), chunk('b', "mygusi gère les usines"), chunk('c', "supprimé")
+        ], show_progress=False)
+        assert manifest_path(temp_dir, "applications").exists()
+
+        indexer = make_indexer()
+        stats = indexer.index_chunks([
+            chunk('a', "gidaf est hébergé"),
+            chunk('b', "mygusi gère les usines", nom='MYGUSI'),
+            chunk('d', "nouveau chunk")
+        ], show_progress=False, incremental=True)
+
+        assert (stats['added'], stats['updated'], stats['unchanged'], stats['deleted']) == (1, 1, 1, 1)
+        assert indexer.embedding_model.calls == [["mygusi gère les usines", "nouveau chunk"]]
+        assert sorted(indexer.collection.get()['ids']) == ['a', 'b', 'd']
+        assert indexer.collection.get(ids=['b'])['metadatas'][0]['nom'] == 'MYGUSI'
+        assert indexer.bm25_index.search("supprimé", 5) == []
+
+    def test_unchanged_source_embeds_nothing(self, make_indexer):
+        """Test qu'une source inchangée ne déclenche aucun calcul d'embedding."""
+        chunks = [chunk('a', "gidaf"), chunk('b', "mygusi")]
+        make_indexer().index_chunks([dict(c) for c in chunks], show_progress=False)
+
+        indexer = make_indexer()
+        stats = indexer.index_chunks([dict(c) for c in chunks], show_progress=False, incremental=True)
+        assert stats['unchanged'] == 2 and stats['indexed'] == 0
+        assert indexer.embedding_model.calls == []
+
+    def test_manifest_seeded_from_collection(self, make_indexer, temp_dir):
+        """Test qu'une collection indexée sans manifeste n'est pas recalculée."""
+        make_indexer().index_chunks([chunk('a', "gidaf")], show_progress=False)
+        manifest_path(temp_dir, "applications").unlink()
+
+        stats = make_indexer().index_chunks([chunk('a', "gidaf")], show_progress=False, incremental=True)
+        assert stats['unchanged'] == 1
+
+    def test_reset_clears_manifest(self, make_indexer):
+        """Test que --reset repart d'un manifeste vide."""
+        make_indexer().index_chunks([chunk('a', "gidaf")], show_progress=False)
+        indexer = make_indexer(reset_collection=True)
+        assert indexer.manifest.entries == {}
+
+
+def app_chunk(chunk_id, source_id, content):
+    return {'id': chunk_id, 'source_id': source_id, 'content': content, 'title': chunk_id}
+
+
+class TestAppIndex:
+    """Tests de l'index des applications (un vecteur par source_id)."""
+
+    def test_one_summary_vector_per_application(self, make_indexer, temp_dir):
+        """Test du vecteur résumé (moyenne des chunks) de chaque application."""
+        indexer = make_indexer(app_index=True)
+        stats = indexer.index_chunks([
+            app_chunk('g1', 383, "gidaf gidaf"), app_chunk('g2', 383, "gidaf hebergement"),
+            app_chunk('m1', 12, "mygusi")
+        ], batch_size=2, show_progress=False)
+
+        assert stats['applications_updated'] == 2
+        assert indexer.collection.get(where={'source_id': '383'})['ids'] == ['g1', 'g2']
+        apps = NumpyVectorStore(str(temp_dir), "applications_apps")
+        expected = summary_vector(FakeEncoder().encode(["gidaf gidaf", "gidaf hebergement"]).sum(axis=0), 2)
+        found = apps.query(query_embeddings=[expected.tolist()], n_results=1)
+        assert found['ids'] == [['383']]
+        assert found['distances'][0][0] == pytest.approx(0, abs=1e-5)
+
+    def test_incremental_update(self, make_indexer, temp_dir):
+        """Test que seules les applications modifiées sont recalculées."""
+        make_indexer(app_index=True).index_chunks([
+            app_chunk('g1', 383, "gidaf"), app_chunk('g2', 383, "gidaf hebergement"),
+            app_chunk('m1', 12, "mygusi"), app_chunk('s1', 7, "sitadel")
+        ], show_progress=False, incremental=True)
+
+        stats = make_indexer(app_index=True).index_chunks([
+            app_chunk('g1', 383, "gidaf paris"), app_chunk('g2', 383, "gidaf hebergement"),
+            app_chunk('s1', 7, "sitadel")
+        ], show_progress=False, incremental=True)
+
+        assert stats['applications_updated'] == 2
+        apps = NumpyVectorStore(str(temp_dir), "applications_apps")
+        assert sorted(apps.get()['ids']) == ['383', '7']
+        expected = summary_vector(FakeEncoder().encode(["gidaf paris", "gidaf hebergement"]).sum(axis=0), 2)
+        found = apps.query(query_embeddings=[expected.tolist()], n_results=1)
+        assert found['distances'][0][0] == pytest.approx(0, abs=1e-5)
+
+
+class TestAppRouter:
+    """Tests de la table des noms d'applications tenue par l'indexeur."""
+
+    def test_names_recorded_and_pruned(self, make_indexer, temp_dir):
+        """Test de l'enregistrement des noms et du retrait des applications supprimées."""
+        chunks = [
+            dict(app_chunk('g1', 383, "gidaf"), metadata={'nom': 'GIDAF', 'id': '383'}),
+            dict(app_chunk('m1', 12, "mygusi"), metadata={'nom': 'MYGUSI', 'id': '12'})
+        ]
+        make_indexer().index_chunks(chunks, show_progress=False, incremental=True)
+        router = AppNameRouter(app_names_path(str(temp_dir), "applications"))
+        assert router.match("GIDAF ou MYGUSI ?") == ['383', '12']
+
+        make_indexer().index_chunks(chunks[:1], show_progress=False, incremental=True)
+        router = AppNameRouter(app_names_path(str(temp_dir), "applications"))
+        assert router.match("GIDAF ou MYGUSI ?") == ['383']
@@ -0,0 +1,58 @@
+"""
+Tests unitaires pour le module app_router.
+"""
+
+from dyag.app_router import AppNameRouter
+
+
+def app(source_id, nom, nom_long=None):
+    metadata = {'source_id': source_id, 'nom': nom, 'id': source_id}
+    if nom_long:
+        metadata['nom long'] = nom_long
+    return metadata
+
+
+class TestAppNameRouter:
+    """Tests pour la classe AppNameRouter."""
+
+    def test_match_names_and_ids(self):
+        """Test de la détection par nom, nom long et identifiant."""
+        router = AppNameRouter()
+        router.add([
+            app('1238', '6Tzen', 'Outil national de dématérialisation des démarches des transports routiers'),
+            app('383', 'GIDAF'), app('384', 'GIDAF Paris'), app('12', 'MYGUSI')
+        ])
+
+        assert router.match("Quel est le statut de 6TZEN ?") == ['1238']
+        assert router.match("Outil national de dematerialisation des demarches des transports routiers") == ['1238']
+        # Le nom le plus long l'emporte
+        assert router.match("Qui héberge GIDAF Paris ?") == ['384']
+        assert router.match("Compare GIDAF et mygusi") == ['383', '12']
+        assert router.match("Quelle application a l'identifiant 1238 ?") == ['1238']
+        assert router.match("Statut de l'application n° 1238") == ['1238']
+        # Identifiant trop court pour être cherché
+        assert router.match("Les 12 applications") == []
+
+    def test_ignores_bare_ids_and_common_words(self):
+        """Test que les années et les mots courants ne routent pas la question."""
+        router = AppNameRouter()
+        router.add([app('2019', 'SIRENA'), app('41', 'Portail'), app('42', 'Mail'), app('43', 'Portail Web')])
+
+        assert router.match("Quelles applications ont été créées en 2019 ?") == []
+        assert router.match("Quelles applications proposent un portail web ?") == []
+        assert router.match("Quelles applications envoient un mail ?") == []
+        assert router.match("Qui héberge SIRENA ?") == ['2019']
+        assert router.match("Quelle application a l'id 2019 ?") == ['2019']
+
+    def test_persistence_and_rename(self, temp_dir):
+        """Test de la sauvegarde et du remplacement des noms d'une application."""
+        router = AppNameRouter(temp_dir / "applications.names.json")
+        router.add([app('383', 'GIDAF')])
+        router.save()
+
+        reopened = AppNameRouter(temp_dir / "applications.names.json")
+        assert reopened.match("statut de GIDAF") == ['383']
+        reopened.add([app('383', 'GIDAF2')])
+        assert reopened.match("statut de GIDAF") == []
+        reopened.remove(['383'])
+        assert reopened.get_stats() == {'applications': 0, 'names': 0}
@@ -0,0 +1,54 @@
+"""
+Tests unitaires pour le module collection_stats.
+"""
+
+from dyag.collection_stats import collection_stats, stats_cache_path, with_content_fields
+from dyag.vector_store import NumpyVectorStore
+
+
+def make_collection(path, documents, with_fields=True):
+    store = NumpyVectorStore(str(path), "applications", create=True)
+    ids = [f"c{i}" for i in range(len(documents))]
+    metadatas = [{'chunk_type': 'sites' if len(doc) < 10 else 'description', 'source_id': str(i % 2)}
+                 for i, doc in enumerate(documents)]
+    if with_fields:
+        metadatas = [with_content_fields(doc, meta) for doc, meta in zip(documents, metadatas)]
+    store.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=[[1.0, i] for i in range(len(ids))])
+    return store
+
+
+class TestCollectionStats:
+    """Tests pour la fonction collection_stats."""
+
+    def test_full_scan(self, temp_dir):
+        """Test des distributions exactes sur toutes les pages."""
+        documents = ["site A", "site A", "description " * 30, "site B", "description " * 30]
+        store = make_collection(temp_dir, documents)
+        stats = collection_stats(store, page_size=2)
+
+        assert stats['total_chunks'] == 5
+        assert stats['chunk_types'] == {'sites': 3, 'description': 2}
+        assert stats['source_ids'] == {'0': 3, '1': 2}
+        assert stats['content_length']['max'] == 360
+        assert stats['content_length']['histogram']['0-100'] == 3
+        assert stats['content_length']['histogram']['250-500'] == 2
+        assert (stats['duplicates']['groups'], stats['duplicates']['chunks']) == (2, 4)
+        assert sorted(group['ids'] for group in stats['duplicates']['examples']) == [['c0', 'c1'], ['c2', 'c4']]
+
+    def test_documents_read_for_older_chunks(self, temp_dir):
+        """Test des chunks indexés sans longueur ni empreinte dans les métadonnées."""
+        stats = collection_stats(make_collection(temp_dir, ["abc", "abc", "abcdef"], with_fields=False))
+        assert stats['content_length']['max'] == 6
+        assert stats['duplicates']['groups'] == 1
+
+    def test_cached_until_collection_changes(self, temp_dir):
+        """Test du cache invalidé par une écriture dans la collection."""
+        store = make_collection(temp_dir, ["site A", "site B"])
+        cache_path = stats_cache_path(temp_dir, "applications")
+
+        assert collection_stats(store, cache_path)['cached'] is False
+        assert collection_stats(store, cache_path)['cached'] is True
+
+        store.add(ids=['new'], documents=["site C"], metadatas=[{}], embeddings=[[0.0, 1.0]])
+        stats = collection_stats(store, cache_path)
+        assert stats['cached'] is False and stats['total_chunks'] == 3
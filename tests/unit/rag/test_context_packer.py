@@ -0,0 +1,118 @@
+"""
+Tests unitaires pour le module context_packer.
+"""
+
+import numpy as np
+
+from dyag.context_packer import (
+    compress_context, estimate_tokens, format_context, pack_context, resolve_prompt_budget,
+    split_sentences, trim_to_sentences
+)
+
+
+def keyword_encode(texts):
+    """Encodage factice : un axe par mot-clé (hébergement, contact, url)."""
+    keywords = ('héberg', 'contact', 'http')
+    return np.array([[1.0 if k in t.lower() else 0.0 for k in keywords] + [0.1] for t in texts])
+
+
+class TestResolvePromptBudget:
+    """Tests pour la fonction resolve_prompt_budget."""
+
+    def test_unlimited_by_default(self, monkeypatch):
+        """Test que le contexte n'est pas réduit sans budget demandé."""
+        monkeypatch.delenv('RAG_PROMPT_TOKENS', raising=False)
+        assert resolve_prompt_budget() is None
+
+    def test_explicit_and_env(self, monkeypatch):
+        """Test de la priorité : explicite, puis environnement."""
+        monkeypatch.setenv('RAG_PROMPT_TOKENS', '500')
+        assert resolve_prompt_budget() == 500
+        assert resolve_prompt_budget(1000) == 1000
+        assert resolve_prompt_budget(0) is None
+
+
+class TestTrimToSentences:
+    """Tests pour la fonction trim_to_sentences."""
+
+    def test_cut_at_sentence_boundary(self):
+        """Test de la coupe à une fin de phrase."""
+        text = "GIDAF gère les déchets. Il est hébergé par le SNUM. Contact: x@y.fr"
+        assert trim_to_sentences(text, estimate_tokens("GIDAF gère les déchets. Il est")) == \
+            "GIDAF gère les déchets."
+
+    def test_first_sentence_too_long(self):
+        """Test d'un budget inférieur à la première phrase."""
+        assert trim_to_sentences("Une phrase assez longue.", 1) == ""
+
+
+class TestPackContext:
+    """Tests pour la fonction pack_context."""
+
+    def test_removes_overlapping_paragraphs(self):
+        """Test de la suppression du recouvrement entre chunks (chunk_by_size)."""
+        chunks = [
+            {'id': 'c1', 'content': "Paragraphe A.\n\nParagraphe B."},
+            {'id': 'c2', 'content': "Paragraphe B.\n\nParagraphe C."},
+            {'id': 'c3', 'content': "Paragraphe  a."},
+        ]
+        packed, report = pack_context(chunks)
+
+        assert [c['content'] for c in packed] == ["Paragraphe A.\n\nParagraphe B.", "Paragraphe C."]
+        assert report['duplicates_removed'] == 2
+        assert report['chunks_dropped'] == 1
+        assert report['tokens_saved'] > 0
+
+    def test_budget_drops_lowest_ranked(self):
+        """Test que les chunks les moins bien classés sont écartés ou coupés."""
+        chunks = [
+            {'id': f'c{i}', 'content': f"Phrase {i} numéro un. Phrase {i} numéro deux. " * 5}
+            for i in range(5)
+        ]
+        budget = estimate_tokens(format_context(chunks[:2])) + 30
+        packed, report = pack_context(chunks, budget)
+
+        assert [c['id'] for c in packed][:2] == ['c0', 'c1']
+        assert report['tokens_after'] <= budget
+        assert report['chunks_dropped'] + len(packed) == 5
+        assert report['tokens_saved'] == report['tokens_before'] - report['tokens_after']
+
+    def test_never_empty(self):
+        """Test que le meilleur chunk est conservé même avec un budget minuscule."""
+        packed, report = pack_context([{'id': 'c1', 'content': "x" * 400}], 20)
+        assert len(packed) == 1
+        assert report['chunks_trimmed'] == 1
+
+
+class TestCompressContext:
+    """Tests pour la compression extractive du contexte."""
+
+    chunks = [
+        {'id': 'c1', 'content': "# GIDAF\nL'application est hébergée au SIRCOM. "
+                                "Le contact est Jean Dupont.\nURL : http://gidaf.fr"},
+        {'id': 'c2', 'content': "Contact support : support@gidaf.fr.\nAutre contact : M. Martin."},
+    ]
+
+    def test_split_sentences(self):
+        """Test du découpage en lignes puis en phrases."""
+        assert split_sentences("Une. Deux !\n\nTrois") == [(0, "Une."), (0, "Deux !"), (2, "Trois")]
+
+    def test_keeps_relevant_sentences(self):
+        """Test que seules les phrases proches de la question sont gardées, avec leur chunk."""
+        query = keyword_encode(["hébergement"])[0]
+        compressed, report = compress_context(query, self.chunks, keyword_encode, 12)
+
+        assert [c['id'] for c in compressed] == ['c1']
+        assert compressed[0]['content'] == "# GIDAF\nL'application est hébergée au SIRCOM."
+        assert report['chunks_dropped'] == 1
+        assert report['sentences_kept'] < report['sentences_total']
+        assert report['ratio'] == report['tokens_after'] / report['tokens_before'] < 1
+
+    def test_within_budget_unchanged(self):
+        """Test qu'un contexte qui tient dans le budget n'est pas encodé."""
+        def fail(texts):
+            raise AssertionError("encodage inutile")
+
+        compressed, report = compress_context([1, 0, 0, 0], self.chunks, fail, 1000)
+        assert compressed == self.chunks
+        assert report['ratio'] == 1.0
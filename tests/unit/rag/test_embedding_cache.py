@@ -0,0 +1,119 @@
+"""
+Tests unitaires pour le module embedding_cache.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from dyag.embedding_cache import EmbeddingCache, cache_path_option, default_cache_dir, parse_size
+
+
+def fake_encode(texts):
+    return np.array([[len(text), text.count('a'), 1.0] for text in texts], dtype=np.float32)
+
+
+def store_from_process(path, worker, max_bytes=None):
+    """Écrit dans un cache partagé depuis un autre processus (ProcessPoolExecutor)."""
+    cache = EmbeddingCache(path, max_bytes=max_bytes) if max_bytes else EmbeddingCache(path)
+    for batch in range(20):
+        # Lots en partie communs aux processus, en partie propres à chacun
+        texts = [f"chunk {batch}-{i}" for i in range(10)] + [f"worker {worker}-{batch}-{i}" for i in range(10)]
+        embeddings = cache.encode("model", texts, fake_encode)
+        assert np.array_equal(embeddings, fake_encode(texts))
+    cache.close()
+
+
+class TestEmbeddingCache:
+    """Tests pour la classe EmbeddingCache."""
+
+    def test_only_missing_texts_are_encoded(self, temp_dir):
+        """Test que seuls les textes absents du cache sont encodés."""
+        cache = EmbeddingCache(str(temp_dir))
+        encoded = []
+
+        def encode(texts):
+            encoded.append(list(texts))
+            return fake_encode(texts)
+
+        first = cache.encode("model", ["gidaf", "mygusi"], encode)
+        second = cache.encode("model", ["mygusi", "gidaf", "sitadel"], encode)
+
+        assert encoded == [["gidaf", "mygusi"], ["sitadel"]]
+        assert np.array_equal(second[:2], first[::-1])
+        assert (cache.hits, cache.misses) == (2, 3)
+
+    def test_persistence_and_model_isolation(self, temp_dir):
+        """Test de la réouverture du cache et de la séparation par modèle."""
+        cache = EmbeddingCache(str(temp_dir))
+        cache.store(EmbeddingCache.model_key("model", "abc"), ["gidaf"], fake_encode(["gidaf"]))
+        cache.close()
+
+        reopened = EmbeddingCache(str(temp_dir))
+        embeddings, missing = reopened.lookup("model@abc", ["gidaf"])
+        assert missing == [] and np.array_equal(embeddings[0], fake_encode(["gidaf"])[0])
+        assert reopened.lookup("model@def", ["gidaf"])[1] == ["gidaf"]
+
+    def test_prune_evicts_least_recently_used(self, temp_dir):
+        """Test de l'éviction et du compactage du fichier de vecteurs."""
+        cache = EmbeddingCache(str(temp_dir))
+        texts = [f"chunk {i}" for i in range(10)]
+        cache.encode("model", texts, fake_encode)
+        cache.lookup("model", texts[:3])
+
+        assert cache.prune(max_bytes=3 * 3 * 4) == 7
+        assert cache.get_stats()['bytes'] == 36
+        embeddings, missing = cache.lookup("model", texts)
+        assert missing == texts[3:]
+        assert np.array_equal(np.vstack(embeddings[:3]), fake_encode(texts[:3]))
+
+    def test_size_limit_triggers_prune(self, temp_dir):
+        """Test que le dépassement de la taille maximale réduit le cache."""
+        cache = EmbeddingCache(str(temp_dir), max_bytes=10 * 3 * 4)
+        cache.encode("model", [f"chunk {i}" for i in range(12)], fake_encode)
+        assert cache.get_stats()['entries'] == 8
+
+    def test_concurrent_processes_share_cache(self, temp_dir):
+        """Test de l'écriture concurrente de plusieurs processus dans le même cache."""
+        with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context('spawn')) as pool:
+            list(pool.map(store_from_process, [str(temp_dir)] * 4, range(4)))
+
+        cache = EmbeddingCache(str(temp_dir))
+        texts = [f"chunk {batch}-{i}" for batch in range(20) for i in range(10)]
+        texts += [f"worker {worker}-{batch}-{i}" for worker in range(4) for batch in range(20) for i in range(10)]
+        embeddings, missing = cache.lookup("model", texts)
+        assert missing == []
+        assert np.array_equal(np.vstack(embeddings), fake_encode(texts))
+        assert cache.get_stats()['bytes'] == len(texts) * 3 * 4
+
+    def test_concurrent_prune_keeps_rows_consistent(self, temp_dir):
+        """Test que le compactage d'un processus ne corrompt pas les lectures des autres."""
+        with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context('spawn')) as pool:
+            list(pool.map(store_from_process, [str(temp_dir)] * 4, range(4), [50 * 3 * 4] * 4))
+
+        cache = EmbeddingCache(str(temp_dir))
+        texts = [f"worker {worker}-19-{i}" for worker in range(4) for i in range(10)]
+        embeddings, missing = cache.lookup("model", texts)
+        for text, embedding in zip(texts, embeddings):
+            assert embedding is None or np.array_equal(embedding, fake_encode([text])[0])
+        assert cache.get_stats()['bytes'] <= 50 * 3 * 4
+
+    def test_cache_is_opt_in(self, monkeypatch):
+        """Test que le cache n'est activé que par --embed-cache ou DYAG_EMBED_CACHE."""
+        monkeypatch.delenv("DYAG_EMBED_CACHE", raising=False)
+        assert cache_path_option(None) is None
+        assert cache_path_option('') == default_cache_dir()
+        assert str(cache_path_option('/tmp/embeddings')) == '/tmp/embeddings'
+
+        monkeypatch.setenv("DYAG_EMBED_CACHE", "/tmp/env-cache")
+        assert str(cache_path_option(None)) == '/tmp/env-cache'
+        assert cache_path_option(None, disabled=True) is None
+
+    def test_parse_size(self):
+        """Test de la conversion des tailles lisibles."""
+        assert parse_size("2G") == 2 * 1024 ** 3
+        assert parse_size("500m") == 500 * 1024 ** 2
+        assert parse_size("1024") == 1024
+        with pytest.raises(ValueError):
+            parse_size("beaucoup")
@@ -0,0 +1,126 @@
+"""
+Tests unitaires pour le module hybrid_search.
+"""
+
+import pytest
+from dyag.hybrid_search import (
+    BM25Index, bm25_index_path, matches_filter, reciprocal_rank_fusion, tokenize
+)
+
+
+class TestTokenize:
+    """Tests pour la fonction tokenize."""
+
+    def test_lowercase_and_accents(self):
+        """Test de la normalisation de la casse et des accents."""
+        assert tokenize("Qui héberge GIDAF ?") == ["qui", "heberge", "gidaf"]
+
+    def test_keeps_identifiers(self):
+        """Test que les identifiants numériques sont conservés."""
+        assert tokenize("source_id 383, app-42") == ["source_id", "383", "app", "42"]
+
+
+class TestMatchesFilter:
+    """Tests pour la fonction matches_filter."""
+
+    def test_equality(self):
+        """Test d'un filtre d'égalité simple."""
+        assert matches_filter({'source_id': '383'}, {'source_id': '383'})
+        assert not matches_filter({'source_id': '384'}, {'source_id': '383'})
+
+    def test_operators(self):
+        """Test des opérateurs $in, $and et $or."""
+        metadata = {'source_id': '383', 'chunk_type': 'overview'}
+        assert matches_filter(metadata, {'source_id': {'$in': ['383', '12']}})
+        assert matches_filter(metadata, {'$and': [{'source_id': '383'}, {'chunk_type': 'overview'}]})
+        assert not matches_filter(metadata, {'$or': [{'source_id': '1'}, {'chunk_type': 'contact'}]})
+
+    def test_unsupported_operator(self):
+        """Test d'un opérateur inconnu."""
+        with pytest.raises(ValueError):
+            matches_filter({'a': 1}, {'a': {'$regex': '.*'}})
+
+
+class TestReciprocalRankFusion:
+    """Tests pour la fonction reciprocal_rank_fusion."""
+
+    def test_documents_in_both_rankings_win(self):
+        """Test qu'un document bien classé par les deux méthodes passe en tête."""
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+        assert fused[0][0] == "b"
+        assert {doc_id for doc_id, _ in fused} == {"a", "b", "c", "d"}
+
+
+class TestBM25Index:
+    """Tests pour la classe BM25Index."""
+
+    @pytest.fixture
+    def index(self, temp_dir):
+        index = BM25Index(bm25_index_path(temp_dir, "applications"))
+        index.add(
+            ["c1", "c2", "c3"],
+            [
+                "GIDAF est une application de gestion des déchets",
+                "MYGUSI est hébergée par le SNUM",
+                "Application de gestion des contrats et des marchés",
+            ],
+            [{'source_id': '1'}, {'source_id': '2'}, {'source_id': '3'}]
+        )
+        yield index
+        index.close()
+
+    def test_exact_name(self, index):
+        """Test qu'un nom d'application exact est retrouvé en tête."""
+        results = index.search("Qui héberge MYGUSI ?", n_results=3)
+        assert results[0][0] == "c2"
+
+    def test_filter(self, index):
+        """Test du filtre de métadonnées."""
+        results = index.search("application de gestion", n_results=3, where={'source_id': '3'})
+        assert [chunk_id for chunk_id, _ in results] == ["c3"]
+
+    def test_upsert_and_delete(self, index):
+        """Test du remplacement et de la suppression de chunks."""
+        index.add(["c1"], ["Le SIRENE recense les entreprises"], [{'source_id': '1'}])
+        assert len(index) == 3
+        assert index.search("GIDAF") == []
+        assert index.search("SIRENE")[0][0] == "c1"
+
+        index.delete(["c1"])
+        assert len(index) == 2
+        assert index.search("SIRENE") == []
+
+    def test_persistence(self, index, temp_dir):
+        """Test que l'index est relu depuis le disque."""
+        reopened = BM25Index(bm25_index_path(temp_dir, "applications"))
+        assert reopened.search("GIDAF")[0][0] == "c1"
+        reopened.close()
+
+    def test_stopwords_ignored(self, index):
+        """Test qu'une question faite uniquement de mots vides ne renvoie rien."""
+        assert index.search("de la des le est par") == []
+
+    def test_common_terms_skipped(self, temp_dir):
+        """Test qu'un terme présent dans la plupart des chunks n'influence pas le classement."""
+        index = BM25Index(bm25_index_path(temp_dir, "courant"))
+        index.add(
+            ["c1", "c2", "c3", "c4"],
+            [
+                "application GIDAF application application application",
+                "application MYGUSI",
+                "application SIRENE",
+                "application CHORUS",
+            ],
+            [{}, {}, {}, {}]
+        )
+        assert [chunk_id for chunk_id, _ in index.search("application MYGUSI", n_results=4)] == ["c2"]
+        # Seul terme de la question : le plus rare est conservé
+        assert len(index.search("application", n_results=4)) == 4
+        index.close()
+
+    def test_max_df_ratio_disabled(self, temp_dir):
+        """Test qu'un ratio de 1 conserve tous les termes."""
+        index = BM25Index(bm25_index_path(temp_dir, "complet"), max_df_ratio=1.0)
+        index.add(["c1", "c2"], ["application GIDAF", "application MYGUSI"], [{}, {}])
+        assert len(index.search("application MYGUSI", n_results=2)) == 2
+        index.close()
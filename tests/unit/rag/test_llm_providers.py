@@ -0,0 +1,74 @@
+"""
+Tests unitaires pour le streaming des providers LLM de dyag.llm_providers.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from dyag.llm_providers import LLMProvider, OllamaProvider
+
+
+class TestStreamChatCompletion:
+    """Tests de l'implémentation par défaut de stream_chat_completion."""
+
+    def test_default_stream_yields_full_answer(self):
+        """Test du repli sur chat_completion pour un provider sans streaming."""
+
+        class StaticProvider(LLMProvider):
+            def chat_completion(self, messages, temperature=0.3, max_tokens=1000):
+                return {'content': 'Bonjour', 'usage': {
+                    'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2
+                }}
+
+            def get_model_name(self):
+                return 'static/test'
+
+        stream = StaticProvider().stream_chat_completion([{"role": "user", "content": "x"}])
+        assert next(stream) == 'Bonjour'
+        with pytest.raises(StopIteration) as stop:
+            next(stream)
+        assert stop.value.value['usage']['total_tokens'] == 2
+
+
+class TestOllamaStream:
+    """Tests du streaming NDJSON d'Ollama."""
+
+    @pytest.fixture
+    def provider(self):
+        with patch("requests.get", return_value=Mock(status_code=200)):
+            return OllamaProvider(model="llama3.2", timeout=5)
+
+    def test_ndjson_fragments_and_final_usage(self, provider):
+        """Test des fragments produits et du résultat final."""
+        events = [
+            {"response": "  "},
+            {"response": " Bon"},
+            {"response": "jour"},
+            {"response": " !"},
+            {"response": "", "done": True, "prompt_eval_count": 5, "eval_count": 3}
+        ]
+        response = Mock(status_code=200)
+        response.iter_lines.return_value = [json.dumps(e).encode('utf-8') for e in events[:2]] + [b""] + \
+            [json.dumps(e).encode('utf-8') for e in events[2:]]
+
+        with patch.object(provider.requests, "post", return_value=response) as mock_post:
+            stream = provider.stream_chat_completion([{"role": "user", "content": "x"}])
+            fragments = []
+            with pytest.raises(StopIteration) as stop:
+                while True:
+                    fragments.append(next(stream))
+
+        # Les espaces initiaux ne sont pas émis
+        assert fragments == ["Bon", "jour", " !"]
+        assert stop.value.value["content"] == "Bonjour !"
+        assert stop.value.value["usage"] == {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+        assert mock_post.call_args.kwargs["json"]["stream"] is True
+        response.close.assert_called_once()
+
+    def test_http_error(self, provider):
+        """Test d'une réponse d'erreur d'Ollama."""
+        response = Mock(status_code=500, text="modèle absent")
+        with patch.object(provider.requests, "post", return_value=response):
+            with pytest.raises(Exception, match="modèle absent"):
+                next(provider.stream_chat_completion([{"role": "user", "content": "x"}]))
@@ -0,0 +1,76 @@
+"""
+Tests unitaires pour les providers LLM asynchrones de dyag.llm_providers.
+"""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+from dyag.llm_providers import (
+    AsyncOllamaProvider,
+    ollama_generate_payload,
+    parse_ollama_response,
+    split_system_message
+)
+
+
+class TestOllamaHelpers:
+    """Tests des fonctions partagées par les providers Ollama."""
+
+    def test_generate_payload(self):
+        """Test de la construction du prompt Ollama."""
+        payload = ollama_generate_payload(
+            "llama3.2",
+            [
+                {"role": "system", "content": "Sois concis."},
+                {"role": "user", "content": "Bonjour"}
+            ],
+            temperature=0.1,
+            max_tokens=50
+        )
+
+        assert payload["prompt"] == "System: Sois concis.\n\nUser: Bonjour\n\nAssistant:"
+        assert payload["stream"] is False
+        assert payload["options"] == {"temperature": 0.1, "num_predict": 50}
+
+    def test_parse_response(self):
+        """Test de la conversion au format commun."""
+        result = parse_ollama_response({
+            "response": "  Réponse  ",
+            "prompt_eval_count": 12,
+            "eval_count": 3
+        })
+
+        assert result["content"] == "Réponse"
+        assert result["usage"]["total_tokens"] == 15
+
+    def test_split_system_message(self):
+        """Test de la séparation du prompt système."""
+        system, others = split_system_message([
+            {"role": "system", "content": "S"},
+            {"role": "user", "content": "U"}
+        ])
+
+        assert system == "S"
+        assert others == [{"role": "user", "content": "U"}]
+
+
+class TestAsyncOllamaProvider:
+    """Tests du provider Ollama asynchrone."""
+
+    def test_requests_fallback(self):
+        """Test du repli sur requests exécuté dans un thread."""
+        provider = AsyncOllamaProvider(model="llama3.2", timeout=5)
+        provider.client = None
+        import requests
+        provider.requests = requests
+
+        response = Mock(status_code=200)
+        response.json.return_value = {"response": "ok", "eval_count": 1, "prompt_eval_count": 2}
+
+        with patch("requests.post", return_value=response) as mock_post:
+            result = asyncio.run(provider.chat_completion([{"role": "user", "content": "x"}]))
+
+        assert result["content"] == "ok"
+        assert mock_post.call_args.kwargs["timeout"] == 5
+        assert provider.get_model_name() == "ollama/llama3.2"
+
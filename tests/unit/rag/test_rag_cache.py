@@ -0,0 +1,192 @@
+"""
+Tests unitaires pour le module rag_cache.
+"""
+
+import time
+
+import pytest
+from dyag.rag_cache import (
+    normalize_query, content_hash, QueryEmbeddingCache, AnswerCache, SemanticCache
+)
+
+
+class TestNormalizeQuery:
+    """Tests pour la fonction normalize_query."""
+
+    def test_collapse_whitespace(self):
+        """Test avec des espaces multiples et en bordure."""
+        assert normalize_query("  Qui   héberge\tGIDAF ?\n") == "Qui héberge GIDAF ?"
+
+    def test_unicode_nfc(self):
+        """Test avec une forme Unicode décomposée."""
+        assert normalize_query("héberge") == "héberge"
+
+
+class TestQueryEmbeddingCache:
+    """Tests pour la classe QueryEmbeddingCache."""
+
+    def test_hit_and_miss_counters(self):
+        """Test des compteurs hits/misses."""
+        cache = QueryEmbeddingCache(max_size=10)
+        assert cache.get("model", "question") is None
+        cache.put("model", "question", [0.1, 0.2])
+        assert cache.get("model", "  question ") == [0.1, 0.2]
+
+        stats = cache.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == pytest.approx(0.5)
+
+    def test_key_includes_model(self):
+        """Test que le nom du modèle fait partie de la clé."""
+        cache = QueryEmbeddingCache(max_size=10)
+        cache.put("model-a", "question", [1.0])
+        assert cache.get("model-b", "question") is None
+
+    def test_lru_eviction(self):
+        """Test de l'éviction de l'entrée la moins récemment utilisée."""
+        cache = QueryEmbeddingCache(max_size=2)
+        cache.put("m", "a", [1.0])
+        cache.put("m", "b", [2.0])
+        cache.get("m", "a")
+        cache.put("m", "c", [3.0])
+
+        assert len(cache) == 2
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "a") == [1.0]
+        assert cache.get("m", "c") == [3.0]
+
+    def test_disabled_cache(self):
+        """Test avec un cache de taille 0."""
+        cache = QueryEmbeddingCache(max_size=0)
+        cache.put("m", "a", [1.0])
+        assert len(cache) == 0
+        assert cache.get("m", "a") is None
+
+    def test_persistence(self, temp_dir):
+        """Test de la sauvegarde et du rechargement sur disque."""
+        path = temp_dir / "query_cache.json"
+        cache = QueryEmbeddingCache(max_size=10, persist_path=str(path))
+        cache.put("m", "a", [1.0, 2.0])
+        cache.save()
+
+        reloaded = QueryEmbeddingCache(max_size=10, persist_path=str(path))
+        assert reloaded.get("m", "a") == [1.0, 2.0]
+
+
+class TestAnswerCache:
+    """Tests pour la classe AnswerCache."""
+
+    CHUNKS = [
+        {'id': 'c2', 'content': 'GIDAF est hébergé par le SNUM'},
+        {'id': 'c1', 'content': 'GIDAF gère les déchets'}
+    ]
+
+    def _key(self, question="Qui héberge GIDAF ?", chunks=None, temperature=0.3):
+        return AnswerCache.make_key(
+            question, chunks or self.CHUNKS, "ollama/llama3.2", temperature, "prompt"
+        )
+
+    def test_key_is_stable(self):
+        """Test que la clé ignore l'ordre des chunks et les espaces de la question."""
+        assert self._key() == self._key("Qui  héberge GIDAF ?", list(reversed(self.CHUNKS)))
+        assert self._key() != self._key(temperature=0.7)
+
+    def test_key_changes_with_content(self):
+        """Test qu'un chunk réindexé avec un autre contenu change la clé."""
+        changed = [dict(self.CHUNKS[0], content='Nouvel hébergeur'), self.CHUNKS[1]]
+        assert self._key() != self._key(chunks=changed)
+
+    def test_put_and_get(self, temp_dir):
+        """Test d'un aller-retour et des compteurs."""
+        cache = AnswerCache(str(temp_dir / "answers.sqlite3"))
+        assert cache.get(self._key()) is None
+        cache.put(self._key(), {'answer': 'Le SNUM'}, self.CHUNKS)
+
+        assert cache.get(self._key()) == {'answer': 'Le SNUM'}
+        assert cache.get_stats()['hits'] == 1
+        assert cache.get_stats()['misses'] == 1
+
+    def test_ttl_expiration(self, temp_dir):
+        """Test de l'expiration des entrées."""
+        cache = AnswerCache(str(temp_dir / "answers.sqlite3"), ttl=0.01)
+        cache.put(self._key(), {'answer': 'x'}, self.CHUNKS)
+        time.sleep(0.05)
+        assert cache.get(self._key()) is None
+        assert cache.get_stats()['entries'] == 0
+
+    def test_size_eviction(self, temp_dir):
+        """Test de l'éviction LRU au-delà de max_entries."""
+        cache = AnswerCache(str(temp_dir / "answers.sqlite3"), max_entries=2)
+        for i in range(3):
+            cache.put(self._key(f"question {i}"), {'answer': str(i)}, self.CHUNKS)
+            time.sleep(0.01)
+
+        assert cache.get_stats()['entries'] == 2
+        assert cache.get(self._key("question 0")) is None
+
+    def test_invalidate_chunks(self, temp_dir):
+        """Test de la purge des réponses construites sur un ancien contenu."""
+        cache = AnswerCache(str(temp_dir / "answers.sqlite3"))
+        cache.put(self._key(), {'answer': 'x'}, self.CHUNKS)
+
+        unchanged = {c['id']: content_hash(c['content']) for c in self.CHUNKS}
+        assert cache.invalidate_chunks(unchanged) == 0
+        assert cache.invalidate_chunks({'c1': content_hash('autre contenu')}) == 1
+        assert cache.get_stats()['entries'] == 0
+
+
+class TestSemanticCache:
+    """Tests pour la classe SemanticCache."""
+
+    def test_paraphrase_hit(self):
+        """Test de la réutilisation au-dessus du seuil."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], {'answer': 'Le SNUM'})
+
+        hit = cache.lookup([0.98, 0.05, 0.0])
+        assert hit is not None
+        assert hit[0] == {'answer': 'Le SNUM'}
+        assert hit[1] > 0.9
+
+    def test_below_threshold(self):
+        """Test d'une question trop éloignée."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], {'answer': 'x'})
+        assert cache.lookup([0.0, 1.0]) is None
+        assert cache.get_stats()['misses'] == 1
+
+    def test_metadata_filter_must_match(self):
+        """Test que le filtre de métadonnées fait partie de la correspondance."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], {'answer': 'x'}, {'source_id': '383'})
+        assert cache.lookup([1.0, 0.0]) is None
+        assert cache.lookup([1.0, 0.0], {'source_id': '383'}) is not None
+
+    def test_lru_eviction(self):
+        """Test de l'éviction de la question la moins récemment utilisée."""
+        cache = SemanticCache(threshold=0.99, max_entries=2, eviction='lru')
+        cache.add([1.0, 0.0, 0.0], {'answer': 'a'})
+        cache.add([0.0, 1.0, 0.0], {'answer': 'b'})
+        cache.lookup([1.0, 0.0, 0.0])
+        cache.add([0.0, 0.0, 1.0], {'answer': 'c'})
+
+        assert len(cache) == 2
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.lookup([1.0, 0.0, 0.0])[0] == {'answer': 'a'}
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_fifo_eviction(self):
+        """Test de l'éviction de la question la plus ancienne."""
+        cache = SemanticCache(threshold=0.99, max_entries=2, eviction='fifo')
+        cache.add([1.0, 0.0, 0.0], {'answer': 'a'})
+        cache.add([0.0, 1.0, 0.0], {'answer': 'b'})
+        cache.lookup([1.0, 0.0, 0.0])
+        cache.add([0.0, 0.0, 1.0], {'answer': 'c'})
+
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
+
+    def test_invalid_policy(self):
+        """Test d'une politique d'éviction inconnue."""
+        with pytest.raises(ValueError):
+            SemanticCache(eviction='random')
@@ -0,0 +1,63 @@
+"""
+Tests unitaires pour le module rag_metrics.
+"""
+
+import pytest
+from dyag.rag_metrics import MetricsRegistry, percentile, summarize_stages
+
+
+class TestPercentile:
+    """Tests pour la fonction percentile."""
+
+    def test_interpolation(self):
+        """Test du calcul par interpolation linéaire."""
+        values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        assert percentile(values, 50) == pytest.approx(5.5)
+        assert percentile(values, 100) == 10
+        assert percentile([], 95) is None
+
+
+class TestSummarizeStages:
+    """Tests pour la fonction summarize_stages."""
+
+    def test_only_measured_stages(self):
+        """Test que seules les étapes mesurées sont résumées, dans l'ordre du pipeline."""
+        summary = summarize_stages([
+            {'total_time': 2.0, 'search_time': 0.1},
+            {'total_time': 4.0, 'search_time': 0.3, 'answer': 'ignoré'},
+        ])
+        assert list(summary) == ['search_time', 'total_time']
+        assert summary['total_time']['p50'] == pytest.approx(3.0)
+        assert summary['search_time']['count'] == 2
+
+
+class TestMetricsRegistry:
+    """Tests pour la classe MetricsRegistry."""
+
+    def test_json_export(self):
+        """Test de l'export JSON."""
+        registry = MetricsRegistry()
+        registry.observe_timings({'search_time': 0.01, 'generation_time': 1.5, 'answer': 'x'})
+        registry.observe_timings({'search_time': 0.03})
+        registry.inc('questions', 2)
+
+        data = registry.to_dict()
+        assert set(data['histograms']) == {'search_time', 'generation_time'}
+        assert data['histograms']['search_time']['count'] == 2
+        assert data['histograms']['search_time']['p50'] == pytest.approx(0.02)
+        assert data['counters'] == {'questions': 2}
+
+    def test_prometheus_export(self):
+        """Test de l'export au format texte Prometheus."""
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.observe('generation_time', 0.5)
+        registry.observe('generation_time', 3)
+        registry.inc('questions')
+
+        text = registry.to_prometheus()
+        assert '# TYPE dyag_rag_generation_seconds histogram' in text
+        assert 'dyag_rag_generation_seconds_bucket{le="0.1"} 0' in text
+        assert 'dyag_rag_generation_seconds_bucket{le="1"} 1' in text
+        assert 'dyag_rag_generation_seconds_bucket{le="+Inf"} 2' in text
+        assert 'dyag_rag_generation_seconds_sum 3.5' in text
+        assert 'dyag_rag_questions_total 1' in text
@@ -0,0 +1,311 @@
+"""
+Tests unitaires pour la recherche de RAGQuerySystem (multi-collections, hiérarchique).
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+from dyag.app_index import AppIndexBuilder
+from dyag.app_router import AppNameRouter, app_names_path
+from dyag.rag_query import DEFAULT_MAX_TOKENS, AsyncRAGQuerySystem, RAGQuerySystem
+from dyag.vector_store import NumpyVectorStore
+
+
+def make_collection(path, name, vectors):
+    store = NumpyVectorStore(str(path), name, create=True)
+    ids = [f"{name}-{i}" for i in range(len(vectors))]
+    store.add(
+        ids=ids,
+        documents=[f"contenu {chunk_id}" for chunk_id in ids],
+        metadatas=[{'source_id': str(i)} for i in range(len(vectors))],
+        embeddings=np.asarray(vectors, dtype=float).tolist()
+    )
+
+
+def make_rag(path, collection_name, **kwargs):
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **kw: np.array([[1.0, 0.05, 0.0]] * len(texts))
+    with patch('dyag.rag_query.SentenceTransformer', return_value=model), \
+            patch('dyag.rag_query.LLMProviderFactory') as factory:
+        factory.create_provider.return_value.get_model_name.return_value = "test-model"
+        return RAGQuerySystem(
+            chroma_path=str(path),
+            collection_name=collection_name,
+            query_cache_size=0,
+            prompt_budget=0,
+            **kwargs
+        )
+
+
+@pytest.fixture
+def rag(temp_dir):
+    make_collection(temp_dir, "famille_a", [[1, 0, 0], [0, 0, 1]])
+    make_collection(temp_dir, "famille_b", [[0.9, 0.1, 0], [0, 1, 0]])
+    return make_rag(temp_dir, ["famille_a", "famille_b"])
+
+
+class TestMultiCollectionSearch:
+    """Tests de la recherche dans plusieurs collections."""
+
+    def test_results_merged_by_similarity(self, rag):
+        """Test de la fusion des collections en un seul top-k."""
+        timings = {}
+        chunks = rag.search_chunks("Qui héberge GIDAF ?", n_results=3, timings=timings)
+
+        assert [c['id'] for c in chunks] == ["famille_a-0", "famille_b-0", "famille_b-1"]
+        assert [c['collection'] for c in chunks] == ["famille_a", "famille_b", "famille_b"]
+        similarities = [c['similarity'] for c in chunks]
+        assert similarities == sorted(similarities, reverse=True)
+        assert set(timings['collection_times']) == {"famille_a", "famille_b"}
+
+    def test_batch_search_and_stats(self, rag):
+        """Test de la recherche par lot et des statistiques par collection."""
+        all_chunks = rag.search_chunks_many(["GIDAF", "MYGUSI"], n_results=2)
+        assert [[c['id'] for c in chunks] for chunks in all_chunks] == [["famille_a-0", "famille_b-0"]] * 2
+
+        stats = rag.get_stats()
+        assert stats['total_chunks'] == 4
+        assert stats['collection_name'] == "famille_a,famille_b"
+        assert stats['collections'] == {"famille_a": 2, "famille_b": 2}
+
+
+class TestHierarchicalSearch:
+    """Tests de la recherche en deux étapes (applications puis chunks)."""
+
+    @pytest.fixture
+    def parc(self, temp_dir):
+        vectors = {"a0": [1, 0, 0], "a1": [0.8, 0.6, 0], "b0": [0.9, 0, 0.44], "b1": [0, 0, 1]}
+        store = NumpyVectorStore(str(temp_dir), "parc", create=True)
+        store.add(
+            ids=list(vectors),
+            documents=list(vectors),
+            metadatas=[{'source_id': chunk_id[0].upper(), 'title': chunk_id} for chunk_id in vectors],
+            embeddings=list(vectors.values())
+        )
+        builder = AppIndexBuilder('numpy', str(temp_dir), "parc")
+        builder.update(store, lambda texts: np.array([vectors[text] for text in texts]), rebuild=True)
+        return temp_dir
+
+    def test_chunks_restricted_to_closest_applications(self, parc):
+        """Test que seuls les chunks des applications retenues sont cherchés."""
+        rag = make_rag(parc, "parc", app_candidates=1)
+        assert [c['id'] for c in rag.search_chunks("GIDAF", n_results=2)] == ["a0", "a1"]
+        assert [c['id'] for c in rag.search_chunks("GIDAF", n_results=2, filter_metadata={'source_id': 'B'})] == ["b0", "b1"]
+
+        flat = make_rag(parc, "parc", app_index=False)
+        assert [c['id'] for c in flat.search_chunks("GIDAF", n_results=2)] == ["a0", "b0"]
+
+    def test_named_application_filters_search(self, parc):
+        """Test que l'application nommée dans la question limite la recherche."""
+        router = AppNameRouter(app_names_path(str(parc), "parc"))
+        router.add([{'source_id': 'A', 'nom': 'GIDAF'}, {'source_id': 'B', 'nom': 'MYGUSI'}])
+        router.save()
+
+        rag = make_rag(parc, "parc", app_index=False)
+        assert [c['id'] for c in rag.search_chunks("Qui héberge MYGUSI ?", n_results=2)] == ["b0", "b1"]
+        all_chunks = rag.search_chunks_many(["Statut de MYGUSI", "Qui héberge l'application ?"], n_results=2)
+        assert [[c['id'] for c in chunks] for chunks in all_chunks] == [["b0", "b1"], ["a0", "b0"]]
+
+    def test_weak_named_application_falls_back_to_full_search(self, temp_dir):
+        """Test que la recherche n'est pas limitée à une application nommée hors sujet."""
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        router = AppNameRouter(app_names_path(str(temp_dir), "parc"))
+        router.add([{'source_id': '1', 'nom': 'SIRENA'}])
+        router.save()
+
+        rag = make_rag(temp_dir, "parc", app_index=False)
+        assert [c['id'] for c in rag.search_chunks("Qui héberge SIRENA ?", n_results=1)] == ["parc-0"]
+
+
+class TestContextCompression:
+    """Tests de la compression du contexte avant l'appel au LLM."""
+
+    def test_pack_context_reports_compression(self, temp_dir):
+        """Test que pack_context compresse le contexte et en mesure la durée."""
+        make_collection(temp_dir, "parc", [[1, 0, 0]])
+        rag = make_rag(temp_dir, "parc", compression_budget=5)
+        chunks = [{'id': 'c1', 'content': "Première phrase du chunk. " * 3 + "\nDeuxième ligne, autre sujet."}]
+
+        timings = {}
+        packed, report = rag.pack_context("Qui héberge GIDAF ?", chunks, timings=timings)
+
+        assert [c['id'] for c in packed] == ['c1']
+        assert report['compression']['ratio'] < 1
+        assert 'compression_time' in timings and 'packing_time' in timings
+
+
+class TestAskMany:
+    """Tests des questions posées en lot."""
+
+    @pytest.fixture
+    def rag(self, temp_dir):
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        return make_rag(temp_dir, "parc")
+
+    @staticmethod
+    def response(content):
+        return {'content': content, 'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12}}
+
+    def test_results_in_question_order(self, rag):
+        """Test que les réponses suivent l'ordre des questions malgré la concurrence."""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def chat_completion(messages, temperature=0.3, max_tokens=1000):
+            question = next(q for q in ("Q0", "Q1", "Q2") if q in messages[-1]['content'])
+            with lock:
+                running.append(question)
+                peak.append(len(running))
+            # Les premières questions finissent en dernier
+            time.sleep(0.05 if question == "Q0" else 0.01)
+            with lock:
+                running.remove(question)
+            return self.response(question)
+
+        rag.llm_provider.chat_completion.side_effect = chat_completion
+        results = rag.ask_many(["Q0 ?", "Q1 ?", "Q2 ?"], n_chunks=1, concurrency=3)
+
+        assert [r['answer'] for r in results] == ["Q0", "Q1", "Q2"]
+        assert [r['question'] for r in results] == ["Q0 ?", "Q1 ?", "Q2 ?"]
+        assert max(peak) > 1
+
+    def test_single_batched_encode_and_query(self, rag):
+        """Test que la recherche du lot fait un seul encode et un seul query."""
+        rag.llm_provider.chat_completion.return_value = self.response("ok")
+        with patch.object(rag.collection, 'query', wraps=rag.collection.query) as query:
+            rag.ask_many(["Q0 ?", "Q1 ?", "Q2 ?"], n_chunks=1)
+
+        assert rag.embedding_model.encode.call_count == 1
+        assert query.call_count == 1
+        assert len(query.call_args.kwargs['query_embeddings']) == 3
+
+    def test_generation_error_reported_per_question(self, rag):
+        """Test qu'une génération en échec n'empêche pas les autres réponses."""
+        def chat_completion(messages, temperature=0.3, max_tokens=1000):
+            if "Q1" in messages[-1]['content']:
+                raise RuntimeError("LLM indisponible")
+            return self.response("ok")
+
+        rag.llm_provider.chat_completion.side_effect = chat_completion
+        results = rag.ask_many(["Q0 ?", "Q1 ?", "Q2 ?"], n_chunks=1)
+
+        assert [r['answer'] for r in results] == ["ok", None, "ok"]
+        assert results[1]['error'] == "LLM indisponible"
+        assert results[1]['sources'] == ["parc-0"]
+        assert 'error' not in results[0]
+
+
+class TestAskStream:
+    """Tests de la réponse en streaming."""
+
+    def test_sources_then_tokens_then_result(self, temp_dir):
+        """Test de l'ordre des événements et du résultat final."""
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        rag = make_rag(temp_dir, "parc")
+
+        def stream(messages, temperature=0.3, max_tokens=1000):
+            yield "Héberg"
+            yield "é par X"
+            return {'content': "Hébergé par X", 'usage': {
+                'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12
+            }}
+
+        rag.llm_provider.stream_chat_completion.side_effect = stream
+        events = list(rag.ask_stream("Qui héberge GIDAF ?", n_chunks=1))
+
+        assert [e['type'] for e in events] == ['sources', 'token', 'token', 'done']
+        assert events[0]['sources'] == ["parc-0"]
+        assert ''.join(e['content'] for e in events[1:3]) == "Hébergé par X"
+        result = events[-1]['result']
+        assert result['answer'] == "Hébergé par X" and result['sources'] == ["parc-0"]
+        assert result['question'] == "Qui héberge GIDAF ?" and result['tokens_used'] == 12
+        assert 'first_token_time' in result and 'generation_time' in result
+        assert rag.llm_provider.stream_chat_completion.call_args.kwargs['max_tokens'] == DEFAULT_MAX_TOKENS
+
+    def test_shares_answer_cache_with_ask(self, temp_dir):
+        """Test qu'une réponse de ask() est resservie par ask_stream() (même clé de cache)."""
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        rag = make_rag(temp_dir, "parc", answer_cache_path=str(temp_dir / "answers.db"))
+        rag.llm_provider.chat_completion.return_value = {
+            'content': "Hébergé par X",
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12}
+        }
+
+        rag.ask("Qui héberge GIDAF ?", n_chunks=1)
+        events = list(rag.ask_stream("Qui héberge GIDAF ?", n_chunks=1))
+
+        assert events[-1]['result']['cache_hit'] is True
+        assert events[-1]['result']['answer'] == "Hébergé par X"
+        rag.llm_provider.stream_chat_completion.assert_not_called()
+
+    def test_semantic_cache(self, temp_dir):
+        """Test que le streaming consulte et remplit le cache sémantique."""
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        rag = make_rag(temp_dir, "parc", semantic_cache_threshold=0.9)
+
+        def stream(messages, temperature=0.3, max_tokens=1000):
+            yield "Hébergé par X"
+            return {'content': "Hébergé par X", 'usage': {
+                'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12
+            }}
+
+        rag.llm_provider.stream_chat_completion.side_effect = stream
+        first = list(rag.ask_stream("Qui héberge GIDAF ?", n_chunks=1))
+        paraphrase = list(rag.ask_stream("Quel hébergeur pour GIDAF ?", n_chunks=1))
+
+        assert first[-1]['result']['semantic_cache_hit'] is False
+        assert [e['type'] for e in paraphrase] == ['token', 'done']
+        assert paraphrase[0]['content'] == "Hébergé par X"
+        assert paraphrase[-1]['result']['semantic_cache_hit'] is True
+        assert paraphrase[-1]['result']['question'] == "Quel hébergeur pour GIDAF ?"
+        assert rag.llm_provider.stream_chat_completion.call_count == 1
+
+
+class TestAsyncRAGQuerySystem:
+    """Tests de la version asyncio de RAGQuerySystem."""
+
+    def test_async_provider_only_and_caches(self, temp_dir):
+        """Test qu'aucun provider synchrone n'est créé et que les caches sont consultés."""
+        make_collection(temp_dir, "parc", [[1, 0, 0], [0, 0, 1]])
+        model = MagicMock()
+        model.encode.side_effect = lambda texts, **kw: np.array([[1.0, 0.05, 0.0]] * len(texts))
+        provider = MagicMock()
+        provider.get_model_name.return_value = "test-model"
+        provider.aclose = AsyncMock()
+        provider.chat_completion = AsyncMock(return_value={
+            'content': "Réponse",
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 2, 'total_tokens': 12}
+        })
+
+        with patch('dyag.rag_query.SentenceTransformer', return_value=model), \
+                patch('dyag.rag_query.LLMProviderFactory') as factory:
+            factory.create_async_provider.return_value = provider
+            rag = AsyncRAGQuerySystem(
+                chroma_path=str(temp_dir),
+                collection_name="parc",
+                query_cache_size=0,
+                prompt_budget=0,
+                answer_cache_path=str(temp_dir / "answers.db"),
+                semantic_cache_threshold=0.9
+            )
+            factory.create_provider.assert_not_called()
+
+        async def scenario():
+            first = await rag.ask("Qui héberge GIDAF ?", n_chunks=1)
+            paraphrase = await rag.ask("Quel hébergeur pour GIDAF ?", n_chunks=1)
+            chunks = await rag.search_chunks("Qui héberge GIDAF ?", n_results=1)
+            cached = await rag.generate_answer("Qui héberge GIDAF ?", chunks)
+            await rag.aclose()
+            return first, paraphrase, cached
+
+        first, paraphrase, cached = asyncio.run(scenario())
+        assert first['answer'] == "Réponse" and first['semantic_cache_hit'] is False
+        assert paraphrase['semantic_cache_hit'] is True
+        assert paraphrase['cached_question'] == "Qui héberge GIDAF ?"
+        assert cached['cache_hit'] is True
+        assert provider.chat_completion.await_count == 1
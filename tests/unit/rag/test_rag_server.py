@@ -0,0 +1,186 @@
+"""
+Tests unitaires pour le module rag_server.
+"""
+
+import argparse
+import threading
+from pathlib import Path
+
+import pytest
+from dyag.commands.query_rag import rag_settings, register_query_rag_command
+from dyag.commands.rag_serve import register_rag_serve_command
+from dyag.rag_metrics import MetricsRegistry
+from dyag.rag_server import (
+    RAGServerClient, create_server, find_server, parse_server_url
+)
+
+
+class FakeProvider:
+    def get_model_name(self):
+        return "fake/model"
+
+
+class FakeCollection:
+    name = "applications"
+
+
+class FakeRAG:
+    """RAGQuerySystem minimal : renvoie la question en écho."""
+
+    embedding_model_name = "all-MiniLM-L6-v2"
+
+    def __init__(self, chroma_path):
+        self.chroma_path = Path(chroma_path)
+        self.collection = FakeCollection()
+        self.collection_names = [self.collection.name]
+        self.llm_provider = FakeProvider()
+        self.metrics = MetricsRegistry()
+        self.metrics.observe('search_time', 0.02)
+
+    def ask(self, question, n_chunks=5, filter_metadata=None, temperature=0.3):
+        if question == "boom":
+            raise RuntimeError("LLM indisponible")
+        return {'question': question, 'answer': f"réponse: {question}",
+                'sources': ['c1'] * n_chunks, 'tokens_used': 3}
+
+    def ask_stream(self, question, n_chunks=5, filter_metadata=None, temperature=0.3):
+        yield {'type': 'sources', 'sources': ['c1'], 'chunks': []}
+        for token in ["réponse", " en", " flux"]:
+            yield {'type': 'token', 'content': token}
+        yield {'type': 'done', 'result': self.ask(question, n_chunks)}
+
+    def get_stats(self):
+        return {'total_chunks': 1, 'collection_name': self.collection.name}
+
+
+@pytest.fixture
+def server(temp_dir):
+    server = create_server(FakeRAG(temp_dir), "http://127.0.0.1:0")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestParseServerUrl:
+    """Tests pour la fonction parse_server_url."""
+
+    def test_http(self):
+        """Test d'une adresse HTTP."""
+        assert parse_server_url("http://127.0.0.1:9000") == {
+            'scheme': 'http', 'host': '127.0.0.1', 'port': 9000
+        }
+
+    def test_unix(self):
+        """Test d'une adresse de socket UNIX."""
+        assert parse_server_url("unix:///tmp/dyag.sock") == {'scheme': 'unix', 'path': '/tmp/dyag.sock'}
+
+    def test_invalid(self):
+        """Test d'un schéma non supporté."""
+        with pytest.raises(ValueError):
+            parse_server_url("ftp://localhost")
+
+
+class TestRAGServer:
+    """Tests du serveur et du client RAG."""
+
+    def test_ask(self, server):
+        """Test d'une question simple."""
+        client = RAGServerClient(server.url)
+        result = client.ask("Qui héberge GIDAF ?", n_chunks=2)
+        assert result['answer'] == "réponse: Qui héberge GIDAF ?"
+        assert result['sources'] == ['c1', 'c1']
+
+    def test_ask_stream(self, server):
+        """Test de la réponse en streaming."""
+        client = RAGServerClient(server.url)
+        events = list(client.ask_stream("Qui héberge GIDAF ?"))
+        assert [e['type'] for e in events] == ['sources', 'token', 'token', 'token', 'done']
+        assert ''.join(e['content'] for e in events if e['type'] == 'token') == "réponse en flux"
+
+    def test_error_is_reported(self, server):
+        """Test qu'une erreur côté serveur est remontée au client."""
+        with pytest.raises(RuntimeError, match="LLM indisponible"):
+            RAGServerClient(server.url).ask("boom")
+
+    def test_get_stats(self, server):
+        """Test des statistiques."""
+        assert RAGServerClient(server.url).get_stats()['total_chunks'] == 1
+
+    def test_metrics(self, server):
+        """Test des exports de métriques JSON et Prometheus."""
+        client = RAGServerClient(server.url)
+        assert client.get_metrics()['histograms']['search_time']['count'] == 1
+
+        conn, response = client._request('GET', '/metrics')
+        body = response.read().decode('utf-8')
+        conn.close()
+        assert 'dyag_rag_search_seconds_count 1' in body
+
+    def test_find_server_checks_config(self, server, temp_dir):
+        """Test que find_server ignore un serveur servant une autre base."""
+        assert find_server(server.url, chroma_path=str(temp_dir), collection_name="applications") is not None
+        assert find_server(server.url, collection_name="autre") is None
+        assert find_server(server.url, chroma_path=str(temp_dir / "autre")) is None
+
+    def test_find_server_checks_settings(self, temp_dir):
+        """Test qu'un serveur lancé avec d'autres options n'est pas réutilisé."""
+        settings = {'rerank_model': None, 'prompt_budget': None}
+        server = create_server(FakeRAG(temp_dir), "http://127.0.0.1:0", settings=settings)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert find_server(server.url, settings=dict(settings)) is not None
+            assert find_server(server.url, settings={**settings, 'prompt_budget': 1024}) is None
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_find_server_not_running(self):
+        """Test sans serveur actif."""
+        assert find_server("http://127.0.0.1:1") is None
+
+    @pytest.mark.skipif(not hasattr(__import__('socket'), 'AF_UNIX'), reason="Sockets UNIX indisponibles")
+    def test_unix_socket(self, temp_dir):
+        """Test du serveur sur socket UNIX."""
+        url = f"unix://{temp_dir / 'rag.sock'}"
+        server = create_server(FakeRAG(temp_dir), url)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert RAGServerClient(url).ask("GIDAF")['answer'] == "réponse: GIDAF"
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert not (temp_dir / 'rag.sock').exists()
+
+    @pytest.mark.skipif(not hasattr(__import__('socket'), 'AF_UNIX'), reason="Sockets UNIX indisponibles")
+    def test_unix_socket_keeps_regular_file(self, temp_dir):
+        """Test qu'un fichier ordinaire à l'adresse de la socket n'est pas supprimé."""
+        notes = temp_dir / 'notes.txt'
+        notes.write_text("à garder", encoding='utf-8')
+        with pytest.raises(ValueError):
+            create_server(FakeRAG(temp_dir), f"unix://{notes}")
+        assert notes.read_text(encoding='utf-8') == "à garder"
+
+
+class TestSharedOptions:
+    """Tests des options communes à query-rag et rag-serve."""
+
+    @staticmethod
+    def parse(*argv):
+        parser = argparse.ArgumentParser()
+        subparsers = parser.add_subparsers()
+        register_query_rag_command(subparsers)
+        register_rag_serve_command(subparsers)
+        return parser.parse_args(list(argv))
+
+    def test_same_options_give_same_settings(self):
+        """Test que query-rag et rag-serve décrivent de la même façon les mêmes options."""
+        serve = self.parse('rag-serve', '--rerank', '--answer-cache', 'answers.db')
+        query = self.parse('query-rag', 'Qui héberge GIDAF ?', '--rerank', '--answer-cache', 'answers.db')
+        assert rag_settings(query) == rag_settings(serve)
+        assert rag_settings(query)['answer_cache_path'] == str(Path('answers.db').resolve())
+
+        assert rag_settings(self.parse('query-rag', '--no-hybrid')) != rag_settings(self.parse('rag-serve'))
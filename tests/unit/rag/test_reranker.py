@@ -0,0 +1,57 @@
+"""
+Tests unitaires pour le module reranker.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from dyag.reranker import CrossEncoderReranker
+
+
+def overlap_scores(pairs, **kwargs):
+    """Score factice : nombre de mots communs entre la question et le chunk."""
+    return [len(set(q.lower().split()) & set(d.lower().split())) for q, d in pairs]
+
+
+@pytest.fixture
+def reranker():
+    with patch('dyag.reranker.CrossEncoder') as mock_cross_encoder:
+        mock_cross_encoder.return_value.predict.side_effect = overlap_scores
+        yield CrossEncoderReranker("fake-cross-encoder", cache_size=100)
+
+
+CHUNKS = [
+    {'id': 'c1', 'content': 'mygusi gère les usines'},
+    {'id': 'c2', 'content': 'gidaf est hébergé par le snum'},
+    {'id': 'c3', 'content': 'gidaf gère les déchets'},
+]
+
+
+class TestCrossEncoderReranker:
+    """Tests pour la classe CrossEncoderReranker."""
+
+    def test_rerank_order_and_top_k(self, reranker):
+        """Test du tri par score et de la troncature."""
+        result = reranker.rerank("qui héberge gidaf snum", CHUNKS, top_k=2)
+        assert [c['id'] for c in result] == ['c2', 'c3']
+        assert result[0]['rerank_score'] > result[1]['rerank_score']
+
+    def test_single_batched_pass(self, reranker):
+        """Test que toutes les paires de toutes les questions partent en un seul predict."""
+        reranker.rerank_many(["gidaf", "mygusi"], [CHUNKS, CHUNKS], top_k=1)
+        assert reranker.model.predict.call_count == 1
+        assert len(reranker.model.predict.call_args[0][0]) == 6
+
+    def test_score_cache(self, reranker):
+        """Test que les scores déjà calculés ne sont pas recalculés."""
+        reranker.rerank("gidaf", CHUNKS)
+        reranker.rerank("  gidaf ", CHUNKS)
+        assert reranker.model.predict.call_count == 1
+        assert reranker.get_stats()['hits'] == 3
+
+    def test_cache_key_includes_content(self, reranker):
+        """Test qu'un chunk modifié est rescoré."""
+        reranker.rerank("gidaf", CHUNKS)
+        changed = [dict(CHUNKS[0], content='gidaf remplace mygusi')]
+        assert reranker.rerank("gidaf", changed)[0]['rerank_score'] == 1
+        assert reranker.model.predict.call_count == 2
@@ -0,0 +1,291 @@
+"""
+Tests unitaires pour le module vector_store (backend numpy).
+"""
+
+from unittest.mock import MagicMock, call
+
+import numpy as np
+import pytest
+from dyag.hybrid_search import matches_filter
+from dyag.vector_store import (
+    ChromaVectorStore, NumpyVectorStore, compression_report, dequantize, detect_store, distance_to_similarity,
+    open_vector_store, quantize
+)
+
+
+def make_store(path, **kwargs):
+    return NumpyVectorStore(str(path), "applications", create=True, **kwargs)
+
+
+def add_chunks(store, vectors, start=0):
+    ids = [f"c{start + i}" for i in range(len(vectors))]
+    store.add(
+        ids=ids,
+        documents=[f"contenu {chunk_id}" for chunk_id in ids],
+        metadatas=[{'source_id': str((start + i) % 3)} for i in range(len(vectors))],
+        embeddings=np.asarray(vectors).tolist()
+    )
+    return ids
+
+
+class TestNumpyVectorStore:
+    """Tests pour la classe NumpyVectorStore."""
+
+    def test_query_order_and_distances(self, temp_dir):
+        """Test du classement par similarité cosinus."""
+        store = make_store(temp_dir)
+        add_chunks(store, [[1, 0, 0], [0, 1, 0], [1, 1, 0]])
+
+        results = store.query(query_embeddings=[[1, 0.1, 0]], n_results=2)
+        assert results['ids'] == [['c0', 'c2']]
+        assert results['documents'][0][0] == "contenu c0"
+        assert results['distances'][0][0] < results['distances'][0][1]
+
+    def test_where_filter(self, temp_dir):
+        """Test du filtre de métadonnées."""
+        store = make_store(temp_dir)
+        add_chunks(store, np.eye(4))
+
+        results = store.query(query_embeddings=[[1, 0, 0, 0]], n_results=5, where={'source_id': '1'})
+        assert results['ids'] == [['c1']]
+        assert store.get(where={'source_id': '0'})['ids'] == ['c0', 'c3']
+
+    def test_persistence_and_detection(self, temp_dir):
+        """Test de la réouverture d'une collection et de la détection du backend."""
+        store = make_store(temp_dir)
+        for start in range(0, 30, 10):
+            add_chunks(store, np.random.default_rng(start).normal(size=(10, 8)), start)
+
+        assert detect_store(str(temp_dir), "applications") == 'numpy'
+        assert detect_store(str(temp_dir), "autre") == 'chroma'
+
+        reopened = open_vector_store('numpy', str(temp_dir), "applications")
+        assert reopened.count() == 30
+        assert reopened.get(ids=['c25'])['documents'] == ["contenu c25"]
+        assert reopened._matrix.shape == (30, 8)
+
+    def test_add_existing_id_replaces(self, temp_dir):
+        """Test qu'un ID déjà indexé est remplacé."""
+        store = make_store(temp_dir)
+        add_chunks(store, [[1, 0], [0, 1]])
+        store.add(ids=['c0'], documents=["nouveau"], metadatas=[{}], embeddings=[[0, 1]])
+
+        assert store.count() == 2
+        assert store.get(ids=['c0'])['documents'] == ["nouveau"]
+        assert make_store(temp_dir).query(query_embeddings=[[0, 1]], n_results=2)['distances'][0] == \
+            pytest.approx([0, 0], abs=1e-6)
+
+    def test_update_appends_then_optimize_compacts(self, temp_dir):
+        """Test qu'une mise à jour ajoute une ligne sans réécrire les fichiers, compactés par optimize()."""
+        store = make_store(temp_dir)
+        add_chunks(store, np.eye(3))
+        before = store._chunks_path.read_text(encoding='utf-8')
+        store.add(ids=['c0'], documents=["nouveau"], metadatas=[{'source_id': '1'}], embeddings=[[0, 1, 1]])
+        assert store._chunks_path.read_text(encoding='utf-8').startswith(before)
+
+        for current in (store, make_store(temp_dir)):
+            assert current.count() == 3
+            assert current.get()['ids'] == ['c1', 'c2', 'c0']
+            assert current.get(where={'source_id': '0'})['ids'] == []
+            assert current.query(query_embeddings=[[0, 0, 1]], n_results=5, where={'source_id': '0'})['ids'] == [[]]
+            results = current.query(query_embeddings=[[1, 0, 0]], n_results=5)
+            # L'ancienne version de c0 (identique à la question) est ignorée
+            assert sorted(results['ids'][0]) == ['c0', 'c1', 'c2']
+            assert results['distances'][0][0] == pytest.approx(1, abs=1e-6)
+
+        store.optimize()
+        compacted = make_store(temp_dir)
+        assert compacted._matrix.shape == (3, 3)
+        assert compacted.get()['ids'] == ['c1', 'c2', 'c0']
+        assert compacted.query(query_embeddings=[[0, 1, 1]], n_results=1)['ids'] == [['c0']]
+
+    def test_delete(self, temp_dir):
+        """Test de la suppression de chunks."""
+        store = make_store(temp_dir)
+        add_chunks(store, np.eye(3))
+        store.delete(['c1'])
+
+        assert store.count() == 2
+        assert make_store(temp_dir).get()['ids'] == ['c0', 'c2']
+
+    def test_delete_keeps_readers_mapping(self, temp_dir):
+        """Test que la suppression remplace les fichiers sans modifier ceux projetés par un lecteur."""
+        add_chunks(make_store(temp_dir), np.eye(3))
+        reader = make_store(temp_dir)
+        before = np.array(reader._matrix)
+
+        make_store(temp_dir).delete(['c0'])
+        assert np.array_equal(np.asarray(reader._matrix), before)
+        assert make_store(temp_dir)._matrix.shape == (2, 3)
+        assert not list(temp_dir.glob('*.npstore/*.tmp'))
+
+    @pytest.mark.parametrize("extra", ['embeddings', 'chunks'])
+    def test_interrupted_add_is_repaired(self, temp_dir, extra):
+        """Test qu'une écriture interrompue entre embeddings et chunks laisse la collection utilisable."""
+        store = make_store(temp_dir, dtype='int8')
+        add_chunks(store, np.eye(3))
+        # Lot écrit à moitié avant l'interruption
+        if extra == 'embeddings':
+            store._append_embeddings(*quantize(np.eye(3)[:1], 'int8'))
+        else:
+            store._ids.append('c3')
+            store._documents.append("contenu c3")
+            store._metadatas.append({})
+            store._write_chunks(range(3, 4))
+
+        reopened = make_store(temp_dir)
+        assert reopened.count() == 3
+        assert reopened.query(query_embeddings=[[0, 0, 1]], n_results=1)['ids'] == [['c2']]
+
+        add_chunks(reopened, [[0, 1, 1]], start=3)
+        repaired = make_store(temp_dir)
+        assert repaired.get()['ids'] == ['c0', 'c1', 'c2', 'c3']
+        assert repaired._matrix.shape == (4, 3) and repaired._scales.shape == (4,)
+        assert repaired.query(query_embeddings=[[0, 1, 1]], n_results=1)['ids'] == [['c3']]
+
+    def test_float16(self, temp_dir):
+        """Test du stockage en demi-précision."""
+        store = make_store(temp_dir, dtype='float16')
+        add_chunks(store, [[1, 0], [0, 1]])
+        assert store._matrix.dtype == np.float16
+        assert store.query(query_embeddings=[[0, 1]], n_results=1)['ids'] == [['c1']]
+
+    def test_replace(self, temp_dir):
+        """Test du remplacement d'une collection par une collection reconstruite."""
+        add_chunks(make_store(temp_dir), [[1, 0]])
+        build = NumpyVectorStore(str(temp_dir), "applications_build", create=True)
+        build.add(ids=['new'], documents=["nouveau"], metadatas=[{}], embeddings=[[0, 1]])
+
+        build.replace("applications")
+        build.add(ids=['new2'], documents=["ajout"], metadatas=[{}], embeddings=[[1, 1]])
+        assert make_store(temp_dir).get()['ids'] == ['new', 'new2']
+        assert detect_store(str(temp_dir), "applications_build") == 'chroma'
+
+    def test_indexed_filters(self, temp_dir):
+        """Test des filtres d'égalité et $in servis par l'index des valeurs."""
+        store = make_store(temp_dir)
+        add_chunks(store, np.eye(6))
+
+        for where in ({'source_id': '1'}, {'source_id': {'$in': ['0', '2']}},
+                      {'$and': [{'source_id': {'$in': ['0', '2']}}, {'source_id': {'$ne': '2'}}]}):
+            indexed = store._filter_rows(where)
+            store._filter_masks.clear()
+            scanned = [row for row, meta in enumerate(store._metadatas) if matches_filter(meta, where)]
+            assert indexed.tolist() == scanned
+        assert store._value_rows['source_id']['0'] == [0, 3]
+
+        add_chunks(store, [[1, 0, 0, 0, 0, 0]], start=6)
+        assert store._filter_rows({'source_id': '0'}).tolist() == [0, 3, 6]
+
+    def test_distance_to_similarity(self, temp_dir):
+        """Test de la conversion des distances en similarité cosinus."""
+        store = make_store(temp_dir)
+        add_chunks(store, [[1, 0], [0, 1]])
+        distance = store.query(query_embeddings=[[0.6, 0.8]], n_results=1)['distances'][0][0]
+
+        similarity = distance_to_similarity(distance, store.distance_metric())
+        assert similarity == pytest.approx(0.8)
+        # Carré de la distance L2 entre vecteurs normalisés (défaut de ChromaDB)
+        assert distance_to_similarity(2 - 2 * 0.8, 'l2') == pytest.approx(0.8)
+        with pytest.raises(ValueError):
+            distance_to_similarity(0.2, 'manhattan')
+
+    def test_missing_collection(self, temp_dir):
+        """Test de l'ouverture d'une collection inexistante."""
+        with pytest.raises(ValueError):
+            NumpyVectorStore(str(temp_dir), "absente")
+
+    def test_ivf_matches_exact_search(self, temp_dir):
+        """Test que l'index IVF retrouve les plus proches voisins de la recherche exacte."""
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(8, 16))
+        vectors = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.05, size=(400, 16))
+
+        store = make_store(temp_dir, ivf_min_vectors=100, nprobe=2)
+        add_chunks(store, vectors)
+        exact = store.query(query_embeddings=vectors[:5].tolist(), n_results=3)
+
+        store.optimize()
+        assert store.get_stats()['ivf_lists'] == 20
+        assert store.query(query_embeddings=vectors[:5].tolist(), n_results=3)['ids'] == exact['ids']
+
+        # Les chunks ajoutés après la construction sont affectés à une partition
+        add_chunks(store, centers[:1] * 10, start=400)
+        assert store.query(query_embeddings=[centers[0].tolist()], n_results=60)['ids'][0].count('c400') == 1
+
+        # Une mise à jour masque l'ancienne ligne dans sa partition
+        store.add(ids=['c0'], documents=["déplacé"], metadatas=[{}], embeddings=[centers[1].tolist()])
+        assert store.query(query_embeddings=[vectors[0].tolist()], n_results=1)['ids'] != [['c0']]
+        assert store.query(query_embeddings=[centers[1].tolist()], n_results=60)['ids'][0].count('c0') == 1
+
+
+class TestChromaVectorStore:
+    """Tests pour la classe ChromaVectorStore."""
+
+    def test_replace_renames_old_collection_first(self):
+        """Test que le nom de la collection désigne toujours une collection pendant le remplacement."""
+        store = ChromaVectorStore.__new__(ChromaVectorStore)
+        calls = MagicMock()
+        store.client = calls.client
+        store.collection = calls.build
+        calls.client.get_collection.return_value = calls.old
+
+        store.replace("applications")
+        assert calls.mock_calls[-4:] == [
+            call.client.get_collection("applications"),
+            call.old.modify(name="applications_old"),
+            call.build.modify(name="applications"),
+            call.client.delete_collection("applications_old"),
+        ]
+        assert store.name == "applications"
+
+class TestCompression:
+    """Tests du stockage compressé (int8, dimensions réduites)."""
+
+    def test_int8_roundtrip(self):
+        """Test de la quantification int8 par vecteur."""
+        vectors = np.random.default_rng(0).normal(size=(20, 32)).astype(np.float32)
+        codes, scales = quantize(vectors, 'int8')
+        assert codes.dtype == np.int8
+        assert np.abs(dequantize(codes, scales) - vectors).max() < np.abs(vectors).max() / 127
+
+    def test_int8_store(self, temp_dir):
+        """Test d'une collection int8 : recherche et réouverture."""
+        store = make_store(temp_dir, dtype='int8')
+        add_chunks(store, np.eye(4) + 0.01)
+        store.add(ids=['c1'], documents=["nouveau"], metadatas=[{}], embeddings=[[0, 0, 0, 1]])
+
+        reopened = make_store(temp_dir)
+        assert reopened.get_stats()['bytes_per_vector'] == 8
+        assert reopened.query(query_embeddings=[[0, 0, 0, 1]], n_results=2)['ids'] == [['c1', 'c3']]
+
+    def test_truncated_dimensions(self, temp_dir):
+        """Test que les questions subissent la même troncature que les chunks."""
+        store = make_store(temp_dir, dims=2)
+        add_chunks(store, [[1, 0, 5], [0, 1, 5]])
+        assert store._matrix.shape == (2, 2)
+        assert store.query(query_embeddings=[[0, 1, -5]], n_results=1)['ids'] == [['c1']]
+
+    def test_pca_requires_fit(self, temp_dir):
+        """Test que l'ACP doit être ajustée avant le premier ajout."""
+        vectors = np.random.default_rng(0).normal(size=(50, 8))
+        store = make_store(temp_dir, dims=3, projection='pca')
+        assert store.needs_fit
+        with pytest.raises(ValueError):
+            add_chunks(store, vectors)
+
+        store.fit_projection(vectors)
+        add_chunks(store, vectors)
+        assert make_store(temp_dir).query(query_embeddings=vectors[:1].tolist(), n_results=1)['ids'] == [['c0']]
+
+    def test_compression_report(self):
+        """Test du rapport rappel / taille."""
+        rng = np.random.default_rng(0)
+        report = compression_report(rng.normal(size=(200, 16)), rng.normal(size=(10, 16)), dims=8)
+
+        assert [(row['dtype'], row['dims']) for row in report][:3] == [
+            ('float32', 16), ('float16', 16), ('int8', 16)
+        ]
+        assert report[0]['recall'] == 1.0
+        assert report[0]['bytes_per_vector'] == 64 and report[2]['bytes_per_vector'] == 20
+        assert all(0 <= row['recall'] <= 1 for row in report)